@@ -8,6 +8,13 @@ import importlib
 import logging
 import sys
 import os
+import time
+from desempenho import metricas_cpu, registrar_cpu
+import aquecimento
+import memoria_sessao
+
+# CPU gasto neste rerun completo (comparado com o dos fragmentos em desempenho.metricas_cpu)
+_inicio_cpu = time.thread_time()
 
 # Adiciona o diretório atual ao caminho para imports locais
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -48,12 +55,20 @@ if 'horario_entrada' not in st.session_state:
 if 'horario_saida' not in st.session_state:
     st.session_state.horario_saida = None
 
-# === CONEXÃO COM GOOGLE SHEETS (ANTES DE TUDO) ===
+# === AQUECIMENTO DO SERVIDOR ===
+# Já iniciado por iniciar_servidor.py; com `streamlit run app.py` começa na primeira visita
+aquecimento.iniciar_aquecimento()
+
+# === CONEXÃO COM GOOGLE SHEETS ===
+# A tela de login não precisa da planilha: ela aparece enquanto o aquecimento termina
 try:
-    from google_planilha import GooglePlanilha
-    if 'gsheets' not in st.session_state:
-        st.session_state.gsheets = GooglePlanilha()
-        logger.info("✅ Conexão com Google Sheets estabelecida.")
+    from google_planilha import obter_planilha_compartilhada
+    if 'gsheets' not in st.session_state and st.session_state.etapa != 'login':
+        st.session_state.gsheets = obter_planilha_compartilhada()
+        logger.info(
+            f"✅ Conexão com Google Sheets estabelecida em "
+            f"{st.session_state.gsheets.metricas_bootstrap['total_ms']} ms."
+        )
 except ModuleNotFoundError:
     st.error("❌ Arquivo 'google_planilha.py' não encontrado. Verifique o nome e localização.")
     st.stop()
@@ -72,10 +87,23 @@ def atualizar_reservas():
     if ultima_execucao and (agora - ultima_execucao).total_seconds() < 60:
         return
 
+# --- INDICADOR DE PRONTIDÃO ---
+def _status_aquecimento():
+    estado = aquecimento.estado()
+    if estado["situacao"] == "pronto":
+        st.caption("🟢 Sistema pronto")
+    elif estado["situacao"] == "falhou":
+        st.caption("🟠 Sistema disponível; alguns dados serão carregados no primeiro acesso")
+    else:
+        etapa = f" ({estado['etapa']})" if estado["etapa"] else ""
+        st.caption(f"🟡 Preparando o sistema{etapa}… o primeiro acesso pode demorar alguns segundos")
+
+
 # --- TELA DE LOGIN ---
 def tl_login():
     st.markdown("<h1 style='text-align: center; color: #1f77b4;'>🔐 ACESSO AO SISTEMA</h1>", unsafe_allow_html=True)
     st.subheader("Autenticação de Usuário")
+    _status_aquecimento()
 
     # Carregar usuários do JSON
     try:
@@ -135,52 +163,67 @@ except Exception as e:
     st.stop()
 
 # --- CARREGAMENTO DAS SUBTELAS (com importlib) ---
-SUBTELAS = {}
-modulos_subtelas = [
+MODULOS_SUBTELAS = [
     'tl_receita',
     'tl_pesquisa',
     'tl_exame',
     'tl_reserva',
     'tl_sem_receita',
     'tl_ex_vista',
-    'tl_exame',
     'tl_ajuste',
     'tl_entrega',
     'tl_garantia',
-    'tl_relatorio_vendedor',   
+    'tl_relatorio_vendedor',
+    'tl_memoria',
+    'tl_painel',
+    'tl_funil',
+    'tl_mapa_calor',
+    'tl_ranking',
+    'tl_fechamento',
 ]
 
-for nome_modulo in modulos_subtelas:
-    try:
-        module = importlib.import_module(nome_modulo)
 
-        # Procura função com padrão: tl_nome → função `tl_nome` ou `mostrar` ou `nome`
-        func = None
+@st.cache_resource(show_spinner=False)
+def carregar_subtelas():
+    """Resolve as funções das subtelas uma única vez por processo (não a cada rerun)."""
+    subtelas = {}
+    for nome_modulo in MODULOS_SUBTELAS:
         chave = nome_modulo.replace('tl_', '')
+        try:
+            module = importlib.import_module(nome_modulo)
 
-        if hasattr(module, nome_modulo):
-            func = getattr(module, nome_modulo)
-        elif hasattr(module, 'mostrar'):
-            func = module.mostrar
-        elif hasattr(module, chave):
-            func = getattr(module, chave)
+            # Procura função com padrão: tl_nome → função `tl_nome` ou `mostrar` ou `nome`
+            func = None
+            if hasattr(module, nome_modulo):
+                func = getattr(module, nome_modulo)
+            elif hasattr(module, 'mostrar'):
+                func = module.mostrar
+            elif hasattr(module, chave):
+                func = getattr(module, chave)
 
-        if func:
-            SUBTELAS[chave] = func
-            logger.info(f"✅ Função '{func.__name__}' carregada de {nome_modulo}.py")
-        else:
-            logger.warning(f"⚠️ Nenhuma função encontrada em {nome_modulo}.py")
-            def erro():
-                st.error(f"❌ Falha ao carregar `{nome_modulo}.py`: função não encontrada.")
-            SUBTELAS[chave] = erro
+            if func:
+                subtelas[chave] = func
+                logger.info(f"✅ Função '{func.__name__}' carregada de {nome_modulo}.py")
+            else:
+                logger.warning(f"⚠️ Nenhuma função encontrada em {nome_modulo}.py")
+                def erro(nome_modulo=nome_modulo):
+                    st.error(f"❌ Falha ao carregar `{nome_modulo}.py`: função não encontrada.")
+                subtelas[chave] = erro
+
+        except ModuleNotFoundError:
+            logger.error(f"❌ Módulo não encontrado: {nome_modulo}.py")
+            def erro(nome_modulo=nome_modulo):
+                st.error(f"❌ Módulo não encontrado: `{nome_modulo}.py`. Verifique o nome do arquivo.")
+            subtelas[chave] = erro
+        except Exception as e:
+            logger.error(f"❌ Falha ao carregar {nome_modulo}: {e}")
+            def erro(nome_modulo=nome_modulo):
+                st.error(f"❌ Erro ao carregar `{nome_modulo}.py`")
+            subtelas[chave] = erro
+    return subtelas
 
-    except ModuleNotFoundError:
-        st.error(f"❌ Módulo não encontrado: `{nome_modulo}.py`. Verifique o nome do arquivo.")
-    except Exception as e:
-        logger.error(f"❌ Falha ao carregar {nome_modulo}: {e}")
-        def erro():
-            st.error(f"❌ Erro ao carregar `{nome_modulo}.py`")
-        SUBTELAS[nome_modulo.replace('tl_', '')] = erro
+
+SUBTELAS = carregar_subtelas()
 
 # === NAVEGAÇÃO ENTRE TELAS ===
 if st.session_state.etapa == 'login':
@@ -239,4 +282,18 @@ st.markdown(
     "<small>💼 Projeto <strong>Leonardo Pesil</strong>, desenvolvido por <strong>Cruz.devsoft</strong> | © 2025</small>"
     "</center>",
     unsafe_allow_html=True
-)
\ No newline at end of file
+)
+
+# --- MEMÓRIA: atividade e tamanho do session_state desta sessão ---
+memoria_sessao.MEMORIA.tocar(
+    memoria_sessao.sessao_atual(),
+    st.session_state.get('nome_atendente', ''),
+    st.session_state.get('loja', ''),
+    st.session_state.to_dict(),
+)
+
+# --- MEDIÇÃO: CPU por rerun completo ---
+registrar_cpu("app", (time.thread_time() - _inicio_cpu) * 1000)
+_metricas_cpu = metricas_cpu()
+if _metricas_cpu["app"]["execucoes"] % 50 == 0:
+    logger.info(f"⏱️ CPU por execução (ms): {_metricas_cpu}")
@@ -0,0 +1,156 @@
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Bibliotecas carregadas sob demanda pelas telas (ver benchmark_importacao.py);
+# no aquecimento elas são importadas antes do primeiro usuário precisar delas.
+MODULOS_PESADOS = ("pandas", "fpdf", "openpyxl", "pypdf")
+
+# Estado do processo, exibido na tela de login
+_estado: Dict = {"situacao": "aguardando", "etapa": "", "etapas": {}, "erro": "", "inicio": None, "fim": None}
+_lock = threading.Lock()
+_thread = None
+
+
+def _importar_modulos_pesados():
+    for nome in MODULOS_PESADOS:
+        try:
+            importlib.import_module(nome)
+        except ImportError as e:
+            logger.warning(f"⚠️ Aquecimento: '{nome}' indisponível ({e})")
+
+
+def _abrir_planilha():
+    # Autentica, abre a planilha e resolve Config/esquema/shards no cache do processo
+    from google_planilha import obter_planilha_compartilhada
+    return obter_planilha_compartilhada()
+
+
+def _carregar_vendedores():
+    _abrir_planilha().get_vendedores_por_loja()
+
+
+def _carregar_registros_recentes():
+    gs = _abrir_planilha()
+    if gs.sharding_ativo:
+        gs.get_all_records(anos=[datetime.now().year])
+    else:
+        # Mesma chave de cache usada pelo relatório por vendedor
+        gs.get_all_records()
+
+
+def _iniciar_snapshot():
+    # Só faz algo com SNAPSHOT_ARROW_DIR definido (vários processos atrás de um proxy)
+    _abrir_planilha().iniciar_snapshot()
+
+
+def _semear_painel():
+    # Importar o painel registra o ouvinte de gravações deste processo
+    from painel_ao_vivo import PAINEL
+    PAINEL.semear(_abrir_planilha())
+
+
+def _montar_funil():
+    from funil import FUNIL
+    FUNIL.semear(_abrir_planilha())
+
+
+def _montar_mapa_calor():
+    from mapa_calor import MAPA_CALOR
+    MAPA_CALOR.semear(_abrir_planilha())
+
+
+def _montar_ranking():
+    from ranking import RANKING
+    RANKING.semear(_abrir_planilha())
+
+
+def _agendar_fechamento():
+    # A thread só gera no horário configurado; a planilha é resolvida a cada verificação
+    from fechamento import FECHAMENTO
+    FECHAMENTO.iniciar(_abrir_planilha)
+
+
+def _montar_encaminhamentos():
+    from encaminhamentos import ENCAMINHAMENTOS
+    ENCAMINHAMENTOS.semear(_abrir_planilha())
+    ENCAMINHAMENTOS.iniciar(_abrir_planilha)
+
+
+def _preparar_pdf():
+    from pdf_encaminhamento import obter_modelo
+    obter_modelo()
+
+
+ETAPAS: List[Tuple[str, Callable[[], None]]] = [
+    ("importações", _importar_modulos_pesados),
+    ("planilha", _abrir_planilha),
+    ("vendedores", _carregar_vendedores),
+    ("registros", _carregar_registros_recentes),
+    ("snapshot", _iniciar_snapshot),
+    ("painel", _semear_painel),
+    ("funil", _montar_funil),
+    ("mapa de calor", _montar_mapa_calor),
+    ("ranking", _montar_ranking),
+    ("encaminhamentos", _montar_encaminhamentos),
+    ("pdf", _preparar_pdf),
+    ("fechamento", _agendar_fechamento),
+]
+
+
+def aquecer() -> Dict:
+    """
+    Executa as etapas em sequência, medindo cada uma. Uma etapa que falha não impede as
+    seguintes: o que não foi aquecido é carregado normalmente pela primeira sessão.
+    """
+    with _lock:
+        _estado.update(situacao="aquecendo", erro="", inicio=datetime.now().isoformat(timespec="seconds"))
+
+    falhas = []
+    for nome, etapa in ETAPAS:
+        with _lock:
+            _estado["etapa"] = nome
+        inicio = time.perf_counter()
+        try:
+            etapa()
+        except Exception as e:
+            falhas.append(f"{nome}: {e}")
+            logger.warning(f"⚠️ Aquecimento: etapa '{nome}' falhou ({e})")
+        with _lock:
+            _estado["etapas"][nome] = round((time.perf_counter() - inicio) * 1000)
+
+    with _lock:
+        _estado.update(
+            situacao="falhou" if falhas else "pronto",
+            etapa="",
+            erro="; ".join(falhas),
+            fim=datetime.now().isoformat(timespec="seconds"),
+        )
+        logger.info(f"🔥 Aquecimento {_estado['situacao']}: {_estado['etapas']} ms")
+        return dict(_estado)
+
+
+def iniciar_aquecimento() -> bool:
+    """Dispara o aquecimento em segundo plano (uma vez por processo). Retorna True se iniciou agora."""
+    global _thread
+    with _lock:
+        if _thread is not None:
+            return False
+        _thread = threading.Thread(target=aquecer, name="aquecimento", daemon=True)
+        _thread.start()
+        return True
+
+
+def estado() -> Dict:
+    with _lock:
+        return {**_estado, "etapas": dict(_estado["etapas"])}
+
+
+def pronto() -> bool:
+    with _lock:
+        return _estado["situacao"] == "pronto"
@@ -0,0 +1,117 @@
+"""
+Mede o custo de importação dos módulos do app (partida a frio do Streamlit) com `python -X importtime`.
+
+Uso:
+    python benchmark_importacao.py                    # todos os módulos, orçamento padrão
+    python benchmark_importacao.py google_planilha    # só os módulos indicados
+    python benchmark_importacao.py --detalhes 15      # mostra os 15 imports mais caros de cada módulo
+    python benchmark_importacao.py --orcamento-ms 250
+
+O Streamlit é importado antes em cada processo (o servidor já o tem carregado), então o tempo
+medido é só o que cada módulo acrescenta. Falha (código 1) se algum módulo passar do orçamento
+ou carregar na importação uma biblioteca que deveria ser carregada sob demanda.
+"""
+import argparse
+import glob
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+
+# 🔹 Orçamento por módulo (ms acrescentados à partida); ajuste após medir no servidor
+ORCAMENTO_PADRAO_MS = float(os.environ.get("ORCAMENTO_IMPORTACAO_MS", "400"))
+REPETICOES = 5
+
+# Já carregados pelo servidor antes de qualquer tela
+PRELUDIO = ("streamlit",)
+
+# Bibliotecas que só podem ser carregadas pelos caminhos que as usam
+CARGA_SOB_DEMANDA = ("googleapiclient", "fpdf", "openpyxl", "pandas", "pypdf", "pyarrow", "dateutil")
+
+MODULOS_PADRAO = ["google_planilha", "pdf_encaminhamento", "exportacao"] + sorted(
+    os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(PASTA, "tl_*.py"))
+)
+
+_LINHA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+
+def _medir(modulo: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """Importa o módulo num processo novo; retorna (ms acrescentados, [(import, ms acumulado)])."""
+    codigo = "".join(f"import {m}\n" for m in PRELUDIO) + f"import {modulo}\n"
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=PASTA, capture_output=True, text=True,
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(f"falha ao importar '{modulo}':\n{resultado.stderr.strip().splitlines()[-1]}")
+
+    linhas = [m for m in map(_LINHA.match, resultado.stderr.splitlines()) if m]
+    # Tudo depois do último import de nível superior do prelúdio pertence ao módulo medido
+    inicio = 0
+    for i, m in enumerate(linhas):
+        if len(m.group(3)) == 1 and m.group(4) in PRELUDIO:
+            inicio = i + 1
+    proprias = linhas[inicio:]
+
+    total = sum(int(m.group(2)) for m in proprias if len(m.group(3)) == 1) / 1000
+    imports = [(m.group(4), int(m.group(2)) / 1000) for m in proprias]
+    return total, imports
+
+
+def medir(modulo: str, repeticoes: int = REPETICOES) -> Dict:
+    """Mediana de várias partidas a frio; a lista de imports vem da última."""
+    tempos = []
+    for _ in range(repeticoes):
+        total, imports = _medir(modulo)
+        tempos.append(total)
+    carregados = {nome.split(".")[0] for nome, _ in imports}
+    return {
+        "modulo": modulo,
+        "mediana_ms": statistics.median(tempos),
+        "imports": sorted(imports, key=lambda i: i[1], reverse=True),
+        "indevidos": sorted(carregados.intersection(CARGA_SOB_DEMANDA)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Orçamento de tempo de importação (partida a frio).")
+    parser.add_argument("modulos", nargs="*", default=MODULOS_PADRAO)
+    parser.add_argument("--orcamento-ms", type=float, default=ORCAMENTO_PADRAO_MS)
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES)
+    parser.add_argument("--detalhes", type=int, default=0, help="quantos imports mais caros listar")
+    args = parser.parse_args()
+
+    falhas = []
+    for modulo in args.modulos:
+        try:
+            resultado = medir(modulo, args.repeticoes)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            falhas.append(modulo)
+            continue
+
+        problemas = []
+        if resultado["mediana_ms"] > args.orcamento_ms:
+            problemas.append(f"acima do orçamento de {args.orcamento_ms:.0f} ms")
+        if resultado["indevidos"]:
+            problemas.append(f"carrega na importação: {', '.join(resultado['indevidos'])}")
+
+        marca = "❌" if problemas else "✅"
+        print(f"{marca} {modulo:<24} {resultado['mediana_ms']:8.1f} ms  {'; '.join(problemas)}")
+        for nome, ms in resultado["imports"][:args.detalhes]:
+            print(f"      {ms:8.1f} ms  {nome}")
+        if problemas:
+            falhas.append(modulo)
+
+    if falhas:
+        print(f"\n❌ {len(falhas)} módulo(s) fora do orçamento: {', '.join(falhas)}")
+        sys.exit(1)
+    print("\n✅ Todos os módulos dentro do orçamento.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+from typing import Any, Callable, Dict, Hashable, Optional
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Intervalo mínimo entre consultas da versão remota (segundos)
+INTERVALO_VERIFICACAO = float(os.environ.get("INTERVALO_VERIFICACAO_PLANILHA", "30"))
+
+# 🔹 Cadastros que as gravações de atendimentos não alteram e sua validade (segundos)
+CHAVES_CADASTRO = ("config", "vendedores", "lojas")
+VALIDADE_CADASTROS = float(os.environ.get("VALIDADE_CADASTROS_PLANILHA", "300"))
+
+
+class CachePlanilha:
+    """
+    Cópias locais (registros, vendedores, Config) de uma planilha, compartilhadas pelo processo.
+    Um sinal barato (data de modificação no Drive) decide quando descartar os registros;
+    em períodos sem alteração o custo é uma única consulta pequena por intervalo.
+    Vendedores, Config e lojas sobrevivem à mudança de versão (quase sempre gravações de
+    atendimentos) e são relidos quando vencem, ou antes, quando este processo os altera.
+    """
+
+    def __init__(self, intervalo: float = INTERVALO_VERIFICACAO, validade_cadastros: float = VALIDADE_CADASTROS):
+        self.intervalo = intervalo
+        self.validade_cadastros = validade_cadastros
+        self.versao: Optional[str] = None
+        self.ultima_verificacao = 0.0
+        self.verificacoes = 0
+        self.invalidacoes = 0
+        self.gravacoes_locais = 0  # gravações deste processo desde a última versão remota vista
+        self._dados: Dict[Hashable, Any] = {}
+        self._guardado_em: Dict[Hashable, float] = {}
+        self._geracao = 0
+        self._lock = threading.Lock()
+        self._locks_carga: Dict[Hashable, threading.Lock] = {}
+
+    def verificar(self, obter_versao: Callable[[], str], forcar: bool = False) -> bool:
+        """Consulta a versão remota (no máximo uma vez por intervalo). Retorna True se mudou."""
+        with self._lock:
+            agora = time.monotonic()
+            if not forcar and agora - self.ultima_verificacao < self.intervalo:
+                return False
+            self.ultima_verificacao = agora
+            vencidos = [
+                chave for chave in CHAVES_CADASTRO
+                if chave in self._dados and agora - self._guardado_em.get(chave, agora) >= self.validade_cadastros
+            ]
+            if vencidos:
+                self._descartar(vencidos)
+
+        versao = obter_versao()
+        with self._lock:
+            self.verificacoes += 1
+            if versao == self.versao:
+                return False
+            anterior, self.versao = self.versao, versao
+            self.gravacoes_locais = 0  # a nova versão remota já inclui o que foi gravado antes
+            if anterior is not None:
+                self._descartar([chave for chave in self._dados if chave not in CHAVES_CADASTRO])
+                self.invalidacoes += 1
+                logger.info(f"🔄 Planilha alterada ({anterior} → {versao}); registros descartados.")
+            return anterior is not None
+
+    def _descartar(self, chaves) -> None:
+        """Remove as chaves (com o lock já adquirido); cargas em andamento não serão guardadas."""
+        for chave in chaves:
+            self._dados.pop(chave, None)
+            self._guardado_em.pop(chave, None)
+        self._geracao += 1
+
+    def obter(self, chave: Hashable, carregar: Callable[[], Any]) -> Any:
+        """Retorna a cópia local ou carrega uma única vez, mesmo com várias sessões pedindo juntas."""
+        with self._lock:
+            if chave in self._dados:
+                return self._dados[chave]
+            lock_carga = self._locks_carga.setdefault(chave, threading.Lock())
+
+        with lock_carga:
+            with self._lock:
+                if chave in self._dados:
+                    return self._dados[chave]
+                geracao = self._geracao
+            valor = carregar()
+            with self._lock:
+                # Se houve invalidação durante a carga, o valor já nasceu velho
+                if geracao == self._geracao:
+                    self._dados[chave] = valor
+                    self._guardado_em[chave] = time.monotonic()
+            return valor
+
+    def consultar(self, chave: Hashable, padrao: Any = None) -> Any:
+        with self._lock:
+            return self._dados.get(chave, padrao)
+
+    def guardar(self, chave: Hashable, valor: Any) -> None:
+        with self._lock:
+            self._dados[chave] = valor
+            self._guardado_em[chave] = time.monotonic()
+
+    def invalidar(self, *chaves: Hashable) -> None:
+        """Descarta as chaves indicadas (ou tudo, sem argumentos)."""
+        with self._lock:
+            self._geracao += 1
+            if not chaves:
+                self._dados.clear()
+                self._guardado_em.clear()
+                return
+            for chave in chaves:
+                self._dados.pop(chave, None)
+            # Chaves compostas, ex.: ("registros", lojas, anos)
+            for chave in [c for c in self._dados if isinstance(c, tuple) and c and c[0] in chaves]:
+                self._dados.pop(chave, None)
+
+    def marcar_gravacao_local(self) -> None:
+        """
+        Este processo gravou: descarta os registros e avança a versão local. A data de
+        modificação remota só é relida a cada intervalo; até lá, versao_local já difere.
+        """
+        self.invalidar("registros")
+        with self._lock:
+            self.gravacoes_locais += 1
+
+    @property
+    def versao_local(self) -> Optional[str]:
+        with self._lock:
+            if self.versao is None or not self.gravacoes_locais:
+                return self.versao
+            return f"{self.versao}+{self.gravacoes_locais}"
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "versao": self.versao,
+                "verificacoes": self.verificacoes,
+                "invalidacoes": self.invalidacoes,
+                "entradas": len(self._dados),
+            }
+
+
+_caches: Dict[str, CachePlanilha] = {}
+_lock_caches = threading.Lock()
+
+
+def cache_para(planilha_id: str) -> CachePlanilha:
+    with _lock_caches:
+        if planilha_id not in _caches:
+            _caches[planilha_id] = CachePlanilha()
+        return _caches[planilha_id]
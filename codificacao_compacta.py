@@ -0,0 +1,342 @@
+"""
+Representação compacta da aba 'ab_dados' para cache local e arquivos.
+
+Cada linha vira:
+- um código de evento (uint8) — o tipo de atendimento (venda com receita, conversão de reserva...);
+- um vetor int8 com os contadores (ATENDIMENTO, RECEITA, PERDA, ...) e uma máscara de bits
+  dizendo quais células estavam preenchidas ('' e '0' continuam distintos);
+- DATA como dia ordinal (int32), HORA em minutos (int16) mais os segundos (int8, só quando a
+  célula é HH:MM:SS) e textos codificados por dicionário.
+
+Qualquer célula que não caiba nesse formato vai para `excecoes` com o texto original,
+então a conversão de volta para as linhas da planilha é exata.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from datetime import date, datetime
+import io
+import json
+
+import numpy as np
+
+from registro_atendimento import COLUNAS_AB_DADOS
+
+# 🔹 Colunas de contador, na ordem do vetor int8 (bit i da máscara = coluna i)
+CONTADORES = tuple(
+    cab for campo, cab in COLUNAS_AB_DADOS
+    if campo not in ('loja', 'data', 'hora', 'vendedor', 'cliente')
+)
+INDICE_CONTADOR = {cab: i for i, cab in enumerate(CONTADORES)}
+
+COLUNA_DATA = "DATA"
+COLUNA_HORA = "HORA"
+FORMATO_DATA = "%d/%m/%Y"
+
+# Tipos de evento gravados pelas telas: contadores diferentes de zero de cada um
+EVENTOS = (
+    ("OUTRO", {}),
+    ("VENDA_RECEITA", {"ATENDIMENTO": 1, "RECEITA": 1, "VENDA": 1}),
+    ("PERDA_RECEITA", {"ATENDIMENTO": 1, "RECEITA": 1, "PERDA": 1}),
+    ("RESERVA_RECEITA", {"ATENDIMENTO": 1, "RECEITA": 1, "RESERVA": 1}),
+    ("CONVERSAO_RESERVA", {"ATENDIMENTO": 1, "VENDA": 1, "RESERVA": -1}),
+    ("DESISTENCIA_RESERVA", {"ATENDIMENTO": 1, "PERDA": 1, "RESERVA": -1}),
+    ("RETORNO_SEM_RESERVA", {"ATENDIMENTO": 1, "VENDA": 1, "PERDA": -1}),
+    ("PESQUISA", {"ATENDIMENTO": 1, "PESQUISA": 1}),
+    ("EXAME", {"ATENDIMENTO": 1, "EXAME DE VISTA": 1}),
+    ("AJUSTE", {"ATENDIMENTO": 1, "AJUSTE": 1}),
+    ("ENTREGA", {"ATENDIMENTO": 1, "ENTREGA": 1}),
+    ("GARANTIA_LENTE", {"ATENDIMENTO": 1, "GAR_LENTE": 1}),
+    ("GARANTIA_ARMACAO", {"ATENDIMENTO": 1, "GAR_ARMACAO": 1}),
+)
+NOMES_EVENTO = tuple(nome for nome, _ in EVENTOS)
+CODIGO_EVENTO = {nome: codigo for codigo, nome in enumerate(NOMES_EVENTO)}
+
+
+def _assinatura(vetor: Sequence[int]) -> Tuple[Tuple[int, int], ...]:
+    return tuple((i, int(v)) for i, v in enumerate(vetor) if v)
+
+
+_EVENTO_POR_ASSINATURA = {
+    tuple(sorted((INDICE_CONTADOR[cab], valor) for cab, valor in padrao.items())): codigo
+    for codigo, (_, padrao) in enumerate(EVENTOS) if padrao
+}
+
+
+def classificar_evento(contadores: Sequence[int]) -> int:
+    """Código do evento de um vetor de contadores na ordem de CONTADORES (0 = OUTRO)."""
+    return _EVENTO_POR_ASSINATURA.get(_assinatura(contadores), 0)
+
+
+def _texto(valor) -> str:
+    return '' if valor is None else str(valor)
+
+
+def _data_para_int(texto: str) -> Optional[int]:
+    try:
+        dia = datetime.strptime(texto, FORMATO_DATA).date()
+    except ValueError:
+        return None
+    # Só aceita se voltar idêntico (ex.: '1/2/2025' fica como exceção)
+    return dia.toordinal() if dia.strftime(FORMATO_DATA) == texto else None
+
+
+def _hora_para_int(texto: str) -> Optional[Tuple[int, int]]:
+    """'HH:MM' → (minutos, -1); 'HH:MM:SS' → (minutos, segundos); outro formato → None."""
+    partes = texto.split(":")
+    if len(partes) not in (2, 3) or any(len(p) != 2 or not p.isdigit() for p in partes):
+        return None
+    horas, minutos = int(partes[0]), int(partes[1])
+    segundos = int(partes[2]) if len(partes) == 3 else -1
+    if horas < 24 and minutos < 60 and segundos < 60:
+        return horas * 60 + minutos, segundos
+    return None
+
+
+def _hora_para_texto(minutos: int, segundos: int) -> str:
+    if minutos < 0:
+        return ''
+    texto = f"{minutos // 60:02d}:{minutos % 60:02d}"
+    return f"{texto}:{segundos:02d}" if segundos >= 0 else texto
+
+
+def _contador_para_int(texto: str) -> Optional[int]:
+    try:
+        valor = int(texto)
+    except ValueError:
+        return None
+    return valor if -128 <= valor <= 127 and str(valor) == texto else None
+
+
+class TabelaCompacta:
+    """Registros da 'ab_dados' em arrays numpy; ver docstring do módulo."""
+
+    def __init__(self, cabecalhos: Sequence[str], n: int):
+        self.cabecalhos = list(cabecalhos)
+        self.n = n
+        self.larguras = np.zeros(n, dtype=np.uint16)     # nº de células de cada linha original
+        self.evento = np.zeros(n, dtype=np.uint8)
+        self.contadores = np.zeros((n, len(CONTADORES)), dtype=np.int8)
+        self.presenca = np.zeros(n, dtype=np.uint16)      # bit i = célula do contador i preenchida
+        self.datas = np.zeros(n, dtype=np.int32)          # ordinal do dia; 0 = vazio
+        self.horas = np.full(n, -1, dtype=np.int16)       # minutos desde 00:00; -1 = vazio
+        self.segundos = np.full(n, -1, dtype=np.int8)     # segundos de HH:MM:SS; -1 = HH:MM
+        self.textos: Dict[str, Tuple[np.ndarray, List[str]]] = {}
+        self.excecoes: Dict[Tuple[int, int], str] = {}    # (linha, coluna) → texto original
+
+    # === CONVERSÃO ===
+
+    @classmethod
+    def de_linhas(cls, cabecalhos: Sequence[str], linhas: Sequence[Sequence]) -> "TabelaCompacta":
+        """Linhas no layout da planilha (sem o cabeçalho), como em get_all_values()[1:]."""
+        tabela = cls(cabecalhos, len(linhas))
+        papeis = []
+        for j, cab in enumerate(tabela.cabecalhos):
+            if cab in INDICE_CONTADOR:
+                papeis.append(("contador", INDICE_CONTADOR[cab]))
+            elif cab == COLUNA_DATA:
+                papeis.append(("data", None))
+            elif cab == COLUNA_HORA:
+                papeis.append(("hora", None))
+            else:
+                papeis.append(("texto", {}))
+
+        codigos_texto = {j: np.zeros(len(linhas), dtype=np.int32) for j, (p, _) in enumerate(papeis) if p == "texto"}
+        excecoes = tabela.excecoes
+        contadores, presenca = tabela.contadores, tabela.presenca
+
+        for i, linha in enumerate(linhas):
+            tabela.larguras[i] = len(linha)
+            for j, (papel, extra) in enumerate(papeis):
+                texto = _texto(linha[j]) if j < len(linha) else ''
+                if papel == "texto":
+                    codigos_texto[j][i] = extra.setdefault(texto, len(extra))
+                    continue
+                if texto == '':
+                    continue
+                if papel == "contador":
+                    valor = _contador_para_int(texto)
+                    if valor is None:
+                        excecoes[(i, j)] = texto
+                    else:
+                        contadores[i, extra] = valor
+                        presenca[i] |= 1 << extra
+                elif papel == "data":
+                    valor = _data_para_int(texto)
+                    if valor is None:
+                        excecoes[(i, j)] = texto
+                    else:
+                        tabela.datas[i] = valor
+                else:
+                    valor = _hora_para_int(texto)
+                    if valor is None:
+                        excecoes[(i, j)] = texto
+                    else:
+                        tabela.horas[i], tabela.segundos[i] = valor
+            # Células além do cabeçalho (raro): guardadas como estão
+            for j in range(len(papeis), len(linha)):
+                excecoes[(i, j)] = _texto(linha[j])
+
+            tabela.evento[i] = classificar_evento(contadores[i])
+
+        for j, (papel, extra) in enumerate(papeis):
+            if papel == "texto":
+                tabela.textos[tabela.cabecalhos[j]] = (codigos_texto[j], list(extra))
+        return tabela
+
+    @classmethod
+    def de_registros(cls, registros: Sequence[Dict], cabecalhos: Optional[Sequence[str]] = None) -> "TabelaCompacta":
+        """Registros como os de get_all_records() (números já convertidos voltam a texto)."""
+        if cabecalhos is None:
+            cabecalhos = list(registros[0].keys()) if registros else [cab for _, cab in COLUNAS_AB_DADOS]
+        linhas = [[_texto(r.get(cab, '')) for cab in cabecalhos] for r in registros]
+        return cls.de_linhas(cabecalhos, linhas)
+
+    def para_linhas(self) -> List[List[str]]:
+        """Reconstrói exatamente as linhas originais."""
+        colunas = []
+        for j, cab in enumerate(self.cabecalhos):
+            if cab in INDICE_CONTADOR:
+                k = INDICE_CONTADOR[cab]
+                valores = self.contadores[:, k].tolist()
+                bits = ((self.presenca >> k) & 1).tolist()
+                colunas.append([str(v) if b else '' for v, b in zip(valores, bits)])
+            elif cab == COLUNA_DATA:
+                colunas.append([date.fromordinal(d).strftime(FORMATO_DATA) if d else '' for d in self.datas.tolist()])
+            elif cab == COLUNA_HORA:
+                colunas.append([_hora_para_texto(h, s) for h, s in zip(self.horas.tolist(), self.segundos.tolist())])
+            else:
+                codigos, categorias = self.textos[cab]
+                colunas.append([categorias[c] for c in codigos.tolist()])
+
+        linhas = [list(celulas) for celulas in zip(*colunas)] if colunas else [[] for _ in range(self.n)]
+        for (i, j), texto in self.excecoes.items():
+            if j >= len(linhas[i]):
+                linhas[i].extend([''] * (j + 1 - len(linhas[i])))
+            linhas[i][j] = texto
+        for i, largura in enumerate(self.larguras.tolist()):
+            del linhas[i][largura:]
+        return linhas
+
+    def linha(self, i: int) -> List[str]:
+        """Reconstrói só a linha i (o mesmo que para_linhas()[i], sem montar a tabela inteira)."""
+        largura = int(self.larguras[i])
+        celulas = []
+        for j, cab in enumerate(self.cabecalhos[:largura]):
+            if (i, j) in self.excecoes:
+                celulas.append(self.excecoes[(i, j)])
+            elif cab in INDICE_CONTADOR:
+                k = INDICE_CONTADOR[cab]
+                celulas.append(str(int(self.contadores[i, k])) if (int(self.presenca[i]) >> k) & 1 else '')
+            elif cab == COLUNA_DATA:
+                dia = int(self.datas[i])
+                celulas.append(date.fromordinal(dia).strftime(FORMATO_DATA) if dia else '')
+            elif cab == COLUNA_HORA:
+                celulas.append(_hora_para_texto(int(self.horas[i]), int(self.segundos[i])))
+            else:
+                codigos, categorias = self.textos[cab]
+                celulas.append(categorias[codigos[i]])
+        # Células além do cabeçalho só existem nas exceções
+        for j in range(len(celulas), largura):
+            celulas.append(self.excecoes.get((i, j), ''))
+        return celulas
+
+    def para_registros(self) -> List[Dict[str, str]]:
+        return [dict(zip(self.cabecalhos, linha + [''] * (len(self.cabecalhos) - len(linha))))
+                for linha in self.para_linhas()]
+
+    # === CONSULTAS ===
+
+    def codigos(self, cabecalho: str) -> Tuple[np.ndarray, List[str]]:
+        """Códigos inteiros e categorias de uma coluna de texto (ex.: LOJA, VENDEDOR)."""
+        return self.textos[cabecalho]
+
+    def mascara(self, lojas: Optional[Iterable[str]] = None, vendedores: Optional[Iterable[str]] = None,
+                de: Optional[date] = None, ate: Optional[date] = None) -> np.ndarray:
+        selecao = np.ones(self.n, dtype=bool)
+        for cab, valores in (("LOJA", lojas), ("VENDEDOR", vendedores)):
+            if valores is None or cab not in self.textos:
+                continue
+            codigos, categorias = self.textos[cab]
+            alvo = {v.strip().upper() for v in valores}
+            aceitos = [c for c, nome in enumerate(categorias) if nome.strip().upper() in alvo]
+            selecao &= np.isin(codigos, aceitos)
+        if de is not None:
+            selecao &= self.datas >= de.toordinal()
+        if ate is not None:
+            selecao &= (self.datas <= ate.toordinal()) & (self.datas > 0)
+        return selecao
+
+    def totais(self, por: Optional[str] = None, selecao: Optional[np.ndarray] = None):
+        """
+        Soma dos contadores. Sem `por`: {contador: total}. Com `por` (coluna de texto):
+        {categoria: {contador: total}}. Tudo em aritmética inteira sobre os arrays.
+        """
+        contadores = self.contadores if selecao is None else self.contadores[selecao]
+        if por is None:
+            somas = contadores.sum(axis=0, dtype=np.int64)
+            return dict(zip(CONTADORES, somas.tolist()))
+
+        codigos, categorias = self.textos[por]
+        if selecao is not None:
+            codigos = codigos[selecao]
+        somas = np.zeros((len(categorias), len(CONTADORES)), dtype=np.int64)
+        np.add.at(somas, codigos, contadores)
+        presentes = np.bincount(codigos, minlength=len(categorias)) > 0
+        return {
+            categorias[c]: dict(zip(CONTADORES, somas[c].tolist()))
+            for c in np.flatnonzero(presentes).tolist()
+        }
+
+    def contagem_eventos(self, selecao: Optional[np.ndarray] = None) -> Dict[str, int]:
+        eventos = self.evento if selecao is None else self.evento[selecao]
+        contagem = np.bincount(eventos, minlength=len(NOMES_EVENTO))
+        return {NOMES_EVENTO[c]: int(q) for c, q in enumerate(contagem.tolist()) if q}
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.larguras, self.evento, self.contadores, self.presenca, self.datas, self.horas, self.segundos)
+        total = sum(a.nbytes for a in arrays)
+        for codigos, categorias in self.textos.values():
+            total += codigos.nbytes + sum(len(c.encode()) for c in categorias)
+        return total + sum(len(t.encode()) + 8 for t in self.excecoes.values())
+
+    # === ARQUIVO (.npz) ===
+
+    def para_bytes(self) -> bytes:
+        meta = {
+            "cabecalhos": self.cabecalhos,
+            "categorias": {cab: categorias for cab, (_, categorias) in self.textos.items()},
+            "excecoes": [[i, j, t] for (i, j), t in self.excecoes.items()],
+        }
+        arrays = {
+            "larguras": self.larguras, "evento": self.evento, "contadores": self.contadores,
+            "presenca": self.presenca, "datas": self.datas, "horas": self.horas, "segundos": self.segundos,
+            "meta": np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8),
+        }
+        for cab, (codigos, _) in self.textos.items():
+            arrays[f"texto:{cab}"] = codigos
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def de_bytes(cls, conteudo: bytes) -> "TabelaCompacta":
+        with np.load(io.BytesIO(conteudo), allow_pickle=False) as arquivo:
+            meta = json.loads(arquivo["meta"].tobytes().decode("utf-8"))
+            tabela = cls(meta["cabecalhos"], len(arquivo["evento"]))
+            for nome in ("larguras", "evento", "contadores", "presenca", "datas", "horas"):
+                setattr(tabela, nome, arquivo[nome])
+            if "segundos" in arquivo.files:  # arquivos antigos: HH:MM:SS estão nas exceções
+                tabela.segundos = arquivo["segundos"]
+            for cab, categorias in meta["categorias"].items():
+                tabela.textos[cab] = (arquivo[f"texto:{cab}"], categorias)
+        tabela.excecoes = {(i, j): t for i, j, t in meta["excecoes"]}
+        return tabela
+
+    def salvar(self, caminho: str) -> None:
+        with open(caminho, "wb") as f:
+            f.write(self.para_bytes())
+
+    @classmethod
+    def carregar(cls, caminho: str) -> "TabelaCompacta":
+        with open(caminho, "rb") as f:
+            return cls.de_bytes(f.read())
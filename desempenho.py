@@ -0,0 +1,55 @@
+from typing import Callable, Dict, Optional
+import functools
+import logging
+import threading
+import time
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Tempo de CPU por execução, agregado no processo: {nome: [execuções, total_ms, maximo_ms]}
+_medicoes: Dict[str, list] = {}
+_lock = threading.Lock()
+
+
+def registrar_cpu(nome: str, ms: float) -> None:
+    with _lock:
+        medicao = _medicoes.setdefault(nome, [0, 0.0, 0.0])
+        medicao[0] += 1
+        medicao[1] += ms
+        medicao[2] = max(medicao[2], ms)
+
+
+def metricas_cpu() -> Dict[str, Dict[str, float]]:
+    """CPU média/máxima por execução: 'app' é o rerun completo, os demais são fragmentos."""
+    with _lock:
+        return {
+            nome: {
+                "execucoes": n,
+                "media_ms": round(total / n, 2),
+                "maximo_ms": round(maximo, 2),
+            }
+            for nome, (n, total, maximo) in _medicoes.items()
+        }
+
+
+def fragmento(func: Optional[Callable] = None, *, run_every=None) -> Callable:
+    """
+    st.fragment que mede o tempo de CPU de cada execução.
+    Interagir com um widget do fragmento reexecuta só a função, não o app.py inteiro.
+    Com `run_every` (segundos), o fragmento se atualiza sozinho nesse intervalo.
+    """
+    if func is None:
+        return lambda f: fragmento(f, run_every=run_every)
+
+    @functools.wraps(func)
+    def medido(*args, **kwargs):
+        # Cada sessão roda o script na própria thread: thread_time não mistura sessões
+        inicio = time.thread_time()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            registrar_cpu(func.__qualname__, (time.thread_time() - inicio) * 1000)
+
+    return st.fragment(medido, run_every=run_every)
@@ -0,0 +1,392 @@
+"""
+Cadastro dos encaminhamentos para exame (tela tl_ex_vista), gravado na aba 'ab_encaminhamentos'.
+
+- Gravação em lote: o encaminhamento entra na hora no índice do processo e numa fila; uma
+  thread envia a fila com um único append_rows a cada INTERVALO_ENVIO segundos (ou antes, ao
+  juntar LOTE_MAXIMO). Se o Google recusar o envio antes de aplicar (cota, circuito aberto,
+  429/503), o lote vai para o buffer local em disco (encaminhamentos_pendentes.jsonl) e é
+  reenviado no ciclo seguinte; sem confirmação (timeout) ou com erro permanente, vai para
+  encaminhamentos_incertos.jsonl, para conferir à mão em vez de gravar em dobro.
+- Índice por telefone (só dígitos, sem DDI/zero à esquerda) e por nome (sem acentos/caixa):
+  quem volta é encontrado sem consultar a planilha. A aba é relida a cada INTERVALO_RECARGA
+  segundos, para ver os encaminhamentos dos outros processos.
+- Conversão: um encaminhamento vira venda quando o mesmo paciente (nome normalizado) tem uma
+  VENDA até JANELA_CONVERSAO_DIAS depois. A semeadura olha só as linhas com VENDA da tabela
+  compacta em cache; depois, as vendas novas chegam pelo ouvinte de gravações.
+"""
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import atexit
+import logging
+import os
+import re
+import threading
+import time
+
+from gspread.exceptions import APIError
+
+from google_planilha import ao_gravar
+from limitador import PRIORIDADE_PADRAO
+from lojas import normalizar_busca
+from resiliencia import BufferLocal, eh_transitorio, executar, sem_efeito
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Configuração
+ABA = "ab_encaminhamentos"
+COLUNAS = (
+    ("data", "DATA"), ("hora", "HORA"), ("loja", "LOJA"), ("vendedor", "VENDEDOR"),
+    ("paciente", "PACIENTE"), ("telefone", "TELEFONE"), ("nascimento", "NASCIMENTO"), ("tipo", "TIPO"),
+)
+CAMPOS = tuple(campo for campo, _ in COLUNAS)
+CABECALHOS = tuple(cab for _, cab in COLUNAS)
+INTERVALO_ENVIO = float(os.environ.get("ENCAMINHAMENTOS_INTERVALO", "5"))  # segundos
+INTERVALO_RECARGA = 300  # segundos entre releituras da aba
+LOTE_MAXIMO = 50
+JANELA_CONVERSAO_DIAS = 90
+MIN_DIGITOS_TELEFONE = 8
+
+BUFFER_ENCAMINHAMENTOS = BufferLocal(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "encaminhamentos_pendentes.jsonl")
+)
+# Lotes que podem ou não ter sido gravados: não são reenviados sozinhos
+BUFFER_ENCAMINHAMENTOS_INCERTOS = BufferLocal(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "encaminhamentos_incertos.jsonl")
+)
+
+_NAO_DIGITO = re.compile(r"\D")
+_ESPACOS = re.compile(r"\s+")
+
+
+def normalizar_telefone(texto: str) -> str:
+    """'+55 (74) 99999-0000' → '74999990000'. Sem dígitos suficientes, ''."""
+    digitos = _NAO_DIGITO.sub("", str(texto or ""))
+    if len(digitos) > 11 and digitos.startswith("55"):
+        digitos = digitos[2:]
+    digitos = digitos.lstrip("0")
+    return digitos if len(digitos) >= MIN_DIGITOS_TELEFONE else ""
+
+
+def normalizar_nome(texto: str) -> str:
+    return _ESPACOS.sub(" ", normalizar_busca(texto or ""))
+
+
+def _ordinal(data: str) -> int:
+    try:
+        return datetime.strptime(str(data).strip(), "%d/%m/%Y").date().toordinal()
+    except ValueError:
+        return 0
+
+
+class Encaminhamento:
+    """Uma linha da aba 'ab_encaminhamentos'."""
+
+    __slots__ = CAMPOS
+
+    def __init__(self, **campos):
+        for campo in CAMPOS:
+            setattr(self, campo, str(campos.get(campo) or "").strip())
+
+    @classmethod
+    def de_linha(cls, cabecalho: List[str], linha: List[str]) -> "Encaminhamento":
+        posicoes = {str(cab).strip().upper(): i for i, cab in enumerate(cabecalho)}
+        return cls(**{
+            campo: linha[posicoes[cab]] if posicoes.get(cab, len(linha)) < len(linha) else ""
+            for campo, cab in COLUNAS
+        })
+
+    def como_linha(self) -> List[str]:
+        return [getattr(self, campo) for campo in CAMPOS]
+
+    def como_dict(self) -> Dict[str, str]:
+        return {campo: getattr(self, campo) for campo in CAMPOS}
+
+    @property
+    def chave_telefone(self) -> str:
+        return normalizar_telefone(self.telefone)
+
+    @property
+    def chave_nome(self) -> str:
+        return normalizar_nome(self.paciente)
+
+
+class CadastroEncaminhamentos:
+    """Índice em memória + fila de gravação dos encaminhamentos; uma instância por processo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._itens: List[Encaminhamento] = []
+        self._por_telefone: Dict[str, List[int]] = {}
+        self._por_nome: Dict[str, List[int]] = {}
+        self._nomes: List[str] = []  # nomes normalizados distintos, ordenados (busca por prefixo)
+        self._vendas: Dict[Tuple[str, str], Tuple[str, str]] = {}  # (nome, data) do encaminhamento → (data, loja) da venda
+        self._fila: List[Encaminhamento] = []
+        self._enviando: List[Encaminhamento] = []  # lote do append_rows em andamento
+        self._lock_aba = threading.Lock()  # envio e releitura da aba não se cruzam
+        self._aba = None
+        self.semeado = False
+        self.carregado_em = 0.0
+        self.enviados = 0
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- Índice ---
+    def _indexar(self, item: Encaminhamento) -> int:
+        indice = len(self._itens)
+        self._itens.append(item)
+        if item.chave_telefone:
+            self._por_telefone.setdefault(item.chave_telefone, []).append(indice)
+        nome = item.chave_nome
+        if nome:
+            if nome not in self._por_nome:
+                insort(self._nomes, nome)
+            self._por_nome.setdefault(nome, []).append(indice)
+        return indice
+
+    def _reconstruir(self, itens: List[Encaminhamento]) -> None:
+        self._itens, self._por_telefone, self._por_nome, self._nomes, self._vendas = [], {}, {}, [], {}
+        for item in itens:
+            self._indexar(item)
+
+    def _abrir_aba(self, planilha):
+        if self._aba is None:
+            abas = {aba.title: aba for aba in executar("leitura", planilha.planilha.worksheets)}
+            aba = abas.get(ABA)
+            if aba is None:
+                try:
+                    aba = planilha.planilha.add_worksheet(ABA, rows="1000", cols=str(len(CABECALHOS)))
+                    aba.update("A1", [list(CABECALHOS)])
+                    logger.info(f"🩺 Aba '{ABA}' criada")
+                except APIError:
+                    # Outro processo criou a mesma aba ao mesmo tempo
+                    aba = planilha.planilha.worksheet(ABA)
+            self._aba = aba
+        return self._aba
+
+    def semear(self, planilha, forcar: bool = False) -> None:
+        """
+        Lê a aba inteira (uma chamada) e refaz o índice e as conversões. Fora a primeira vez,
+        só relê depois de INTERVALO_RECARGA; o que está na fila, no buffer ou sendo enviado
+        continua no índice (o envio espera a releitura terminar, e vice-versa).
+        """
+        with self._lock:
+            if self.semeado and not forcar and time.monotonic() - self.carregado_em < INTERVALO_RECARGA:
+                return
+        vendas = self._vendas_da_tabela(planilha.get_tabela_compacta())
+        with self._lock_aba:
+            linhas = executar("leitura", self._abrir_aba(planilha).get_all_values)
+            cabecalho = linhas[0] if linhas else list(CABECALHOS)
+            itens = [Encaminhamento.de_linha(cabecalho, linha) for linha in linhas[1:] if any(linha)]
+
+            with self._lock:
+                locais = [Encaminhamento(**d) for d in BUFFER_ENCAMINHAMENTOS.ler()] + self._enviando + self._fila
+                self._reconstruir(itens + locais)
+                for nome, datas in vendas.items():
+                    for data, loja in sorted(datas):
+                        self._marcar_venda(nome, data, loja)
+                self.semeado = True
+                self.carregado_em = time.monotonic()
+        logger.info(f"🩺 Encaminhamentos carregados: {len(itens)} ({len(self._vendas)} viraram venda)")
+
+    # --- Conversão em venda ---
+    def _vendas_da_tabela(self, tabela) -> Dict[str, List[Tuple[int, str]]]:
+        """Nome normalizado → [(data, loja)] das linhas com VENDA; só as vendas são percorridas."""
+        from codificacao_compacta import INDICE_CONTADOR
+
+        if "CLIENTE" not in tabela.textos or "VENDA" not in INDICE_CONTADOR:
+            return {}
+        clientes, nomes_cliente = tabela.codigos("CLIENTE")
+        lojas, nomes_loja = tabela.codigos("LOJA") if "LOJA" in tabela.textos else (None, [])
+        normalizados: Dict[int, str] = {}  # só os clientes que aparecem em vendas
+        vendas: Dict[str, List[Tuple[int, str]]] = {}
+        for i in (tabela.contadores[:, INDICE_CONTADOR["VENDA"]] > 0).nonzero()[0].tolist():
+            codigo = int(clientes[i])
+            if codigo not in normalizados:
+                normalizados[codigo] = normalizar_nome(nomes_cliente[codigo])
+            nome = normalizados[codigo]
+            if nome:
+                loja = nomes_loja[lojas[i]].strip().upper() if lojas is not None else ""
+                vendas.setdefault(nome, []).append((int(tabela.datas[i]), loja))
+        return vendas
+
+    def _marcar_venda(self, nome: str, data: int, loja: str) -> None:
+        """Marca os encaminhamentos do paciente feitos até JANELA_CONVERSAO_DIAS antes da venda."""
+        for indice in self._por_nome.get(nome, ()):
+            chave = (nome, self._itens[indice].data)
+            if chave in self._vendas:
+                continue
+            encaminhado = _ordinal(self._itens[indice].data)
+            if encaminhado and encaminhado <= data <= encaminhado + JANELA_CONVERSAO_DIAS:
+                self._vendas[chave] = (datetime.fromordinal(data).strftime("%d/%m/%Y"), loja)
+
+    def registrar_vendas(self, registros) -> None:
+        """Ouvinte de gravação: uma VENDA nova pode converter encaminhamentos do mesmo paciente."""
+        with self._lock:
+            if not self.semeado:
+                return  # a semeadura lerá estas vendas da tabela compacta
+            for registro in registros:
+                try:
+                    venda = int(str(registro.venda).strip() or 0)
+                except ValueError:
+                    continue
+                if venda <= 0:
+                    continue  # sem venda ou ajuste -1, como em _vendas_da_tabela
+                nome = normalizar_nome(registro.cliente)
+                data = _ordinal(registro.data)
+                if nome in self._por_nome and data:
+                    self._marcar_venda(nome, data, registro.loja.strip().upper())
+
+    # --- Consultas ---
+    def buscar(self, texto: str, limite: int = 5) -> List[Encaminhamento]:
+        """Por telefone (8+ dígitos, exato) ou pelo começo do nome; mais recentes primeiro."""
+        with self._lock:
+            telefone = normalizar_telefone(texto)
+            if telefone:
+                indices = list(self._por_telefone.get(telefone, ()))
+            else:
+                prefixo = normalizar_nome(texto)
+                if len(prefixo) < 3:
+                    return []
+                indices = []
+                for posicao in range(bisect_left(self._nomes, prefixo), len(self._nomes)):
+                    if not self._nomes[posicao].startswith(prefixo):
+                        break
+                    indices.extend(self._por_nome[self._nomes[posicao]])
+            indices.sort(key=lambda i: (_ordinal(self._itens[i].data), self._itens[i].hora, i), reverse=True)
+            return [self._itens[i] for i in indices[:limite]]
+
+    def venda_de(self, item: Encaminhamento) -> Optional[Tuple[str, str]]:
+        """(data, loja) da venda que converteu o encaminhamento, ou None (vale também depois de uma releitura)."""
+        with self._lock:
+            return self._vendas.get((item.chave_nome, item.data))
+
+    def conversao(self, loja: Optional[str] = None, de: Optional[int] = None, ate: Optional[int] = None) -> Dict:
+        """Encaminhamentos (filtrados por loja e datas ordinais) e quantos viraram venda."""
+        loja = loja.strip().upper() if loja else None
+        encaminhados = convertidos = 0
+        with self._lock:
+            for item in self._itens:
+                if loja and item.loja.strip().upper() != loja:
+                    continue
+                dia = _ordinal(item.data)
+                if (de and dia < de) or (ate and dia > ate):
+                    continue
+                encaminhados += 1
+                convertidos += (item.chave_nome, item.data) in self._vendas
+        return {
+            "encaminhados": encaminhados,
+            "convertidos": convertidos,
+            "taxa": convertidos / encaminhados if encaminhados else 0.0,
+        }
+
+    def do_dia(self, loja: str, data: str) -> List[Encaminhamento]:
+        """Encaminhamentos de uma loja num dia (dd/mm/aaaa), de todas as sessões, por hora."""
+        loja = loja.strip().upper()
+        with self._lock:
+            itens = [item for item in self._itens if item.data == data and item.loja.strip().upper() == loja]
+        return sorted(itens, key=lambda item: item.hora)
+
+    # --- Gravação em lote ---
+    def adicionar(self, item: Encaminhamento) -> bool:
+        """
+        Indexa na hora e põe na fila de envio. O mesmo paciente (telefone ou nome) na mesma
+        loja e no mesmo dia não é repetido. Retorna True se entrou.
+        """
+        with self._lock:
+            for indice in self._por_telefone.get(item.chave_telefone, []) + self._por_nome.get(item.chave_nome, []):
+                anterior = self._itens[indice]
+                if anterior.data == item.data and anterior.loja.strip().upper() == item.loja.strip().upper():
+                    return False
+            self._indexar(item)
+            self._fila.append(item)
+            cheia = len(self._fila) >= LOTE_MAXIMO
+        if cheia:
+            self._acordar.set()
+        return True
+
+    def pendentes(self) -> int:
+        with self._lock:
+            return len(self._fila)
+
+    def enviar(self, planilha) -> int:
+        """Envia a fila e o buffer em disco com um append_rows. Retorna quantos foram gravados."""
+        with self._lock:
+            lote, self._fila = self._fila, []
+            lote = [Encaminhamento(**d) for d in BUFFER_ENCAMINHAMENTOS.retirar_todos()] + lote
+            self._enviando = lote
+        if not lote:
+            return 0
+        with self._lock_aba:
+            try:
+                executar(
+                    "escrita",
+                    self._abrir_aba(planilha).append_rows,
+                    [item.como_linha() for item in lote],
+                    value_input_option="RAW",  # telefone e datas como texto
+                    idempotente=False,
+                    prioridade=PRIORIDADE_PADRAO,
+                )
+            except Exception as e:
+                self._guardar_falha(lote, e)
+                return 0
+            finally:
+                with self._lock:
+                    self._enviando = []
+        self.enviados += len(lote)
+        logger.info(f"🩺 {len(lote)} encaminhamentos gravados em '{ABA}'")
+        return len(lote)
+
+    def _guardar_falha(self, lote: List[Encaminhamento], erro: Exception) -> None:
+        """Só volta para a fila o que certamente não foi aplicado; o resto iria em dobro."""
+        if sem_efeito(erro):
+            for item in lote:
+                BUFFER_ENCAMINHAMENTOS.adicionar(item.como_dict())
+            logger.warning(f"⚠️ Encaminhamentos não enviados ({len(lote)}), guardados localmente: {erro}")
+            return
+        for item in lote:
+            BUFFER_ENCAMINHAMENTOS_INCERTOS.adicionar(item.como_dict())
+        self._aba = None  # a aba pode ter sido apagada ou trocada: reabre no próximo envio
+        situacao = "sem confirmação" if eh_transitorio(erro) else "recusados"
+        logger.error(
+            f"❌ {len(lote)} encaminhamentos {situacao} ({erro}); conferir {BUFFER_ENCAMINHAMENTOS_INCERTOS.caminho}"
+        )
+
+    def _guardar_fila(self) -> None:
+        """Na saída do processo, o que ainda está na fila vai para o buffer em disco."""
+        with self._lock:
+            lote, self._fila = self._fila, []
+        for item in lote:
+            BUFFER_ENCAMINHAMENTOS.adicionar(item.como_dict())
+
+    def _executar(self, obter_planilha):
+        while not self._parar.is_set():
+            self._acordar.wait(INTERVALO_ENVIO)
+            self._acordar.clear()
+            try:
+                planilha = obter_planilha()
+                self.enviar(planilha)
+                self.semear(planilha)  # só relê depois de INTERVALO_RECARGA
+            except Exception as e:
+                logger.warning(f"⚠️ Falha no envio dos encaminhamentos: {e}")
+
+    def iniciar(self, obter_planilha) -> bool:
+        """Inicia a thread de envio uma vez por processo. Retorna True se iniciou agora."""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._thread = threading.Thread(
+                target=self._executar, args=(obter_planilha,), name="encaminhamentos", daemon=True
+            )
+            self._thread.start()
+        atexit.register(self._guardar_fila)
+        return True
+
+    def parar(self) -> None:
+        self._parar.set()
+        self._acordar.set()
+
+
+ENCAMINHAMENTOS = CadastroEncaminhamentos()
+ao_gravar(ENCAMINHAMENTOS.registrar_vendas)
@@ -0,0 +1,113 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import json
+import threading
+
+from registro_atendimento import COLUNAS_AB_DADOS, CABECALHOS, RegistroAtendimento
+
+# 🔹 Chaves do registro de esquema na aba 'Config' (coluna A = chave, coluna B = valor)
+CHAVE_VERSAO = "schema_versao"
+CHAVE_COLUNAS = "schema_colunas"
+
+# Campo do registro → cabeçalho. Colunas opcionais só são gravadas se existirem na planilha.
+CABECALHO_POR_CAMPO = dict(COLUNAS_AB_DADOS)
+CABECALHO_POR_CAMPO['atendente'] = 'ATENDENTE'
+CAMPO_POR_CABECALHO = {cab: campo for campo, cab in CABECALHO_POR_CAMPO.items()}
+
+# Colunas sem as quais a aba não serve para registrar atendimentos
+CABECALHOS_OBRIGATORIOS = ('LOJA', 'DATA', 'HORA', 'VENDEDOR', 'CLIENTE')
+
+
+class Esquema:
+    """Mapa de colunas da aba 'ab_dados' (cabeçalho → posição), versionado na aba 'Config'."""
+
+    def __init__(self, cabecalhos: Sequence[str], versao: int = 1):
+        self.versao = versao
+        self.cabecalhos = [str(c).strip() for c in cabecalhos]
+        self.colunas = {cab: i for i, cab in enumerate(self.cabecalhos) if cab}
+        # Pré-calcula (posição, campo) para gravar sem procurar coluna a cada linha
+        self._posicoes = [
+            (self.colunas[cab], campo)
+            for campo, cab in CABECALHO_POR_CAMPO.items()
+            if cab in self.colunas
+        ]
+        self.largura = max(self.colunas.values(), default=-1) + 1
+
+    @property
+    def faltantes(self) -> List[str]:
+        return [c for c in CABECALHOS_OBRIGATORIOS if c not in self.colunas]
+
+    def indice(self, cabecalho: str) -> Optional[int]:
+        return self.colunas.get(cabecalho)
+
+    def codificar(self, registro: RegistroAtendimento) -> List[str]:
+        """Monta a linha posicionando cada campo na coluna de mesmo nome."""
+        linha = [''] * self.largura
+        for posicao, campo in self._posicoes:
+            linha[posicao] = getattr(registro, campo)
+        return linha
+
+    def codificar_lote(self, registros: Iterable[RegistroAtendimento]) -> List[List[str]]:
+        return [self.codificar(r) for r in registros]
+
+    def decodificar(self, linha: Sequence) -> Dict[str, str]:
+        """Converte uma linha crua (lista de valores) em {cabeçalho: valor}."""
+        return {
+            cab: (str(linha[i]) if i < len(linha) else '')
+            for cab, i in self.colunas.items()
+        }
+
+    def para_config(self) -> Dict[str, str]:
+        return {
+            CHAVE_VERSAO: str(self.versao),
+            CHAVE_COLUNAS: json.dumps(self.cabecalhos, ensure_ascii=False),
+        }
+
+    @classmethod
+    def de_config(cls, config: Dict[str, str]) -> Optional["Esquema"]:
+        try:
+            cabecalhos = json.loads(config[CHAVE_COLUNAS])
+            return cls(cabecalhos, int(config.get(CHAVE_VERSAO) or 1))
+        except (KeyError, ValueError, TypeError):
+            return None
+
+
+def esquema_padrao() -> Esquema:
+    return Esquema(CABECALHOS)
+
+
+# === CACHE POR PROCESSO ===
+# Verificado uma vez por planilha; as sessões seguintes reutilizam sem nenhuma leitura.
+_esquemas: Dict[str, Esquema] = {}
+_lock_esquemas = threading.Lock()
+
+
+def obter_esquema_em_cache(planilha_id: str) -> Optional[Esquema]:
+    with _lock_esquemas:
+        return _esquemas.get(planilha_id)
+
+
+def guardar_esquema(planilha_id: str, esquema: Esquema) -> None:
+    with _lock_esquemas:
+        _esquemas[planilha_id] = esquema
+
+
+def invalidar_esquema(planilha_id: str) -> None:
+    with _lock_esquemas:
+        _esquemas.pop(planilha_id, None)
+
+
+def reconciliar(registrado: Optional[Esquema], cabecalhos_planilha: Sequence[str]) -> Tuple[Esquema, bool]:
+    """
+    Compara o esquema registrado com a linha de cabeçalho real.
+    Retorna (esquema vigente, precisa_gravar_no_config).
+    """
+    cabecalhos = [str(c).strip() for c in cabecalhos_planilha]
+    if not any(cabecalhos):
+        return registrado or esquema_padrao(), registrado is None
+
+    if registrado is None:
+        return Esquema(cabecalhos, 1), True
+    if registrado.cabecalhos == cabecalhos:
+        return registrado, False
+    # Coluna adicionada/movida na planilha: nova versão, sem migrar dados
+    return Esquema(cabecalhos, registrado.versao + 1), True
@@ -0,0 +1,137 @@
+from collections import OrderedDict
+from io import BytesIO, StringIO
+from typing import Callable, Iterable, List, Sequence, Tuple
+import csv
+import threading
+
+# 🔹 Formatos suportados: extensão, MIME e rótulo exibido na tela
+FORMATOS = {
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "Excel (.xlsx)"),
+    "csv": ("csv", "text/csv", "CSV (.csv)"),
+    "parquet": ("parquet", "application/vnd.apache.parquet", "Parquet (.parquet)"),
+    "pdf": ("pdf", "application/pdf", "PDF (.pdf)"),
+}
+MAX_ARTEFATOS_EM_CACHE = 32
+
+# Cache de artefatos compartilhado por todas as sessões do processo
+_cache_artefatos: "OrderedDict[Tuple, bytes]" = OrderedDict()
+_lock_cache = threading.Lock()
+
+
+def _gerar_xlsx(colunas: Sequence[str], linhas: Iterable[Sequence]) -> bytes:
+    """Gera xlsx em modo write-only: as linhas são gravadas em fluxo, sem montar a planilha em memória."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Relatorio")
+    ws.append(list(colunas))
+    for linha in linhas:
+        ws.append(list(linha))
+    buffer = BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def _gerar_csv(colunas: Sequence[str], linhas: Iterable[Sequence]) -> bytes:
+    """CSV com BOM para o Excel reconhecer os acentos."""
+    buffer = StringIO()
+    escritor = csv.writer(buffer, delimiter=";")
+    escritor.writerow(colunas)
+    escritor.writerows(linhas)
+    return buffer.getvalue().encode("utf-8-sig")
+
+
+def _gerar_parquet(colunas: Sequence[str], linhas: Iterable[Sequence]) -> bytes:
+    import pandas as pd
+
+    buffer = BytesIO()
+    pd.DataFrame(list(linhas), columns=list(colunas)).to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def _gerar_pdf(colunas: Sequence[str], linhas: Iterable[Sequence], titulo: str = "") -> bytes:
+    """Tabela em A4 paisagem; larguras proporcionais ao maior texto de cada coluna."""
+    from pdf_encaminhamento import obter_modelo
+
+    linhas = [["" if v is None else str(v) for v in linha] for linha in linhas]
+    modelo = obter_modelo()  # mesmas fontes (Unicode ou core) do encaminhamento
+    texto = modelo.adaptar
+    pdf = modelo.novo_documento()
+    pdf.add_page(orientation="L")
+
+    if titulo:
+        pdf.set_font(modelo.familia, "B", 13)
+        pdf.cell(0, 9, texto(titulo), new_x="LMARGIN", new_y="NEXT")
+        pdf.ln(2)
+
+    maiores = [max([len(str(c))] + [len(linha[i]) for linha in linhas if i < len(linha)]) for i, c in enumerate(colunas)]
+    total = sum(min(m, 40) + 2 for m in maiores)
+    larguras = [pdf.epw * (min(m, 40) + 2) / total for m in maiores]
+
+    def cabecalho():
+        pdf.set_font(modelo.familia, "B", 9)
+        pdf.set_fill_color(230, 230, 230)
+        for largura, coluna in zip(larguras, colunas):
+            pdf.cell(largura, 7, texto(str(coluna)), border=1, fill=True)
+        pdf.ln()
+        pdf.set_font(modelo.familia, "", 8)
+
+    cabecalho()
+    for linha in linhas:
+        if pdf.will_page_break(6):
+            pdf.add_page(orientation="L")
+            cabecalho()
+        for largura, valor in zip(larguras, linha):
+            pdf.cell(largura, 6, texto(valor[:60]), border=1)
+        pdf.ln()
+    return bytes(pdf.output())
+
+
+_GERADORES = {
+    "xlsx": _gerar_xlsx,
+    "csv": _gerar_csv,
+    "parquet": _gerar_parquet,
+    "pdf": _gerar_pdf,
+}
+
+
+def gerar_arquivo(colunas: Sequence[str], linhas: Iterable[Sequence], formato: str, titulo: str = "") -> bytes:
+    """Gera o arquivo no formato pedido. O título só aparece no PDF."""
+    if formato not in _GERADORES:
+        raise ValueError(f"Formato não suportado: {formato}")
+    if formato == "pdf":
+        return _gerar_pdf(colunas, linhas, titulo)
+    return _GERADORES[formato](colunas, linhas)
+
+
+def obter_artefato(
+    chave: Tuple,
+    formato: str,
+    produtor: Callable[[], Tuple[List[str], Iterable[Sequence]]],
+    titulo: str = "",
+) -> bytes:
+    """
+    Retorna o arquivo do cache ou o gera sob demanda.
+    `chave` deve identificar os dados (ex.: loja, vendedor, período, versão dos dados);
+    `produtor` só é chamado quando o artefato ainda não existe.
+    """
+    chave_cache = tuple(chave) + (formato,)
+    with _lock_cache:
+        if chave_cache in _cache_artefatos:
+            _cache_artefatos.move_to_end(chave_cache)
+            return _cache_artefatos[chave_cache]
+
+    colunas, linhas = produtor()
+    conteudo = gerar_arquivo(colunas, linhas, formato, titulo)
+
+    with _lock_cache:
+        _cache_artefatos[chave_cache] = conteudo
+        _cache_artefatos.move_to_end(chave_cache)
+        while len(_cache_artefatos) > MAX_ARTEFATOS_EM_CACHE:
+            _cache_artefatos.popitem(last=False)
+    return conteudo
+
+
+def limpar_cache():
+    with _lock_cache:
+        _cache_artefatos.clear()
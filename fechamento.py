@@ -0,0 +1,341 @@
+"""
+Relatório de fechamento do dia por loja, gerado em segundo plano.
+
+No horário configurado (FECHAMENTO_HORARIO, horário de São Paulo) uma thread monta o resumo
+do dia de cada loja — uma linha por vendedor com os totais — a partir dos registros já em
+cache no processo, gera o PDF e o xlsx uma única vez e grava em FECHAMENTO_DIR/<aaaa-mm-dd>/.
+A tela tl_fechamento só entrega esses arquivos: baixar o fechamento não disputa CPU nem
+leituras da planilha com os registros feitos no fim do expediente.
+
+Se o servidor subir depois do horário, o fechamento do dia é gerado na primeira verificação.
+Registros do dia gravados depois da geração (ouvinte de gravações) fazem o dia ser refeito
+quando a loja passa FECHAMENTO_CARENCIA segundos sem gravar nele.
+
+Com vários processos, só o que conseguir o lock da pasta gera; os outros encontram o dia
+pronto. Cada geração grava numa subpasta nova (<aaaa-mm-dd>/<versão>/) e só no fim troca o
+marcador do dia, que aponta a versão atual (temporário + os.replace): a tela nunca lê uma
+pasta pela metade, e a versão anterior fica até a geração seguinte para quem ainda a lia.
+"""
+from contextlib import contextmanager
+from datetime import date, datetime, time as hora_do_dia, timedelta
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+
+import motor_relatorio
+from google_planilha import ao_gravar
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos (a troca dos arquivos continua atômica)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Configuração
+FUSO = ZoneInfo("America/Sao_Paulo")
+HORARIO = os.environ.get("FECHAMENTO_HORARIO", "19:00")  # HH:MM
+DIRETORIO = os.environ.get("FECHAMENTO_DIR", "fechamentos")
+DIAS_GUARDADOS = int(os.environ.get("FECHAMENTO_DIAS", "90"))  # pastas mais antigas são apagadas
+INTERVALO = 60  # segundos entre verificações do horário
+FORMATOS_FECHAMENTO = ("pdf", "xlsx")
+COLUNAS_FECHAMENTO = ("VENDEDOR",) + motor_relatorio.COLUNAS_NUMERICAS
+MARCADOR = "_concluido.json"
+DIAS_EM_MEMORIA = 7  # dias cujos arquivos ficam também na memória do processo
+CARENCIA = int(os.environ.get("FECHAMENTO_CARENCIA", "600"))  # segundos sem gravar antes de refazer
+
+_PASTA_DO_DIA = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def horario_configurado() -> hora_do_dia:
+    try:
+        return datetime.strptime(HORARIO.strip(), "%H:%M").time()
+    except ValueError:
+        logger.warning(f"⚠️ FECHAMENTO_HORARIO inválido ({HORARIO}); usando 19:00")
+        return hora_do_dia(19, 0)
+
+
+def nome_arquivo(loja: str) -> str:
+    return re.sub(r"[^\w-]+", "_", loja.strip()).strip("_") or "SEM_LOJA"
+
+
+def _pasta(dia: date) -> str:
+    return os.path.join(DIRETORIO, dia.isoformat())
+
+
+def _gravar_atomico(caminho: str, conteudo: bytes) -> None:
+    temporario = f"{caminho}.tmp{os.getpid()}"
+    with open(temporario, "wb") as f:
+        f.write(conteudo)
+    os.replace(temporario, caminho)
+
+
+@contextmanager
+def _lock_da_pasta():
+    """Lock exclusivo entre processos enquanto um fechamento é gerado. Entrega False se outro gera."""
+    if fcntl is None:
+        yield True
+        return
+    os.makedirs(DIRETORIO, exist_ok=True)
+    with open(os.path.join(DIRETORIO, ".lock"), "a") as arquivo:
+        try:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+
+
+# === RESUMO DO DIA ===
+
+def registros_do_dia(planilha, dia: date) -> List[Dict]:
+    """Registros em cache do processo (mesma chave do aquecimento e do relatório por vendedor)."""
+    if planilha.sharding_ativo:
+        return planilha.get_all_records(anos=[dia.year])
+    return planilha.get_all_records()
+
+
+def resumos_do_dia(registros: List[Dict], dia: date) -> Dict[str, motor_relatorio.Relatorio]:
+    """Loja → resumo por vendedor; lojas sem registros no dia ficam de fora."""
+    resumos = {}
+    for loja, grupo in motor_relatorio.agrupar_por_loja(registros).items():
+        relatorio = motor_relatorio.montar(grupo, loja=loja, de=dia, ate=dia, colunas=COLUNAS_FECHAMENTO)
+        if relatorio.linhas:
+            resumos[loja] = motor_relatorio.resumir(
+                relatorio, "VENDEDOR", f"Fechamento {loja} — {dia.strftime('%d/%m/%Y')}"
+            )
+    return resumos
+
+
+class Fechamento:
+    """Gera, guarda e entrega os arquivos de fechamento; uma instância por processo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()        # protege estado e memória
+        self._lock_geracao = threading.Lock()  # uma geração por vez no processo
+        self._memoria: Dict[Tuple[str, str, str, str], bytes] = {}  # (dia, versão, loja, formato)
+        self._gravacoes: Dict[str, float] = {}  # dia ISO → hora (epoch) da última gravação nele
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._estado: Dict = {"situacao": "aguardando", "ultimo_dia": "", "gerado_em": "", "lojas": 0,
+                              "segundos": 0.0, "erro": ""}
+
+    # --- Geração ---
+    def concluido(self, dia: date) -> bool:
+        return os.path.exists(os.path.join(_pasta(dia), MARCADOR))
+
+    def gerar(self, planilha, dia: Optional[date] = None, forcar: bool = False) -> bool:
+        """
+        Gera o fechamento do dia (padrão: hoje). Sem `forcar`, não refaz um dia concluído.
+        Retorna True se gerou; False se já estava pronto ou outro processo está gerando.
+        """
+        dia = dia or datetime.now(FUSO).date()
+        if not self._lock_geracao.acquire(blocking=False):
+            return False
+        try:
+            with _lock_da_pasta() as eleito:
+                if not eleito or (self.concluido(dia) and not forcar):
+                    return False
+                with self._lock:
+                    self._estado.update(situacao="gerando", erro="")
+                inicio = time.perf_counter()
+                try:
+                    lojas = self._gerar_arquivos(planilha, dia)
+                except Exception as e:
+                    with self._lock:
+                        self._estado.update(situacao="falhou", erro=str(e))
+                    raise
+                segundos = round(time.perf_counter() - inicio, 2)
+                with self._lock:
+                    self._estado.update(
+                        situacao="pronto", ultimo_dia=dia.isoformat(), lojas=lojas, segundos=segundos,
+                        gerado_em=datetime.now(FUSO).isoformat(timespec="seconds"),
+                    )
+                logger.info(f"🧾 Fechamento de {dia.strftime('%d/%m/%Y')}: {lojas} lojas em {segundos} s")
+                self._limpar_antigos(dia)
+                return True
+        finally:
+            self._lock_geracao.release()
+
+    def _gerar_arquivos(self, planilha, dia: date) -> int:
+        lido_em = time.time()  # gravações depois disto podem não estar nos registros lidos
+        resumos = resumos_do_dia(registros_do_dia(planilha, dia), dia)
+        pasta = _pasta(dia)
+        anterior = self.indice(dia.isoformat()).get("versao", "")
+        versao = f"{datetime.now(FUSO).strftime('%Y%m%dT%H%M%S%f')}_{os.getpid()}"
+        os.makedirs(os.path.join(pasta, versao))
+
+        gerados = {}
+        for loja, resumo in sorted(resumos.items()):
+            for formato in FORMATOS_FECHAMENTO:
+                conteudo = resumo.gerar(formato)
+                _gravar_atomico(os.path.join(pasta, versao, f"{nome_arquivo(loja)}.{formato}"), conteudo)
+                gerados[(dia.isoformat(), versao, loja, formato)] = conteudo
+
+        indice = {
+            "dia": dia.isoformat(),
+            "versao": versao,
+            "lido_em": lido_em,
+            "gerado_em": datetime.now(FUSO).isoformat(timespec="seconds"),
+            "lojas": {loja: nome_arquivo(loja) for loja in sorted(resumos)},
+            "totais": {loja: resumo.totais for loja, resumo in resumos.items()},
+        }
+        # A troca: a partir daqui a tela lê a versão nova
+        _gravar_atomico(os.path.join(pasta, MARCADOR), json.dumps(indice, ensure_ascii=False).encode("utf-8"))
+        _limpar_versoes(pasta, manter={versao, anterior})
+
+        with self._lock:
+            for chave in [c for c in self._memoria if c[0] == dia.isoformat()]:
+                del self._memoria[chave]
+            self._memoria.update(gerados)
+            self._podar_memoria()
+        return len(resumos)
+
+    def _limpar_antigos(self, hoje: date) -> None:
+        limite = (hoje - timedelta(days=DIAS_GUARDADOS)).isoformat()
+        for nome in self.dias():
+            if nome < limite:
+                shutil.rmtree(os.path.join(DIRETORIO, nome), ignore_errors=True)
+
+    def _podar_memoria(self) -> None:
+        manter = sorted({c[0] for c in self._memoria}, reverse=True)[:DIAS_EM_MEMORIA]
+        for chave in [c for c in self._memoria if c[0] not in manter]:
+            del self._memoria[chave]
+
+    # --- Consulta (tela) ---
+    def dias(self) -> List[str]:
+        """Dias concluídos (aaaa-mm-dd), do mais recente ao mais antigo."""
+        if not os.path.isdir(DIRETORIO):
+            return []
+        return sorted(
+            (nome for nome in os.listdir(DIRETORIO)
+             if _PASTA_DO_DIA.match(nome) and os.path.exists(os.path.join(DIRETORIO, nome, MARCADOR))),
+            reverse=True,
+        )
+
+    def indice(self, dia: str) -> Dict:
+        """Lojas, totais e horário de geração de um dia concluído ({} se não houver)."""
+        try:
+            with open(os.path.join(DIRETORIO, dia, MARCADOR), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def arquivo(self, dia: str, loja: str, formato: str, versao: Optional[str] = None) -> Optional[bytes]:
+        """
+        Conteúdo pronto do fechamento na versão indicada (padrão: a do índice atual);
+        lido do disco na primeira vez e mantido em memória.
+        """
+        if versao is None:
+            versao = self.indice(dia).get("versao", "")
+        chave = (dia, versao, loja.strip().upper(), formato)
+        with self._lock:
+            if chave in self._memoria:
+                return self._memoria[chave]
+        # Dias gerados antes das versões têm os arquivos direto na pasta do dia (versao == "")
+        caminho = os.path.join(DIRETORIO, dia, versao, f"{nome_arquivo(chave[2])}.{formato}")
+        try:
+            with open(caminho, "rb") as f:
+                conteudo = f.read()
+        except OSError:
+            return None
+        with self._lock:
+            self._memoria[chave] = conteudo
+            self._podar_memoria()
+        return conteudo
+
+    def estado(self) -> Dict:
+        with self._lock:
+            return {**self._estado, "horario": horario_configurado().strftime("%H:%M"), "diretorio": DIRETORIO,
+                    "carencia": CARENCIA}
+
+    # --- Agendamento ---
+    def registrar(self, registros) -> None:
+        """Ouvinte de gravação: guarda a hora da última gravação de cada dia."""
+        agora = time.time()
+        with self._lock:
+            for registro in registros:
+                try:
+                    dia = datetime.strptime(registro.data, "%d/%m/%Y").date().isoformat()
+                except ValueError:
+                    continue
+                self._gravacoes[dia] = agora
+
+    def verificar(self, planilha, agora: Optional[datetime] = None) -> bool:
+        """
+        Gera o fechamento de hoje se o horário já passou e ele ainda não existe; senão refaz
+        um dia pronto que recebeu gravações depois da geração, passada a carência.
+        """
+        agora = agora or datetime.now(FUSO)
+        if agora.time() >= horario_configurado() and not self.concluido(agora.date()):
+            return self.gerar(planilha, agora.date())
+        return self._refazer_atrasado(planilha, agora.date())
+
+    def _refazer_atrasado(self, planilha, hoje: date) -> bool:
+        with self._lock:
+            gravacoes = sorted(self._gravacoes.items())
+        for dia, ultima in gravacoes:
+            indice = self.indice(dia)
+            if not indice or indice.get("lido_em", 0) >= ultima:
+                # Ainda não gerado (entra na geração normal) ou já coberto pela última geração
+                if indice or dia < hoje.isoformat():
+                    with self._lock:
+                        if self._gravacoes.get(dia) == ultima:
+                            del self._gravacoes[dia]
+                continue
+            if time.time() - ultima < CARENCIA:
+                continue
+            logger.info(f"🧾 Refazendo o fechamento de {dia}: houve registros depois da geração")
+            return self.gerar(planilha, date.fromisoformat(dia), forcar=True)
+        return False
+
+    def _executar(self, obter_planilha):
+        while not self._parar.is_set():
+            try:
+                self.verificar(obter_planilha())
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao gerar o fechamento: {e}")
+            self._parar.wait(INTERVALO)
+
+    def iniciar(self, obter_planilha) -> bool:
+        """Inicia a thread de agendamento uma vez por processo. Retorna True se iniciou agora."""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._thread = threading.Thread(
+                target=self._executar, args=(obter_planilha,), name="fechamento", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def parar(self) -> None:
+        self._parar.set()
+
+
+def _limpar_versoes(pasta: str, manter) -> None:
+    """Apaga as versões de um dia que não estão em `manter` (a atual e a anterior)."""
+    legado = "" in manter  # a anterior é a do formato antigo: arquivos soltos na pasta do dia
+    for nome in os.listdir(pasta):
+        caminho = os.path.join(pasta, nome)
+        if nome in manter or nome == MARCADOR or ".tmp" in nome:
+            continue
+        if os.path.isdir(caminho):
+            shutil.rmtree(caminho, ignore_errors=True)
+        elif not legado:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+
+FECHAMENTO = Fechamento()
+ao_gravar(FECHAMENTO.registrar)
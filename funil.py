@@ -0,0 +1,274 @@
+"""
+Funil de conversão por loja, vendedor e período, mantido de forma incremental.
+
+Etapas: ATENDIMENTO → RECEITA → VENDA / PERDA / RESERVA, mais as reservas resolvidas depois
+(conversão ou desistência em tl_reserva) e os retornos sem reserva (tl_sem_receita).
+Os totais líquidos somam os contadores como estão na planilha, então os ajustes -1
+(RESERVA=-1 ao resolver uma reserva, PERDA=-1 num retorno) já saem compensados.
+
+Cada linha soma seus contadores e o seu evento em 9 acumuladores:
+(loja, vendedor), (loja, TODOS) e (TODOS, TODOS) × mês, ano e todo o período.
+Uma consulta é uma única busca em dicionário, qualquer que seja o tamanho da planilha.
+"""
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+import threading
+import time
+
+import numpy as np
+
+from codificacao_compacta import CODIGO_EVENTO, CONTADORES, INDICE_CONTADOR, NOMES_EVENTO, classificar_evento
+from google_planilha import ao_gravar
+from registro_atendimento import COLUNAS_AB_DADOS
+from semeadura import FilaSemeadura
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Chaves especiais
+TODOS = "*"
+TODO_PERIODO = ""
+
+# Campo do RegistroAtendimento de cada contador, na ordem de CONTADORES
+_CAMPO_CONTADOR = {cab: campo for campo, cab in COLUNAS_AB_DADOS}
+CAMPOS_CONTADORES = tuple(_CAMPO_CONTADOR[cab] for cab in CONTADORES)
+
+# Acumulador: contadores (na ordem de CONTADORES) seguidos da contagem de cada evento
+_N_CONTADORES = len(CONTADORES)
+_TAMANHO = _N_CONTADORES + len(NOMES_EVENTO)
+
+Chave = Tuple[str, str, str]  # (loja, vendedor, período)
+
+
+def _nome(texto: str) -> str:
+    return str(texto).strip().upper()
+
+
+def _contador(valor) -> int:
+    try:
+        return int(str(valor).strip() or 0)
+    except ValueError:
+        return 0
+
+
+def periodos_do_dia(dia: Optional[date]) -> Tuple[str, ...]:
+    """Períodos aos quais um dia pertence: 'MM/AAAA', 'AAAA' e todo o período."""
+    if dia is None:
+        return (TODO_PERIODO,)
+    return (dia.strftime("%m/%Y"), str(dia.year), TODO_PERIODO)
+
+
+def _razao(parte: int, todo: int) -> Optional[float]:
+    return round(parte / todo, 4) if todo > 0 else None
+
+
+def etapas(soma: Sequence[int]) -> Dict[str, Optional[float]]:
+    """Converte um acumulador nas etapas do funil e nas taxas de conversão."""
+    total = lambda cab: soma[INDICE_CONTADOR[cab]]
+    evento = lambda nome: soma[_N_CONTADORES + CODIGO_EVENTO[nome]]
+
+    atendimentos = total("ATENDIMENTO")
+    com_receita = total("RECEITA")
+    vendas_receita = evento("VENDA_RECEITA")
+    conversoes = evento("CONVERSAO_RESERVA")
+    desistencias = evento("DESISTENCIA_RESERVA")
+    vendas = total("VENDA")
+    perdas = total("PERDA")
+    return {
+        "atendimentos": atendimentos,
+        "com_receita": com_receita,
+        "vendas_receita": vendas_receita,
+        "perdas_receita": evento("PERDA_RECEITA"),
+        "reservas_receita": evento("RESERVA_RECEITA"),
+        "conversoes_reserva": conversoes,
+        "desistencias_reserva": desistencias,
+        "retornos": evento("RETORNO_SEM_RESERVA"),
+        # Líquidos: já com os ajustes -1 compensados
+        "vendas": vendas,
+        "perdas": perdas,
+        "reservas_em_aberto": total("RESERVA"),
+        "taxa_receita": _razao(com_receita, atendimentos),
+        "conversao_imediata": _razao(vendas_receita, com_receita),
+        "conversao_reservas": _razao(conversoes, conversoes + desistencias),
+        "conversao_final": _razao(vendas, com_receita),
+        "taxa_perda": _razao(perdas, com_receita),
+    }
+
+
+class Funil:
+    """Acumuladores do funil no processo; ver docstring do módulo."""
+
+    def __init__(self):
+        self.semeado = False
+        self.versao = 0
+        self.versao_semeada: Optional[str] = None  # versao_dados da planilha na última semeadura
+        self.linhas = 0
+        self._somas: Dict[Chave, List[int]] = {}
+        self._vendedores: Dict[str, set] = {}  # loja → vendedores vistos
+        self._periodos: set = {TODO_PERIODO}
+        self._fila = FilaSemeadura()
+        self._lock = threading.Lock()
+
+    # === CARGA ===
+
+    def semear(self, planilha, forcar: bool = False) -> None:
+        """
+        Monta os acumuladores a partir da tabela compacta e remonta quando a planilha muda de
+        versão (gravações de outros processos, linhas removidas pelo backup) ou com `forcar`.
+        """
+        planilha.verificar_alteracoes()
+        versao = planilha.versao_dados
+        with self._lock:
+            atual = self.semeado and self.versao_semeada == versao
+            if (atual and not forcar) or self._fila.ativa:
+                return
+            self._fila.iniciar()
+
+        try:
+            inicio = time.perf_counter()
+            if forcar:
+                planilha.cache.invalidar("registros")
+            tabela = planilha.get_tabela_compacta()
+            somas, vendedores, periodos, linhas = _agregar(tabela)
+        except Exception:
+            with self._lock:
+                self._fila.cancelar()
+            raise
+
+        with self._lock:
+            self._somas, self._vendedores, self._periodos = somas, vendedores, periodos
+            self.linhas = linhas
+            # Gravações avisadas durante a carga: só as que a tabela lida ainda não tinha
+            for registro in self._fila.concluir(tabela):
+                self._adicionar(registro)
+            self.semeado, self.versao_semeada = True, versao
+            self.versao += 1
+        logger.info(
+            f"🔻 Funil montado: {linhas} linhas, {len(somas)} acumuladores "
+            f"em {(time.perf_counter() - inicio) * 1000:.0f} ms"
+        )
+
+    def registrar(self, registros: Iterable) -> None:
+        """Ouvinte de gravação: cada linha nova atualiza os 9 acumuladores dela."""
+        with self._lock:
+            if self._fila.guardar(registros):
+                return
+            if not self.semeado:
+                return  # já estão na planilha e fora do cache: a semeadura vai lê-los
+            for registro in registros:
+                self._adicionar(registro)
+            self.versao += 1
+
+    def _adicionar(self, registro) -> None:
+        valores = [_contador(getattr(registro, campo)) for campo in CAMPOS_CONTADORES]
+        valores.extend([0] * len(NOMES_EVENTO))
+        valores[_N_CONTADORES + classificar_evento(valores[:_N_CONTADORES])] = 1
+
+        try:
+            dia = datetime.strptime(registro.data, "%d/%m/%Y").date()
+        except ValueError:
+            dia = None
+        loja, vendedor = _nome(registro.loja), _nome(registro.vendedor)
+        periodos = periodos_do_dia(dia)
+        for chave in _chaves(loja, vendedor, periodos):
+            soma = self._somas.setdefault(chave, [0] * _TAMANHO)
+            for i, valor in enumerate(valores):
+                if valor:
+                    soma[i] += valor
+        self._vendedores.setdefault(loja, set()).add(vendedor)
+        self._periodos.update(periodos)
+        self.linhas += 1
+
+    # === CONSULTAS ===
+
+    def consultar(self, loja: str = TODOS, vendedor: str = TODOS,
+                  periodo: str = TODO_PERIODO) -> Dict[str, Optional[float]]:
+        """Funil de uma loja/vendedor num período ('MM/AAAA', 'AAAA' ou '' = tudo)."""
+        chave = (_nome(loja), _nome(vendedor), periodo)
+        with self._lock:
+            soma = list(self._somas.get(chave, ()))
+        return etapas(soma or [0] * _TAMANHO)
+
+    def lojas(self) -> List[str]:
+        with self._lock:
+            return sorted(self._vendedores)
+
+    def vendedores(self, loja: str) -> List[str]:
+        with self._lock:
+            return sorted(self._vendedores.get(_nome(loja), ()))
+
+    def periodos(self) -> List[str]:
+        """Períodos com movimento, do mais recente para o mais antigo (cada ano antes dos seus meses)."""
+        def ordem(periodo: str):
+            if not periodo:
+                return (0, 0, 0)
+            if "/" in periodo:
+                mes, ano = periodo.split("/")
+                return (int(ano), int(mes), 1)
+            return (int(periodo), 13, 0)
+
+        with self._lock:
+            return sorted(self._periodos, key=ordem, reverse=True)
+
+
+def _chaves(loja: str, vendedor: str, periodos: Sequence[str]) -> List[Chave]:
+    return [(l, v, p) for p in periodos for l, v in ((loja, vendedor), (loja, TODOS), (TODOS, TODOS))]
+
+
+def _agregar(tabela) -> Tuple[Dict[Chave, List[int]], Dict[str, set], set, int]:
+    """Agrega a tabela inteira nos acumuladores com numpy (um np.add.at por nível)."""
+    n = tabela.n
+    somas: Dict[Chave, List[int]] = {}
+    vendedores: Dict[str, set] = {}
+    periodos = {TODO_PERIODO}
+    if n == 0 or "LOJA" not in tabela.textos or "VENDEDOR" not in tabela.textos:
+        return somas, vendedores, periodos, n
+
+    valores = np.zeros((n, _TAMANHO), dtype=np.int64)
+    valores[:, :_N_CONTADORES] = tabela.contadores
+    valores[np.arange(n), _N_CONTADORES + tabela.evento.astype(np.int64)] = 1
+
+    # Nomes normalizados: 'Loja X' e 'LOJA X ' caem no mesmo acumulador
+    nomes = {}
+    codigos = {}
+    for cab in ("LOJA", "VENDEDOR"):
+        brutos, categorias = tabela.codigos(cab)
+        normalizados = [_nome(c) for c in categorias]
+        nomes[cab] = sorted(set(normalizados)) + [TODOS]
+        posicao = {nome: i for i, nome in enumerate(nomes[cab])}
+        codigos[cab] = np.array([posicao[nome] for nome in normalizados], dtype=np.int64)[brutos]
+    lojas, vends = codigos["LOJA"], codigos["VENDEDOR"]
+    todos_loja = np.full(n, len(nomes["LOJA"]) - 1)
+    todos_vend = np.full(n, len(nomes["VENDEDOR"]) - 1)
+
+    # Períodos: cada dia distinto é convertido uma vez
+    dias, inverso = np.unique(tabela.datas, return_inverse=True)
+    rotulos = [periodos_do_dia(date.fromordinal(int(d)) if d > 0 else None) for d in dias.tolist()]
+    nomes_periodo = sorted({p for r in rotulos for p in r})
+    posicao_periodo = {p: i for i, p in enumerate(nomes_periodo)}
+    sem_periodo = -1
+    mes = np.array([posicao_periodo[r[0]] if len(r) == 3 else sem_periodo for r in rotulos], dtype=np.int64)[inverso]
+    ano = np.array([posicao_periodo[r[1]] if len(r) == 3 else sem_periodo for r in rotulos], dtype=np.int64)[inverso]
+    tudo = np.full(n, posicao_periodo[TODO_PERIODO])
+
+    for coluna_loja, coluna_vend in ((lojas, vends), (lojas, todos_vend), (todos_loja, todos_vend)):
+        for coluna_periodo in (mes, ano, tudo):
+            validas = coluna_periodo != sem_periodo
+            grupos = np.stack((coluna_loja[validas], coluna_vend[validas], coluna_periodo[validas]), axis=1)
+            if not len(grupos):
+                continue
+            unicos, indices = np.unique(grupos, axis=0, return_inverse=True)
+            acumulado = np.zeros((len(unicos), _TAMANHO), dtype=np.int64)
+            np.add.at(acumulado, indices.reshape(-1), valores[validas])
+            for (l, v, p), soma in zip(unicos.tolist(), acumulado.tolist()):
+                somas[(nomes["LOJA"][l], nomes["VENDEDOR"][v], nomes_periodo[p])] = soma
+
+    for l, v in set(zip(lojas.tolist(), vends.tolist())):
+        vendedores.setdefault(nomes["LOJA"][l], set()).add(nomes["VENDEDOR"][v])
+    periodos.update(nomes_periodo)
+    return somas, vendedores, periodos, n
+
+
+# === FUNIL DO PROCESSO ===
+FUNIL = Funil()
+ao_gravar(FUNIL.registrar)
@@ -1,24 +1,38 @@
 import gspread
 from gspread.exceptions import APIError, SpreadsheetNotFound, WorksheetNotFound
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
-from google.oauth2 import service_account
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Union
 import streamlit as st
 import os
 import json
-import pandas as pd
-from io import BytesIO
-from datetime import datetime, timedelta
+from datetime import datetime
 from zoneinfo import ZoneInfo
-from dateutil import parser
 import re
+import csv
+import io
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from registro_atendimento import RegistroAtendimento, como_registro
+import esquema as registro_esquema
+from cache_planilha import cache_para
+from limitador import PRIORIDADE_BACKUP, PRIORIDADE_REGISTRO, PRIORIDADE_RELATORIO
+from resiliencia import BufferLocal, configurar_timeout_http, eh_transitorio, executar, sem_efeito
+from lojas import CadastroLojas
+from shards import CHAVE_SHARDING_ATIVO, DiretorioShards, ano_do_registro, nome_aba_shard
 
 # 🔹 Constantes
 SPREADSHEET_NAME = "fluxo de loja"
+SPREADSHEET_ID = os.environ.get("SPREADSHEET_ID", "")  # se definido, evita a busca por nome no Drive
 BACKUP_AGE_DAYS = 3 * 365.25  # 3 anos
 CLEANUP_BACKUP_OLDER_THAN_DAYS = 5 * 365.25  # 5 anos
 DEFAULT_TIMEZONE = ZoneInfo("America/Sao_Paulo")
+MAX_LEITURAS_PARALELAS = 8
+
+# Backup: intervalo exportado e reserva entre processos (chaves da aba 'Config')
+CHAVE_BACKUP_INTERVALO = "backup_ultimo_intervalo"
+CHAVE_BACKUP_RESERVA = "backup_em_andamento"
+RESERVA_BACKUP_SEGUNDOS = 3600
 
 # ✅ Escopos CORRETOS — SEM ESPAÇOS!
 SCOPES_SHEETS = [
@@ -29,6 +43,81 @@ SCOPES_DRIVE = [
     'https://www.googleapis.com/auth/drive'
 ]
 
+logger = logging.getLogger(__name__)
+
+# Registros que não puderam ser enviados (Google fora do ar) aguardam aqui
+BUFFER_PENDENTES = BufferLocal(os.path.join(os.path.dirname(os.path.abspath(__file__)), "registros_pendentes.jsonl"))
+# Reenvios sem confirmação (timeout/5xx): podem ter sido gravados; ficam para conferência manual
+BUFFER_INCERTOS = BufferLocal(os.path.join(os.path.dirname(os.path.abspath(__file__)), "registros_incertos.jsonl"))
+
+# Um backup por processo (rodar_backup_automatico); o estado aparece na tela tl_memoria
+_LOCK_BACKUP = threading.Lock()
+_ESTADO_BACKUP: Dict[str, object] = {"situacao": "ocioso"}
+
+
+def estado_backup() -> Dict[str, object]:
+    return dict(_ESTADO_BACKUP)
+
+
+class _PlanilhaAberta(gspread.Spreadsheet):
+    """
+    O gspread lê os metadados ao abrir a planilha e de novo em worksheets();
+    aqui as abas da leitura de abertura ficam guardadas em `abas_abertura`.
+    """
+
+    def fetch_sheet_metadata(self, params=None):
+        metadados = super().fetch_sheet_metadata(params)
+        if params is None and not hasattr(self, "abas_abertura"):
+            self.abas_abertura = [
+                gspread.Worksheet(self, aba["properties"], self.id, self.client)
+                for aba in metadados.get("sheets", [])
+            ]
+        return metadados
+
+
+def _snapshot_configurado() -> bool:
+    """Checagem sem importar snapshot_arrow, que carrega o pyarrow (ver benchmark_importacao)."""
+    return bool(os.environ.get("SNAPSHOT_ARROW_DIR"))
+
+
+def _sem_vazios_finais(linha: List[str]) -> List[str]:
+    linha = list(linha)
+    while linha and linha[-1] == "":
+        linha.pop()
+    return linha
+
+
+def _gerar_csv(cabecalho: List[str], linhas: List[List[str]]) -> str:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(cabecalho)
+    escritor.writerows(linhas)
+    return buffer.getvalue()
+
+
+# Chamados com os registros logo após cada gravação confirmada (ex.: painel ao vivo)
+_ouvintes_gravacao: List[Callable[[List[RegistroAtendimento]], None]] = []
+
+
+def ao_gravar(ouvinte: Callable[[List[RegistroAtendimento]], None]):
+    """Registra um ouvinte de gravações deste processo (pode ser usado como decorador)."""
+    if ouvinte not in _ouvintes_gravacao:
+        _ouvintes_gravacao.append(ouvinte)
+    return ouvinte
+
+
+def _notificar_gravacao(registros: List[RegistroAtendimento]) -> None:
+    for ouvinte in list(_ouvintes_gravacao):
+        try:
+            ouvinte(registros)
+        except Exception as e:
+            logger.warning(f"⚠️ Ouvinte de gravação falhou: {e}")
+
+
+def _nao_gravados(registros: List[RegistroAtendimento], gravados: List[RegistroAtendimento]) -> List[RegistroAtendimento]:
+    confirmados = {id(r) for r in gravados}
+    return [r for r in registros if id(r) not in confirmados]
+
 
 def _get_credentials():
     """Obtém credenciais de variáveis de ambiente (Render) ou st.secrets (local)."""
@@ -61,212 +150,751 @@ class GooglePlanilha:
 
     def __init__(self):
         """Inicializa a conexão com o Google Sheets."""
+        inicio = time.perf_counter()
         self.credentials_dict = _get_credentials()
         self.client = self._criar_conexao()
         
         try:
-            self.planilha = self.client.open(SPREADSHEET_NAME)
+            self.planilha = self._abrir_planilha()
         except SpreadsheetNotFound:
             st.error("❌ Planilha 'fluxo de loja' não encontrada.")
             st.markdown(f"💡 Compartilhe com: `{self.credentials_dict['client_email']}` como **Editor**.")
             st.stop()
+        aberta = time.perf_counter()
 
-        # Abas principais — NOMES EXATOS DA SUA PLANILHA
-        self.aba_vendedores = self._get_worksheet("ab_vendedor")
-        self.aba_dados = self._get_worksheet("ab_dados")
+        # Cópias locais compartilhadas pelo processo, invalidadas pela data de modificação
+        self.cache = cache_para(self.planilha.id)
+        if self.cache.versao is None:
+            self.verificar_alteracoes(forcar=True)
+
+        # Abas, cabeçalho, vendedores e Config numa única rodada de leitura
+        valores = self._bootstrap()
 
-        # Verifica estrutura e configuração
-        self._verificar_estrutura()
-        self._criar_aba_config()
+        # Configuração e esquema (verificado uma vez por processo)
+        self.esquema = self._carregar_esquema(valores.get("cabecalho"))
+
+        # Shards por loja/ano (só roteia depois de ativado na 'Config' ou por FLUXO_SHARDING=1)
+        self._carregar_shards()
+
+        fim = time.perf_counter()
+        self.metricas_bootstrap = {
+            "abertura_ms": round((aberta - inicio) * 1000, 1),
+            "leitura_ms": round((fim - aberta) * 1000, 1),
+            "total_ms": round((fim - inicio) * 1000, 1),
+        }
+        logger.info(f"⏱️ Bootstrap do Google Sheets: {self.metricas_bootstrap}")
 
     def _criar_conexao(self):
         try:
             client = gspread.service_account_from_dict(self.credentials_dict, scopes=SCOPES_SHEETS)
+            configurar_timeout_http(client)
             return client
         except Exception as e:
             st.error(f"❌ Falha ao conectar ao Google Sheets: {e}")
             st.stop()
 
-    def _get_worksheet(self, name: str):
-        """Retorna worksheet ou None se não existir."""
+    def _abrir_planilha(self) -> _PlanilhaAberta:
+        """Abre a planilha com uma única leitura de metadados, que já traz todas as abas."""
+        if SPREADSHEET_ID:
+            propriedades = {"id": SPREADSHEET_ID}
+        else:
+            arquivos = [a for a in self.client.list_spreadsheet_files(SPREADSHEET_NAME) if a.get("name") == SPREADSHEET_NAME]
+            if not arquivos:
+                raise SpreadsheetNotFound(SPREADSHEET_NAME)
+            propriedades = {"id": arquivos[0]["id"], "title": SPREADSHEET_NAME}
         try:
-            return self.planilha.worksheet(name)
-        except WorksheetNotFound:
-            st.warning(f"⚠️ Aba '{name}' não encontrada.")
-            return None
+            return _PlanilhaAberta(self.client.http_client, propriedades)
+        except APIError as e:
+            if e.response.status_code == 404:
+                raise SpreadsheetNotFound(propriedades["id"]) from e
+            raise
+
+    def _bootstrap(self) -> Dict[str, List[List[str]]]:
+        """
+        Carrega o estado inicial com duas chamadas: metadados (lidos na abertura, com
+        todas as abas) e um values_batch_get com cabeçalho, vendedores e Config.
+        O que já estiver no cache do processo não é lido de novo.
+        """
+        abas = {aba.title: aba for aba in self.planilha.abas_abertura}
 
-    def _verificar_estrutura(self):
-        """Verifica cabeçalhos da aba 'ab_dados'."""
-        if self.aba_dados is None:
-            st.warning("⚠️ Aba 'ab_dados' não disponível. Não foi possível verificar a estrutura.")
-            return
+        # Abas principais — NOMES EXATOS DA SUA PLANILHA
+        self.aba_vendedores = abas.get("ab_vendedor")
+        self.aba_dados = abas.get("ab_dados")
+        for nome, aba in (("ab_vendedor", self.aba_vendedores), ("ab_dados", self.aba_dados)):
+            if aba is None:
+                st.warning(f"⚠️ Aba '{nome}' não encontrada.")
+        self.aba_config = abas.get("Config") or self._criar_aba_config()
+
+        intervalos = {}
+        if self.cache.consultar("config") is None:
+            intervalos["config"] = "'Config'!A:B"
+        if self.aba_vendedores is not None and self.cache.consultar("vendedores") is None:
+            intervalos["vendedores"] = "'ab_vendedor'!A:A"
+        if self.aba_dados is not None and registro_esquema.obter_esquema_em_cache(self.planilha.id) is None:
+            intervalos["cabecalho"] = "'ab_dados'!1:1"
+        if not intervalos:
+            return {}
+
+        resposta = executar("leitura", self.planilha.values_batch_get, list(intervalos.values()))
+        valores = {
+            nome: intervalo.get("values", [])
+            for nome, intervalo in zip(intervalos, resposta.get("valueRanges", []))
+        }
 
+        if "config" in valores:
+            self.cache.guardar("config", self._indexar_config(valores["config"]))
+        if "vendedores" in valores:
+            self.cache.guardar("vendedores", self._montar_vendedores(linha[0] for linha in valores["vendedores"] if linha))
+        if "cabecalho" in valores:
+            valores["cabecalho"] = valores["cabecalho"][0] if valores["cabecalho"] else []
+        return valores
+
+    def _criar_aba_config(self):
+        """Cria aba 'Config' (chamado quando ela não existe)."""
+        aba = self.planilha.add_worksheet("Config", rows="10", cols="5")
+        aba.update("A1:B2", [["Último Backup", "Data"], ["backup_3_anos", ""]])
+        st.success("✅ Aba 'Config' criada.")
+        return aba
+
+    # === DETECÇÃO DE ALTERAÇÕES ===
+
+    def _versao_remota(self) -> str:
+        """Data de modificação da planilha no Drive (consulta de poucos bytes)."""
+        return executar("leitura", self.planilha.get_lastUpdateTime, servico="drive", cota="drive")
+
+    def verificar_alteracoes(self, forcar: bool = False) -> bool:
+        """
+        Descarta os registros do cache se a planilha mudou; vendedores, Config e lojas
+        só quando vencem (cache_planilha.VALIDADE_CADASTROS). Consulta o Drive no máximo
+        uma vez por intervalo, somando todas as sessões.
+        """
         try:
-            cabecalhos = [str(c).strip() for c in self.aba_dados.row_values(1)]
-            esperados = [
-                'LOJA', 'DATA', 'HORA', 'VENDEDOR', 'CLIENTE', 'ATENDIMENTO', 'RECEITA',
-                'PERDA', 'VENDA', 'RESERVA', 'PESQUISA', 'EXAME DE VISTA', 'GAR_LENTE',
-                'GAR_ARMACAO', 'AJUSTE', 'ENTREGA'
-            ]
+            alterou = self.cache.verificar(self._versao_remota, forcar)
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível verificar alterações: {e}")
+            return False
 
-            if len(cabecalhos) < len(esperados):
-                st.warning(f"⚠️ Número insuficiente de colunas. Esperado: {len(esperados)}, Encontrado: {len(cabecalhos)}")
-                return
+        # Esquema e shards vêm da Config: só são conferidos quando ela é relida
+        if self.cache.consultar("config") is None and getattr(self, "esquema", None) is not None:
+            # Só relê o cabeçalho se o registro de esquema mudou de versão
+            versao = self._ler_config().get(registro_esquema.CHAVE_VERSAO)
+            if versao and versao != str(self.esquema.versao):
+                registro_esquema.invalidar_esquema(self.planilha.id)
+                self.esquema = self._carregar_esquema()
+            # Shards ativados (migrar_shards.py) ou criados por outro processo
+            self._carregar_shards()
+        return alterou
+
+    @property
+    def versao_dados(self) -> Optional[str]:
+        return self.cache.versao
+
+    @property
+    def versao_local(self) -> Optional[str]:
+        """versao_dados mais as gravações deste processo ainda não refletidas nela (chaves de cache)."""
+        return self.cache.versao_local
+
+    # === CONFIG (chave na coluna A, valor na coluna B) ===
+
+    @staticmethod
+    def _indexar_config(linhas: List[List[str]]):
+        """Monta ({chave: valor}, {chave: número da linha})."""
+        config, linhas_config = {}, {}
+        for i, linha in enumerate(linhas, start=1):
+            if linha and str(linha[0]).strip():
+                chave = str(linha[0]).strip()
+                config[chave] = str(linha[1]).strip() if len(linha) > 1 else ""
+                linhas_config[chave] = i
+        return config, linhas_config
+
+    def _ler_config(self) -> Dict[str, str]:
+        """Retorna a Config do cache; relê a aba só se ela foi invalidada."""
+        self._config, self._linhas_config = self.cache.obter(
+            "config", lambda: self._indexar_config(executar("config", self.aba_config.get_all_values))
+        )
+        return self._config
+
+    def _gravar_config(self, valores: Dict[str, str]):
+        """Atualiza ou acrescenta chaves na aba 'Config' (no máximo uma chamada por tipo)."""
+        config = self._ler_config()
+        atualizacoes, novas = [], []
+        for chave, valor in valores.items():
+            if chave in self._linhas_config:
+                atualizacoes.append({"range": f"B{self._linhas_config[chave]}", "values": [[valor]]})
+            else:
+                novas.append([chave, valor])
+            config[chave] = valor
+
+        if atualizacoes:
+            executar("config", self.aba_config.batch_update, atualizacoes, cota="escrita")
+        if novas:
+            executar("config", self.aba_config.append_rows, novas, idempotente=False, cota="escrita")
+            self.cache.invalidar("config", "lojas")  # recarrega as linhas na próxima leitura
+
+    # === ESQUEMA DA ABA 'ab_dados' ===
+
+    def _carregar_esquema(self, cabecalhos: Optional[List[str]] = None) -> registro_esquema.Esquema:
+        """
+        Obtém o mapa de colunas: do cache do processo, se já verificado;
+        senão compara o registro da 'Config' com o cabeçalho real uma única vez.
+        """
+        em_cache = registro_esquema.obter_esquema_em_cache(self.planilha.id)
+        if em_cache is not None:
+            return em_cache
 
-            if cabecalhos[:len(esperados)] != esperados:
-                st.warning("⚠️ Estrutura da aba 'ab_dados' incorreta.")
+        if self.aba_dados is None:
+            st.warning("⚠️ Aba 'ab_dados' não disponível. Usando a estrutura padrão.")
+            return registro_esquema.esquema_padrao()
+
+        try:
+            registrado = registro_esquema.Esquema.de_config(self._ler_config())
+            if cabecalhos is None:
+                cabecalhos = self.aba_dados.row_values(1)
+            esquema, alterado = registro_esquema.reconciliar(registrado, cabecalhos)
+
+            if not any(str(c).strip() for c in cabecalhos):
+                self.aba_dados.update("A1", [esquema.cabecalhos])
+            if alterado:
+                self._gravar_config(esquema.para_config())
+                st.info(f"ℹ️ Esquema da aba 'ab_dados' registrado (versão {esquema.versao}).")
+
+            if esquema.faltantes:
+                st.warning(f"⚠️ Colunas obrigatórias ausentes em 'ab_dados': {', '.join(esquema.faltantes)}")
             else:
-                st.success("✅ Estrutura da aba 'ab_dados' validada.")
+                registro_esquema.guardar_esquema(self.planilha.id, esquema)
+            return esquema
 
         except Exception as e:
             st.error(f"❌ Erro ao verificar estrutura: {e}")
-
-    def _criar_aba_config(self):
-        """Cria aba 'Config' se não existir."""
+            return registro_esquema.esquema_padrao()
+
+    # === SHARDS POR LOJA / ANO ===
+
+    def _carregar_shards(self):
+        """Lê o diretório e a ativação dos shards da Config; as abas já abertas só são descartadas se o diretório mudou."""
+        config = self._ler_config()
+        diretorio = DiretorioShards.de_config(config)
+        ativo = os.environ.get("FLUXO_SHARDING") == "1" or config.get(CHAVE_SHARDING_ATIVO) == "1"
+        anterior = getattr(self, "diretorio_shards", None)
+        if anterior is None or anterior.entradas != diretorio.entradas:
+            self._abas_shard = {}
+        if getattr(self, "sharding_ativo", ativo) != ativo:
+            logger.info(f"🗂️ Sharding {'ativado' if ativo else 'desativado'} na Config")
+        self.diretorio_shards, self.sharding_ativo = diretorio, ativo
+
+    def _abrir_destino(self, destino: Dict[str, str]):
+        """Abre (e guarda) a aba de um shard, na planilha principal ou em outra planilha."""
+        chave = (destino.get("planilha", ""), destino["aba"])
+        if chave not in self._abas_shard:
+            planilha = self.client.open_by_key(chave[0]) if chave[0] else self.planilha
+            self._abas_shard[chave] = planilha.worksheet(chave[1])
+        return self._abas_shard[chave]
+
+    def _criar_shard(self, loja: str, ano: int):
+        """
+        Cria a aba do shard com o cabeçalho atual e a registra no diretório. Vai para a
+        planilha indicada no cadastro da loja (planilha_shard) ou, sem ela, para a principal.
+        """
+        nome = nome_aba_shard(loja, ano)
+        cadastrada = self.get_lojas().obter(loja)
+        id_planilha = cadastrada.planilha_shard if cadastrada else ""
+        planilha = self.client.open_by_key(id_planilha) if id_planilha else self.planilha
         try:
-            self.planilha.worksheet("Config")
+            aba = planilha.worksheet(nome)
         except WorksheetNotFound:
-            aba = self.planilha.add_worksheet("Config", rows="10", cols="5")
-            aba.update("A1:B2", [["Último Backup", "Data"], ["backup_3_anos", ""]])
-            st.success("✅ Aba 'Config' criada.")
+            try:
+                aba = planilha.add_worksheet(nome, rows="1000", cols=str(max(self.esquema.largura, 1)))
+                aba.update("A1", [self.esquema.cabecalhos])
+            except APIError:
+                # Outra sessão criou a mesma aba ao mesmo tempo
+                aba = planilha.worksheet(nome)
+
+        # Relê o diretório antes de gravar para não perder shards criados por outro processo
+        self.cache.invalidar("config")
+        self.diretorio_shards = DiretorioShards.de_config(self._ler_config())
+        self.diretorio_shards.adicionar(loja, ano, nome, id_planilha)
+        self._gravar_config(self.diretorio_shards.para_config())
+        self._abas_shard[(id_planilha, nome)] = aba
+        st.info(f"🗂️ Shard criado: `{nome}`")
+        return aba
+
+    def aba_para(self, loja: str, ano: int):
+        """Aba onde devem ser gravados os registros da loja/ano."""
+        if not self.sharding_ativo:
+            return self.aba_dados
+        destino = self.diretorio_shards.destino(loja, ano)
+        if destino is None:
+            return self._criar_shard(loja, ano)
+        return self._abrir_destino(destino)
+
+    def _ler_shards(self, lojas: Optional[List[str]], anos: Optional[List[int]]) -> List[Dict]:
+        """Leitura em paralelo de todos os shards selecionados (mais as linhas ainda na aba principal)."""
+        destinos = [d for _, _, d in self.diretorio_shards.filtrar(lojas, anos)]
+        lojas_norm = {l.strip().upper() for l in lojas} if lojas else None
+        anos_norm = set(anos) if anos else None
+
+        def ler(destino):
+            if destino is None:
+                linhas = executar(
+                    "leitura", self.aba_dados.get_all_records, prioridade=PRIORIDADE_RELATORIO
+                ) if self.aba_dados else []
+                return [
+                    r for r in linhas
+                    if (lojas_norm is None or str(r.get("LOJA", "")).strip().upper() in lojas_norm)
+                    and (anos_norm is None or ano_do_registro(r.get("DATA", "")) in anos_norm)
+                ]
+            return executar("leitura", self._abrir_destino(destino).get_all_records, prioridade=PRIORIDADE_RELATORIO)
+
+        alvos = [None] + destinos
+        with ThreadPoolExecutor(max_workers=min(MAX_LEITURAS_PARALELAS, len(alvos))) as executor:
+            partes = list(executor.map(ler, alvos))
+        return [registro for parte in partes for registro in parte]
 
     # === BACKUP AUTOMÁTICO ===
 
     def _obter_data_ultimo_backup(self) -> Optional[datetime]:
         try:
-            aba = self.planilha.worksheet("Config")
-            valor = aba.acell("B2").value
+            valor = self._ler_config().get("backup_3_anos")
             return datetime.strptime(valor, "%Y-%m-%d") if valor else None
         except Exception:
             return None
 
-    def _registrar_data_backup(self, data: datetime):
-        try:
-            aba = self.planilha.worksheet("Config")
-            aba.update("B2", data.strftime("%Y-%m-%d"))
-        except Exception as e:
-            st.error(f"❌ Falha ao registrar data do backup: {e}")
+    def _registrar_backup(self, data: datetime, intervalo: Dict):
+        """Grava a data e o intervalo exato de linhas exportado (auditoria do arquivo no Drive)."""
+        self._gravar_config({
+            "backup_3_anos": data.strftime("%Y-%m-%d"),
+            CHAVE_BACKUP_INTERVALO: json.dumps(intervalo, ensure_ascii=False),
+        })
 
     def _deve_fazer_backup(self) -> bool:
         ultimo = self._obter_data_ultimo_backup()
         if ultimo is None:
-            return True
+            # Sem data gravada (instalação nova): começa a contar hoje em vez de apagar a aba
+            try:
+                self._gravar_config({"backup_3_anos": datetime.now().strftime("%Y-%m-%d")})
+            except Exception as e:
+                logger.warning(f"⚠️ Não foi possível iniciar a contagem do backup: {e}")
+            return False
         return (datetime.now() - ultimo).days >= BACKUP_AGE_DAYS
 
-    def rodar_backup_automatico(self):
-        if not self._deve_fazer_backup():
+    def rodar_backup_automatico(self, em_segundo_plano: bool = True) -> bool:
+        """
+        Dispara o backup se estiver vencido. Roda numa thread própria para não segurar
+        a tela nem os registros; só um backup por processo de cada vez.
+        Retorna True se um backup foi iniciado.
+        """
+        if self.aba_dados is None or not self._deve_fazer_backup():
+            return False
+        if not _LOCK_BACKUP.acquire(blocking=False):
+            return False  # já há um backup em andamento neste processo
+
+        def tarefa():
+            try:
+                self._executar_backup()
+            except Exception as e:
+                _ESTADO_BACKUP.update(situacao="falhou", erro=str(e))
+                logger.warning(f"⚠️ Falha no backup: {e}")
+            finally:
+                _LOCK_BACKUP.release()
+
+        if not em_segundo_plano:
+            tarefa()
+            return True
+        threading.Thread(target=tarefa, name="backup-ab-dados", daemon=True).start()
+        return True
+
+    def _executar_backup(self):
+        """
+        1. Lê uma única vez a aba e fixa o intervalo exportado (linhas 2..N).
+        2. Envia o CSV ao Drive; sem confirmação do upload nada é apagado.
+        3. Confere se as linhas 2..N continuam iguais e apaga só esse intervalo.
+        Registros acrescentados durante o processo ficam abaixo de N e são preservados.
+        """
+        _ESTADO_BACKUP.update(situacao="em andamento", inicio=datetime.now().isoformat(timespec="seconds"), erro="")
+
+        # Outro processo pode estar no meio de um backup ou de uma migração: respeita a reserva
+        if not self.reservar_ab_dados():
+            _ESTADO_BACKUP.update(situacao="ignorado", erro="backup ou migração em andamento em outro processo")
             return
 
         try:
-            df = pd.DataFrame(self.aba_dados.get_all_records())
-            if df.empty:
-                st.info("📭 Nenhum dado para backup.")
+            valores = executar("leitura", self.aba_dados.get_all_values, prioridade=PRIORIDADE_BACKUP)
+            cabecalho, linhas = (valores[0], valores[1:]) if valores else ([], [])
+            if not linhas:
+                _ESTADO_BACKUP.update(situacao="sem dados")
+                logger.info("📭 Nenhum dado para backup.")
                 return
 
-            nome_arquivo = f"backup_ab_dados_{datetime.now().strftime('%Y-%m-%d')}.csv"
-            csv = df.to_csv(index=False)
+            ultima_linha = len(linhas) + 1
+            agora = datetime.now()
+            nome_arquivo = f"backup_ab_dados_{agora.strftime('%Y-%m-%d')}.csv"
+            id_arquivo = self._salvar_no_drive(nome_arquivo, _gerar_csv(cabecalho, linhas))
+            self._salvar_arquivo_compacto(nome_arquivo, cabecalho, linhas)
+
+            intervalo = {
+                "arquivo": nome_arquivo,
+                "id": id_arquivo,
+                "linhas": [2, ultima_linha],
+                "total": len(linhas),
+                "data": agora.isoformat(timespec="seconds"),
+            }
+            removidas = self._remover_intervalo(linhas, len(cabecalho))
+            intervalo["removido"] = removidas
+            if not removidas:
+                # Sem a remoção a data não é registrada: o backup continua vencido e a
+                # próxima execução exporta e tenta apagar de novo
+                self._gravar_config({CHAVE_BACKUP_INTERVALO: json.dumps(intervalo, ensure_ascii=False)})
+                _ESTADO_BACKUP.update(situacao="exportado sem limpeza", **intervalo)
+                logger.warning(f"⚠️ Backup `{nome_arquivo}` exportado, mas as linhas não foram removidas; será refeito.")
+                return
+            self._registrar_backup(agora, intervalo)
+            _ESTADO_BACKUP.update(situacao="concluído", **intervalo)
+            logger.info(f"✅ Backup `{nome_arquivo}`: linhas 2–{ultima_linha} exportadas e removidas.")
 
-            self._salvar_no_drive(nome_arquivo, csv)
-            self._registrar_data_backup(datetime.now())
-            self._limpar_aba_dados()
             self._limpar_backups_antigos_no_drive()
+        finally:
+            self.liberar_ab_dados()
+
+    def reservar_ab_dados(self) -> bool:
+        """
+        Reserva a 'ab_dados' para uma operação que apaga linhas (backup, migrar_shards.py).
+        Retorna False se outro processo a reservou há menos de RESERVA_BACKUP_SEGUNDOS.
+        """
+        self.cache.invalidar("config")
+        reserva = self._ler_config().get(CHAVE_BACKUP_RESERVA, "")
+        if reserva and time.time() - float(reserva.split("|")[0] or 0) < RESERVA_BACKUP_SEGUNDOS:
+            return False
+        self._gravar_config({CHAVE_BACKUP_RESERVA: f"{time.time():.0f}|{os.getpid()}"})
+        return True
 
-        except Exception as e:
-            st.warning(f"⚠️ Falha no backup: {e}")
-
-    def _salvar_no_drive(self, nome_arquivo: str, conteudo: str):
+    def liberar_ab_dados(self) -> None:
         try:
-            credentials = service_account.Credentials.from_service_account_info(
-                self.credentials_dict,
-                scopes=SCOPES_DRIVE
-            )
-            service = build("drive", "v3", credentials=credentials)
+            self._gravar_config({CHAVE_BACKUP_RESERVA: ""})
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível liberar a reserva da 'ab_dados': {e}")
 
-            media = MediaIoBaseUpload(BytesIO(conteudo.encode()), mimetype='text/csv')
-            file_metadata = {'name': nome_arquivo}
-            file = service.files().create(body=file_metadata, media_body=media, fields='id').execute()
+    def _servico_drive(self):
+        """Cliente da API do Drive; a biblioteca só é carregada quando há backup."""
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
 
-            st.success(f"✅ Backup salvo: `{nome_arquivo}` (ID: {file['id']})")
-        except Exception as e:
-            st.error(f"❌ Falha ao salvar no Drive: {e}")
+        credentials = service_account.Credentials.from_service_account_info(
+            self.credentials_dict,
+            scopes=SCOPES_DRIVE
+        )
+        return build("drive", "v3", credentials=credentials, cache_discovery=False)
 
-    def _limpar_aba_dados(self):
+    def _salvar_arquivo_compacto(self, nome_csv: str, cabecalho: List[str], linhas: List[List[str]]):
+        """Cópia compacta (.npz) do mesmo intervalo; o CSV continua sendo o arquivo de referência."""
         try:
-            if self.aba_dados is None:
-                return
-            cabecalhos = self.aba_dados.row_values(1)
-            self.aba_dados.clear()
-            self.aba_dados.update("A1", [cabecalhos])
-            st.info("🧹 Dados da aba 'ab_dados' limpos.")
+            from codificacao_compacta import TabelaCompacta
+
+            conteudo = TabelaCompacta.de_linhas(cabecalho, linhas).para_bytes()
+            self._salvar_no_drive(nome_csv[:-len(".csv")] + ".npz", conteudo, "application/octet-stream")
         except Exception as e:
-            st.error(f"❌ Falha ao limpar aba: {e}")
+            logger.warning(f"⚠️ Cópia compacta do backup não enviada: {e}")
+
+    def _salvar_no_drive(self, nome_arquivo: str, conteudo: Union[str, bytes], mimetype: str = "text/csv") -> str:
+        """Envia o arquivo e retorna o ID; lança exceção se o Drive não confirmar."""
+        from googleapiclient.http import MediaIoBaseUpload
+
+        if isinstance(conteudo, str):
+            conteudo = conteudo.encode("utf-8-sig")
+        service = self._servico_drive()
+        media = MediaIoBaseUpload(io.BytesIO(conteudo), mimetype=mimetype)
+        file_metadata = {'name': nome_arquivo}
+        file = executar(
+            "drive",
+            service.files().create(body=file_metadata, media_body=media, fields='id, size').execute,
+            servico="drive",
+            idempotente=False,
+            prioridade=PRIORIDADE_BACKUP
+        )
+        if not file or not file.get("id"):
+            raise RuntimeError(f"Drive não confirmou o upload de `{nome_arquivo}`")
+        return file["id"]
+
+    def _remover_intervalo(self, exportadas: List[List[str]], largura: int) -> bool:
+        """
+        Apaga da 'ab_dados' exatamente as linhas exportadas (2..N), sem limpar a aba inteira.
+        Se o intervalo mudou desde a leitura (outra limpeza, edição manual), não apaga nada.
+        """
+        ultima_linha = len(exportadas) + 1
+        atual = executar(
+            "leitura",
+            self.aba_dados.get_values,
+            f"A2:{gspread.utils.rowcol_to_a1(ultima_linha, max(largura, 1))}",
+            prioridade=PRIORIDADE_BACKUP,
+        )
+        if [_sem_vazios_finais(l) for l in atual] != [_sem_vazios_finais(l) for l in exportadas]:
+            logger.warning("⚠️ Linhas exportadas mudaram durante o backup; a aba não foi limpa.")
+            return False
+
+        executar(
+            "escrita",
+            self.aba_dados.delete_rows, 2, ultima_linha,
+            idempotente=False,
+            prioridade=PRIORIDADE_BACKUP,
+        )
+        self.cache.marcar_gravacao_local()
+        return True
 
     def _limpar_backups_antigos_no_drive(self):
         try:
-            credentials = service_account.Credentials.from_service_account_info(
-                self.credentials_dict,
-                scopes=SCOPES_DRIVE
-            )
-            service = build("drive", "v3", credentials=credentials)
+            service = self._servico_drive()
 
-            query = "mimeType='text/csv' and trashed=false and name contains 'backup_ab_dados_'"
-            results = service.files().list(q=query, fields="files(id, name)").execute()
+            query = "trashed=false and name contains 'backup_ab_dados_'"
+            results = executar("drive", service.files().list(q=query, fields="files(id, name)").execute, servico="drive", prioridade=PRIORIDADE_BACKUP)
             files = results.get("files", [])
 
             agora = datetime.now()
             for file in files:
-                match = re.search(r"backup_ab_dados_(\d{4}-\d{2}-\d{2})\.csv", file["name"])
+                match = re.search(r"backup_ab_dados_(\d{4}-\d{2}-\d{2})\.(csv|npz)$", file["name"])
                 if match:
                     data_arquivo = datetime.strptime(match.group(1), "%Y-%m-%d")
                     if (agora - data_arquivo).days > CLEANUP_BACKUP_OLDER_THAN_DAYS:
-                        service.files().delete(fileId=file["id"]).execute()
-                        st.warning(f"🗑️ Backup antigo removido: `{file['name']}`")
+                        executar("drive", service.files().delete(fileId=file["id"]).execute, servico="drive", prioridade=PRIORIDADE_BACKUP)
+                        logger.info(f"🗑️ Backup antigo removido: `{file['name']}`")
         except Exception as e:
-            st.error(f"❌ Erro ao limpar backups antigos: {e}")
+            logger.warning(f"❌ Erro ao limpar backups antigos: {e}")
 
     # === MÉTODOS PÚBLICOS ===
 
-    def get_all_records(self) -> List[Dict]:
+    def _carregar_registros(self, lojas: Optional[List[str]], anos: Optional[List[int]]) -> List[Dict]:
+        if self.sharding_ativo:
+            return self._ler_shards(lojas, anos)
+        return executar(
+            "leitura", self.aba_dados.get_all_records, prioridade=PRIORIDADE_RELATORIO
+        ) if self.aba_dados else []
+
+    def get_all_records(self, lojas: Optional[List[str]] = None, anos: Optional[List[int]] = None) -> List[Dict]:
+        """Registros da cópia local (somente leitura); só relê a planilha se ela mudou."""
         try:
-            return self.aba_dados.get_all_records() if self.aba_dados else []
+            self.verificar_alteracoes()
+            chave = (
+                "registros",
+                tuple(sorted(l.strip().upper() for l in lojas)) if lojas else None,
+                tuple(sorted(anos)) if anos else None,
+            )
+            return self.cache.obter(chave, lambda: self._carregar_registros(lojas, anos))
         except Exception as e:
             st.error(f"❌ Falha ao ler registros: {e}")
             return []
 
+    def iniciar_snapshot(self) -> bool:
+        """Com SNAPSHOT_ARROW_DIR definido, passa a manter o snapshot Arrow compartilhado entre processos."""
+        if not _snapshot_configurado():
+            return False
+        import snapshot_arrow
+
+        return snapshot_arrow.habilitado() and snapshot_arrow.iniciar_escritor(self)
+
+    def consultar_registros(self, loja: Optional[str] = None, vendedor: Optional[str] = None,
+                            data: Optional[str] = None) -> List[Dict]:
+        """
+        Registros que batem com loja/vendedor/data (dd/mm/aaaa), sem diferenciar caixa.
+        Se o snapshot Arrow estiver na mesma versão da planilha, filtra direto no arquivo
+        mapeado em memória (uma cópia para todos os processos); senão usa a cópia local.
+        """
+        filtros = {"LOJA": loja, "VENDEDOR": vendedor, "DATA": data}
+        try:
+            self.verificar_alteracoes()
+            # Depois de uma gravação deste processo a versão local difere da do snapshot,
+            # que não tem a linha recém-gravada: a consulta cai na cópia local (relida)
+            if _snapshot_configurado() and self.versao_local:
+                import snapshot_arrow
+
+                leitor = snapshot_arrow.leitor()
+                if leitor.versao() == self.versao_local:
+                    return snapshot_arrow.filtrar(leitor.tabela(), **filtros)
+        except Exception as e:
+            logger.warning(f"⚠️ Snapshot Arrow indisponível, usando a cópia local: {e}")
+
+        ativos = {col: valor.strip().lower() for col, valor in filtros.items() if valor is not None}
+        return [
+            r for r in self.get_all_records()
+            if all(str(r.get(col, "")).strip().lower() == valor for col, valor in ativos.items())
+        ]
+
+    def get_tabela_compacta(self, lojas: Optional[List[str]] = None, anos: Optional[List[int]] = None):
+        """
+        Os mesmos registros em forma compacta (códigos de evento e contadores int8) para agregações.
+        Fica no cache ao lado da versão em dicionários e é descartada junto com ela.
+        """
+        from codificacao_compacta import TabelaCompacta
+
+        self.verificar_alteracoes()
+        chave = (
+            "registros",
+            tuple(sorted(l.strip().upper() for l in lojas)) if lojas else None,
+            tuple(sorted(anos)) if anos else None,
+            "compacta",
+        )
+        return self.cache.obter(
+            chave, lambda: TabelaCompacta.de_registros(self.get_all_records(lojas, anos), self.esquema.cabecalhos)
+        )
+
+    def ler_coluna(self, cabecalho: str) -> List[str]:
+        """Lê uma coluna da aba 'ab_dados' pelo nome do cabeçalho (sem a linha 1)."""
+        indice = self.esquema.indice(cabecalho)
+        if indice is None or self.aba_dados is None:
+            return []
+        try:
+            return executar("leitura", self.aba_dados.col_values, indice + 1, prioridade=PRIORIDADE_RELATORIO)[1:]
+        except Exception as e:
+            st.error(f"❌ Falha ao ler coluna '{cabecalho}': {e}")
+            return []
+
+    @staticmethod
+    def _montar_vendedores(nomes: Iterable[str]) -> List[Dict]:
+        return [{"VENDEDOR": nome.strip()} for nome in nomes if nome and nome.strip()]
+
+    # === CADASTRO DE LOJAS ===
+
+    def get_lojas(self) -> CadastroLojas:
+        """Cadastro de lojas da 'Config', montado uma vez e guardado no cache do processo."""
+        try:
+            self.verificar_alteracoes()
+            return self.cache.obter("lojas", lambda: CadastroLojas.de_config(self._ler_config()))
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao carregar o cadastro de lojas: {e}")
+            return CadastroLojas.de_config({})
+
+    def agora_na_loja(self, loja: Optional[str]) -> datetime:
+        """Data/hora atual no fuso da loja (São Paulo para lojas fora do cadastro)."""
+        return datetime.now(self.get_lojas().zona(loja))
+
     def get_vendedores_por_loja(self, loja: str = None) -> List[Dict]:
+        """Vendedores da loja no cadastro; sem lista própria (ou sem loja), a coluna de 'ab_vendedor'."""
+        cadastrada = self.get_lojas().obter(loja)
+        if cadastrada is not None and cadastrada.vendedores:
+            return self._montar_vendedores(cadastrada.vendedores)
         try:
-            if 'vendedores_cache' not in st.session_state:
-                coluna_a = self.aba_vendedores.col_values(1) if self.aba_vendedores else []
-                st.session_state.vendedores_cache = [
-                    {"VENDEDOR": nome.strip()} for nome in coluna_a if nome.strip()
-                ]
-            return st.session_state.vendedores_cache
+            self.verificar_alteracoes()
+            return self.cache.obter(
+                "vendedores",
+                lambda: self._montar_vendedores(
+                    executar("leitura", self.aba_vendedores.col_values, 1) if self.aba_vendedores else []
+                )
+            )
         except Exception as e:
             st.error(f"❌ Falha ao buscar vendedores: {e}")
             return []
 
-    def registrar_atendimento(self, dados: Dict) -> bool:
+    def _preparar_registro(self, dados: Union[Dict, RegistroAtendimento]) -> Optional[RegistroAtendimento]:
+        """Converte/valida o registro. Mostra o erro e retorna None se for inválido."""
         try:
-            for campo in ['loja', 'vendedor', 'cliente']:
-                if not dados.get(campo):
-                    st.error(f"❌ {campo.upper()} é obrigatório.")
-                    return False
-
-            dados['hora'] = dados.get('hora') or datetime.now(DEFAULT_TIMEZONE).strftime("%H:%M:%S")
-
-            mapeamento = [
-                ('loja', 'LOJA'), ('data', 'DATA'), ('hora', 'HORA'),
-                ('vendedor', 'VENDEDOR'), ('cliente', 'CLIENTE'),
-                ('atendimento', 'ATENDIMENTO'), ('receita', 'RECEITA'),
-                ('perda', 'PERDA'), ('venda', 'VENDA'), ('reserva', 'RESERVA'),
-                ('pesquisa', 'PESQUISA'), ('consulta', 'EXAME DE VISTA'), ('gar_lente', 'GAR_LENTE'),
-                ('gar_arma', 'GAR_ARMACAO'), ('ajuste', 'AJUSTE'), ('entrega', 'ENTREGA')
-            ]
+            registro = como_registro(dados)
+        except ValueError as e:
+            st.error(f"❌ Registro inválido: {e}")
+            return None
 
-            valores = [str(dados.get(campo, '')).strip() for campo, _ in mapeamento]
-            self.aba_dados.append_row(valores, value_input_option='USER_ENTERED')
-            return True
+        faltantes = registro.campos_faltantes()
+        if faltantes:
+            st.error(f"❌ {faltantes[0].upper()} é obrigatório.")
+            return None
 
+        if not registro.hora:
+            registro.hora = self.agora_na_loja(registro.loja).strftime("%H:%M:%S")
+        return registro
+
+    def _gravar_registros(self, registros: List[RegistroAtendimento], gravados: Optional[List[RegistroAtendimento]] = None):
+        """
+        Grava registros já validados, com uma chamada append_rows por destino (shard).
+        Os grupos confirmados vão para `gravados`, para quem chama saber o que falta se um falhar.
+        """
+        grupos = {}
+        for registro in registros:
+            grupos.setdefault((registro.loja, ano_do_registro(registro.data)), []).append(registro)
+        for (loja, ano), registros_grupo in grupos.items():
+            executar(
+                "escrita",
+                self.aba_para(loja, ano).append_rows,
+                self.esquema.codificar_lote(registros_grupo),
+                value_input_option='USER_ENTERED',
+                idempotente=False,
+                prioridade=PRIORIDADE_REGISTRO
+            )
+            if gravados is not None:
+                gravados.extend(registros_grupo)
+            # Descarta o cache antes de avisar: uma semeadura que comece depois do aviso já lê a linha
+            self.cache.marcar_gravacao_local()
+            _notificar_gravacao(registros_grupo)
+
+    def _guardar_pendentes(self, registros: List[RegistroAtendimento]):
+        for registro in registros:
+            BUFFER_PENDENTES.adicionar(registro.como_dict())
+        st.warning("⚠️ Google Sheets indisponível. Registro guardado localmente e será enviado automaticamente.")
+
+    def enviar_pendentes(self) -> int:
+        """Reenvia os registros guardados localmente. Retorna quantos foram enviados."""
+        pendentes = BUFFER_PENDENTES.retirar_todos()
+        if not pendentes:
+            return 0
+        registros = [RegistroAtendimento.de_dict(p) for p in pendentes]
+        gravados: List[RegistroAtendimento] = []
+        try:
+            self._gravar_registros(registros, gravados)
         except Exception as e:
-            st.error(f"❌ Falha ao salvar: {e}")
+            restantes = _nao_gravados(registros, gravados)
+            # Só volta para a fila o que certamente não foi aplicado; o resto iria em dobro
+            buffer = BUFFER_PENDENTES if sem_efeito(e) else BUFFER_INCERTOS
+            for registro in restantes:
+                buffer.adicionar(registro.como_dict())
+            if buffer is BUFFER_INCERTOS:
+                logger.error(f"❌ {len(restantes)} pendentes sem confirmação ({e}); conferir {BUFFER_INCERTOS.caminho}")
+            else:
+                logger.warning(f"⚠️ Pendentes não enviados ({len(restantes)}): {e}")
+            return len(gravados)
+        logger.info(f"📤 {len(registros)} registros pendentes enviados.")
+        return len(registros)
+
+    def registrar_atendimento(self, dados: Union[Dict, RegistroAtendimento]) -> bool:
+        return self.registrar_atendimentos([dados])
+
+    def registrar_atendimentos(self, registros: Iterable[Union[Dict, RegistroAtendimento]]) -> bool:
+        """
+        Grava vários registros com uma única chamada à API por destino (shard).
+        Se o Google estiver fora do ar, guarda no buffer local em vez de travar a tela.
+        """
+        preparados = [self._preparar_registro(r) for r in registros]
+        if not preparados or any(r is None for r in preparados):
             return False
+
+        gravados: List[RegistroAtendimento] = []
+        try:
+            self._gravar_registros(preparados, gravados)
+        except Exception as e:
+            restantes = _nao_gravados(preparados, gravados)
+            if sem_efeito(e):
+                # Recusado antes de aplicar: seguro guardar e reenviar (só os grupos que faltaram)
+                self._guardar_pendentes(restantes)
+                return True
+            if eh_transitorio(e):
+                st.error(
+                    f"❌ Sem confirmação do Google ({e}). O registro pode ter sido salvo: "
+                    "confira no relatório antes de registrar de novo."
+                )
+            else:
+                st.error(f"❌ Falha ao salvar: {e}")
+            return False
+
+        self.enviar_pendentes()
+        return True
+
+
+# === INSTÂNCIA COMPARTILHADA ===
+_planilha_compartilhada: Optional[GooglePlanilha] = None
+_lock_planilha = threading.Lock()
+
+
+def obter_planilha_compartilhada() -> GooglePlanilha:
+    """
+    Conexão única do processo (autenticação, abas e esquema resolvidos uma vez).
+    Se o aquecimento estiver abrindo a planilha, quem chega espera por ele em vez de abrir outra.
+    """
+    global _planilha_compartilhada
+    with _lock_planilha:
+        if _planilha_compartilhada is None:
+            _planilha_compartilhada = GooglePlanilha()
+        return _planilha_compartilhada
@@ -0,0 +1,147 @@
+"""
+Histórico local da 'ab_dados' em SQLite: as linhas que já saíram da planilha pelos backups.
+
+Carregado por importar_backups.py. Cada linha distinta é gravada uma vez com a sua
+`quantidade` (linhas idênticas legítimas no mesmo backup), então reimportar arquivos que
+se sobrepõem não duplica nada. DATA fica em ISO (aaaa-mm-dd) para filtrar por intervalo
+com o índice; `registros()` devolve no formato da planilha, como get_all_records().
+
+Caminho do arquivo: variável HISTORICO_DB (padrão: historico_ab_dados.sqlite ao lado do app).
+"""
+from contextlib import closing
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import os
+import sqlite3
+
+from registro_atendimento import COLUNAS_AB_DADOS
+
+# 🔹 Configuração
+CAMINHO_PADRAO = os.environ.get(
+    "HISTORICO_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "historico_ab_dados.sqlite"),
+)
+
+# Colunas da tabela (nomes SQL) na ordem da 'ab_dados', com o cabeçalho correspondente
+COLUNAS = tuple((campo, cab) for campo, cab in COLUNAS_AB_DADOS)
+CAMPOS_TEXTO = ("loja", "data", "hora", "vendedor", "cliente")
+CAMPOS_CONTADOR = tuple(campo for campo, _ in COLUNAS if campo not in CAMPOS_TEXTO)
+
+_ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS registros (
+    chave TEXT PRIMARY KEY,
+    {", ".join(f"{campo} TEXT NOT NULL" for campo in CAMPOS_TEXTO)},
+    {", ".join(f"{campo} INTEGER NOT NULL DEFAULT 0" for campo in CAMPOS_CONTADOR)},
+    quantidade INTEGER NOT NULL DEFAULT 1
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_registros_loja_data ON registros (loja, data);
+CREATE INDEX IF NOT EXISTS idx_registros_data ON registros (data);
+CREATE TABLE IF NOT EXISTS arquivos (
+    nome TEXT PRIMARY KEY,
+    assinatura TEXT NOT NULL,
+    linhas INTEGER NOT NULL,
+    importado_em TEXT NOT NULL
+);
+"""
+
+Linha = Tuple  # (loja, data ISO, hora, vendedor, cliente, contadores...)
+
+
+def conectar(caminho: str = CAMINHO_PADRAO) -> sqlite3.Connection:
+    conexao = sqlite3.connect(caminho)
+    conexao.execute("PRAGMA journal_mode=WAL")
+    conexao.executescript(_ESQUEMA)
+    return conexao
+
+
+def chave_da_linha(linha: Linha) -> str:
+    """Identidade de uma linha normalizada: todas as colunas, separadas por um caractere que não aparece nelas."""
+    return "\x1f".join(str(valor) for valor in linha)
+
+
+def gravar(conexao: sqlite3.Connection, quantidades: Dict[Linha, int]) -> int:
+    """
+    Insere as linhas; uma linha que já existe fica com a maior quantidade vista
+    (a mesma linha em dois backups sobrepostos não é somada). Retorna quantas linhas eram novas.
+    """
+    antes = conexao.execute("SELECT COUNT(*) FROM registros").fetchone()[0]
+    colunas = ("chave",) + tuple(campo for campo, _ in COLUNAS) + ("quantidade",)
+    conexao.executemany(
+        f"INSERT INTO registros ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))}) "
+        "ON CONFLICT(chave) DO UPDATE SET quantidade = MAX(quantidade, excluded.quantidade)",
+        ((chave_da_linha(linha),) + tuple(linha) + (quantidade,) for linha, quantidade in quantidades.items()),
+    )
+    return conexao.execute("SELECT COUNT(*) FROM registros").fetchone()[0] - antes
+
+
+class HistoricoLocal:
+    """Consultas ao histórico importado (somente leitura)."""
+
+    def __init__(self, caminho: str = CAMINHO_PADRAO):
+        self.caminho = caminho
+
+    def disponivel(self) -> bool:
+        return os.path.exists(self.caminho)
+
+    def _conectar(self) -> sqlite3.Connection:
+        return sqlite3.connect(f"file:{self.caminho}?mode=ro", uri=True)
+
+    def _filtro(self, lojas: Optional[Iterable[str]], de: Optional[date], ate: Optional[date]) -> Tuple[str, List]:
+        condicoes, parametros = ["data != ''"], []
+        if lojas:
+            lojas = [l.strip().upper() for l in lojas]
+            condicoes.append(f"loja IN ({', '.join('?' * len(lojas))})")
+            parametros.extend(lojas)
+        if de is not None:
+            condicoes.append("data >= ?")
+            parametros.append(de.isoformat())
+        if ate is not None:
+            condicoes.append("data <= ?")
+            parametros.append(ate.isoformat())
+        return " AND ".join(condicoes), parametros
+
+    def registros(self, lojas: Optional[Iterable[str]] = None, de: Optional[date] = None,
+                  ate: Optional[date] = None) -> List[Dict[str, str]]:
+        """Linhas no formato de get_all_records() (DATA dd/mm/aaaa), repetidas conforme a quantidade."""
+        if not self.disponivel():
+            return []
+        onde, parametros = self._filtro(lojas, de, ate)
+        campos = [campo for campo, _ in COLUNAS]
+        with closing(self._conectar()) as conexao:
+            cursor = conexao.execute(
+                f"SELECT {', '.join(campos)}, quantidade FROM registros WHERE {onde} ORDER BY data, hora",
+                parametros,
+            )
+            resultado = []
+            for *valores, quantidade in cursor:
+                # Como get_all_records(): contadores numéricos, células vazias como ''
+                registro = {cab: (v or '') for (_, cab), v in zip(COLUNAS, valores)}
+                ano, mes, dia = registro["DATA"].split("-")
+                registro["DATA"] = f"{dia}/{mes}/{ano}"
+                resultado.extend(dict(registro) for _ in range(quantidade))
+            return resultado
+
+    def totais(self, por: Sequence[str] = ("loja",), lojas: Optional[Iterable[str]] = None,
+               de: Optional[date] = None, ate: Optional[date] = None) -> List[Dict]:
+        """Soma dos contadores agrupada no SQLite (ex.: por=('loja', 'vendedor'))."""
+        if not self.disponivel():
+            return []
+        validos = set(CAMPOS_TEXTO)
+        por = [c for c in por if c in validos]
+        onde, parametros = self._filtro(lojas, de, ate)
+        somas = ", ".join(f"SUM({c} * quantidade) AS {c}" for c in CAMPOS_CONTADOR)
+        agrupar = f" GROUP BY {', '.join(por)} ORDER BY {', '.join(por)}" if por else ""
+        selecao = ", ".join(list(por) + [somas])
+        with closing(self._conectar()) as conexao:
+            cursor = conexao.execute(f"SELECT {selecao} FROM registros WHERE {onde}{agrupar}", parametros)
+            nomes = [d[0] for d in cursor.description]
+            return [dict(zip(nomes, linha)) for linha in cursor]
+
+    def periodo(self) -> Tuple[Optional[str], Optional[str], int]:
+        """(primeira data, última data, nº de linhas) do histórico."""
+        if not self.disponivel():
+            return None, None, 0
+        with closing(self._conectar()) as conexao:
+            return conexao.execute(
+                "SELECT MIN(data), MAX(data), COALESCE(SUM(quantidade), 0) FROM registros WHERE data != ''"
+            ).fetchone()
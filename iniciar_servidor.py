@@ -0,0 +1,34 @@
+"""
+Inicia o Streamlit já aquecendo o processo (conexão, vendedores, registros recentes, imports).
+
+Uso (comando de start no Render):
+    python iniciar_servidor.py
+
+Equivale a `streamlit run app.py`, mas o aquecimento começa junto com o servidor e não na
+primeira visita. A porta vem de PORT (Render) ou usa 8501.
+"""
+import logging
+import os
+
+from streamlit.web import bootstrap
+
+import aquecimento
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    aquecimento.iniciar_aquecimento()
+
+    opcoes = {
+        "server_port": int(os.environ.get("PORT", "8501")),
+        "server_address": "0.0.0.0",
+        "server_headless": True,
+    }
+    bootstrap.load_config_options(flag_options=opcoes)
+    bootstrap.run(os.path.join(PASTA, "app.py"), False, [], opcoes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+from typing import Dict, Optional
+import heapq
+import itertools
+import os
+import threading
+import time
+
+# 🔹 Prioridades (menor = atendido primeiro)
+PRIORIDADE_REGISTRO = 0   # registrar_atendimento: nunca pode esperar atrás de relatório
+PRIORIDADE_PADRAO = 1     # bootstrap, vendedores, Config
+PRIORIDADE_RELATORIO = 2
+PRIORIDADE_BACKUP = 3
+
+NOMES_PRIORIDADE = {
+    PRIORIDADE_REGISTRO: "registro",
+    PRIORIDADE_PADRAO: "padrao",
+    PRIORIDADE_RELATORIO: "relatorio",
+    PRIORIDADE_BACKUP: "backup",
+}
+
+# Cota do Sheets por usuário (conta de serviço): 60 leituras e 60 escritas por minuto
+LEITURAS_POR_MINUTO = int(os.environ.get("LIMITE_LEITURAS_POR_MINUTO", "60"))
+ESCRITAS_POR_MINUTO = int(os.environ.get("LIMITE_ESCRITAS_POR_MINUTO", "60"))
+RAJADA_MAXIMA = 10
+
+
+class LimiteExcedido(TimeoutError):
+    """Não houve cota disponível dentro do tempo de espera."""
+
+
+class BaldeTokens:
+    """
+    Token bucket compartilhado por todas as sessões do processo.
+    Quem espera é atendido por prioridade e, na mesma prioridade, por ordem de chegada.
+    """
+
+    def __init__(self, nome: str, por_minuto: int, rajada: int = RAJADA_MAXIMA):
+        self.nome = nome
+        self.taxa = por_minuto / 60.0
+        self.capacidade = float(max(1, min(rajada, por_minuto)))
+        self._tokens = self.capacidade
+        self._ultimo = time.monotonic()
+        self._fila = []  # heap de (prioridade, ordem)
+        self._ordem = itertools.count()
+        self._cond = threading.Condition()
+
+        # Métricas
+        self.fila_maxima = 0
+        self.adquiridos = {nome_p: 0 for nome_p in NOMES_PRIORIDADE.values()}
+        self.espera_total = 0.0
+        self.recusados = 0
+
+    def _repor(self):
+        agora = time.monotonic()
+        self._tokens = min(self.capacidade, self._tokens + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+
+    def adquirir(self, prioridade: int = PRIORIDADE_PADRAO, timeout: Optional[float] = None) -> None:
+        """Bloqueia até haver token para esta prioridade. Lança LimiteExcedido no timeout."""
+        inicio = time.monotonic()
+        prazo = None if timeout is None else inicio + timeout
+        with self._cond:
+            senha = (prioridade, next(self._ordem))
+            heapq.heappush(self._fila, senha)
+            self.fila_maxima = max(self.fila_maxima, len(self._fila))
+            try:
+                while True:
+                    self._repor()
+                    if self._fila[0] == senha and self._tokens >= 1:
+                        self._tokens -= 1
+                        break
+
+                    espera = (1 - self._tokens) / self.taxa if self._tokens < 1 else None
+                    if prazo is not None:
+                        restante = prazo - time.monotonic()
+                        if restante <= 0:
+                            self.recusados += 1
+                            raise LimiteExcedido(f"Cota de '{self.nome}' esgotada; tente novamente.")
+                        espera = restante if espera is None else min(espera, restante)
+                    self._cond.wait(espera)
+            finally:
+                self._fila.remove(senha)
+                heapq.heapify(self._fila)
+                self._cond.notify_all()
+
+            nome_p = NOMES_PRIORIDADE.get(prioridade, str(prioridade))
+            self.adquiridos[nome_p] = self.adquiridos.get(nome_p, 0) + 1
+            self.espera_total += time.monotonic() - inicio
+
+    def metricas(self) -> Dict:
+        with self._cond:
+            self._repor()
+            total = sum(self.adquiridos.values())
+            return {
+                "fila_atual": len(self._fila),
+                "fila_maxima": self.fila_maxima,
+                "tokens_disponiveis": round(self._tokens, 2),
+                "adquiridos": dict(self.adquiridos),
+                "espera_media_ms": round(self.espera_total / total * 1000, 1) if total else 0.0,
+                "recusados": self.recusados,
+            }
+
+
+# === BALDES DO PROCESSO ===
+BALDES = {
+    "leitura": BaldeTokens("leitura", LEITURAS_POR_MINUTO),
+    "escrita": BaldeTokens("escrita", ESCRITAS_POR_MINUTO),
+}
+
+
+def adquirir(cota: str, prioridade: int = PRIORIDADE_PADRAO, timeout: Optional[float] = None) -> None:
+    balde = BALDES.get(cota)
+    if balde is not None:
+        balde.adquirir(prioridade, timeout)
+
+
+def metricas() -> Dict[str, Dict]:
+    return {nome: balde.metricas() for nome, balde in BALDES.items()}
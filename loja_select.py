@@ -1,25 +1,50 @@
 import streamlit as st
+from lojas import CadastroLojas
+
+# 🔹 Opções exibidas de uma vez no seletor; com mais lojas, a busca filtra a lista
+MAX_OPCOES_LOJA = 50
+
+
+def _cadastro_lojas() -> CadastroLojas:
+    """Cadastro da 'Config' (cache do processo); sem planilha, as lojas padrão."""
+    gsheets = st.session_state.get('gsheets')
+    if gsheets is None:
+        return CadastroLojas.de_config({})
+    return gsheets.get_lojas()
+
 
 def tl_loja():
     st.title("🏪 SELECIONE A LOJA")
-    
-    # 🔁 Substitua esta lista pelos nomes reais das suas lojas
-    lojas = [
-        "LOJA IRECE",
-        "LOJA JACOBINA",
-        "LOJA SEABRA"
-    ]
-    
-    loja = st.selectbox("Selecione sua loja:", lojas, index=0, key="loja_select")
+
+    cadastro = _cadastro_lojas()
+    termo = ""
+    if len(cadastro) > MAX_OPCOES_LOJA:
+        termo = st.text_input("🔍 Buscar loja", placeholder="Digite parte do nome", key="busca_loja")
+
+    lojas = cadastro.buscar(termo, MAX_OPCOES_LOJA)
+    if not lojas:
+        st.warning("⚠️ Nenhuma loja encontrada para a busca.")
+    else:
+        total = len(cadastro.buscar(termo)) if termo else len(cadastro)
+        if total > len(lojas):
+            st.caption(f"Mostrando {len(lojas)} de {total} lojas — refine a busca.")
+
+    # A loja da sessão anterior vem selecionada, se estiver entre as opções
+    atual = st.session_state.get('loja', '').strip().upper()
+    loja = st.selectbox(
+        "Selecione sua loja:", lojas,
+        index=lojas.index(atual) if atual in lojas else 0,
+        key="loja_select"
+    )
     col1, col2 = st.columns(2)
-    
+
     with col1:
-        if st.button("✅ CONFIRMAR", use_container_width=True, key="btn_confirmar_loja"):
+        if st.button("✅ CONFIRMAR", use_container_width=True, key="btn_confirmar_loja", disabled=not loja):
             st.session_state.loja = loja
             st.session_state.etapa = 'atendimento'
             st.rerun()
-    
+
     with col2:
         if st.button("↩️ VOLTAR", use_container_width=True, key="btn_voltar_loja"):
             st.session_state.etapa = 'loguin'  # ⚠️ Corrigir para 'login' se for um typo
-            st.rerun()
\ No newline at end of file
+            st.rerun()
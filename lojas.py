@@ -0,0 +1,123 @@
+"""
+Cadastro de lojas lido da aba 'Config'.
+
+Cada loja é uma linha com a chave 'loja:<NOME>' e, na coluna B, um JSON opcional:
+
+    loja:LOJA IRECE    {"fuso": "America/Bahia", "vendedores": ["ANA", "BIA"], "planilha_shard": "<id>"}
+
+- fuso: fuso horário da loja (padrão America/Sao_Paulo), usado na data/hora dos registros;
+- vendedores: vendedores da loja; sem a lista, vale a coluna única da aba 'ab_vendedor';
+- planilha_shard: planilha onde são criadas as abas de shard da loja ("" = principal).
+
+Sem nenhuma chave 'loja:' na Config valem as três lojas originais, para não mudar nada em
+instalações antigas. O cadastro é montado uma vez a partir da Config em cache e guardado no
+cache do processo (descartado junto com ela quando a planilha muda).
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import json
+import logging
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Chaves na aba 'Config'
+PREFIXO_CHAVE = "loja:"
+FUSO_PADRAO = "America/Sao_Paulo"
+LOJAS_PADRAO = ("LOJA IRECE", "LOJA JACOBINA", "LOJA SEABRA")
+
+
+def normalizar_busca(texto: str) -> str:
+    """Maiúsculas sem acentos, para buscar 'irece' e achar 'LOJA IRECÊ'."""
+    return unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode().upper().strip()
+
+
+class Loja:
+    """Uma loja do cadastro."""
+
+    __slots__ = ("nome", "fuso", "vendedores", "planilha_shard")
+
+    def __init__(self, nome: str, fuso: str = FUSO_PADRAO, vendedores: Iterable[str] = (),
+                 planilha_shard: str = ""):
+        self.nome = nome.strip().upper()
+        self.fuso = fuso or FUSO_PADRAO
+        self.vendedores: Tuple[str, ...] = tuple(v.strip() for v in vendedores if v and str(v).strip())
+        self.planilha_shard = planilha_shard or ""
+
+    @classmethod
+    def de_valor(cls, nome: str, valor: str) -> "Loja":
+        try:
+            dados = json.loads(valor) if valor and valor.strip() else {}
+        except ValueError:
+            logger.warning(f"⚠️ Cadastro da loja '{nome}' com JSON inválido; usando o padrão")
+            dados = {}
+        if not isinstance(dados, dict):
+            dados = {}
+        return cls(nome, dados.get("fuso", FUSO_PADRAO), dados.get("vendedores") or (), dados.get("planilha_shard", ""))
+
+    def para_valor(self) -> str:
+        dados = {}
+        if self.fuso != FUSO_PADRAO:
+            dados["fuso"] = self.fuso
+        if self.vendedores:
+            dados["vendedores"] = list(self.vendedores)
+        if self.planilha_shard:
+            dados["planilha_shard"] = self.planilha_shard
+        return json.dumps(dados, ensure_ascii=False) if dados else ""
+
+    @property
+    def zona(self) -> ZoneInfo:
+        try:
+            return ZoneInfo(self.fuso)
+        except (ZoneInfoNotFoundError, ValueError):
+            logger.warning(f"⚠️ Fuso inválido para {self.nome} ({self.fuso}); usando {FUSO_PADRAO}")
+            return ZoneInfo(FUSO_PADRAO)
+
+
+class CadastroLojas:
+    """Lojas em ordem alfabética, com índice normalizado para a busca do seletor."""
+
+    def __init__(self, lojas: Iterable[Loja]):
+        self._lojas: Dict[str, Loja] = {loja.nome: loja for loja in lojas if loja.nome}
+        self.nomes: List[str] = sorted(self._lojas)
+        self._indice: List[Tuple[str, str]] = [(normalizar_busca(nome), nome) for nome in self.nomes]
+
+    @classmethod
+    def de_config(cls, config: Dict[str, str]) -> "CadastroLojas":
+        lojas = [
+            Loja.de_valor(chave[len(PREFIXO_CHAVE):], valor)
+            for chave, valor in config.items()
+            if chave.lower().startswith(PREFIXO_CHAVE) and chave[len(PREFIXO_CHAVE):].strip()
+        ]
+        return cls(lojas or [Loja(nome) for nome in LOJAS_PADRAO])
+
+    def para_config(self) -> Dict[str, str]:
+        return {f"{PREFIXO_CHAVE}{loja.nome}": loja.para_valor() for loja in self._lojas.values()}
+
+    def __len__(self) -> int:
+        return len(self.nomes)
+
+    def __contains__(self, nome: str) -> bool:
+        return bool(nome) and nome.strip().upper() in self._lojas
+
+    def obter(self, nome: Optional[str]) -> Optional[Loja]:
+        return self._lojas.get(nome.strip().upper()) if nome else None
+
+    def buscar(self, termo: str = "", limite: Optional[int] = None) -> List[str]:
+        """Nomes que contêm o termo (sem diferenciar caixa/acentos); início de palavra vem antes."""
+        termo = normalizar_busca(termo)
+        if not termo:
+            return self.nomes[:limite] if limite else list(self.nomes)
+        inicio, meio = [], []
+        for chave, nome in self._indice:
+            posicao = chave.find(termo)
+            if posicao == 0 or (posicao > 0 and chave[posicao - 1] == " "):
+                inicio.append(nome)
+            elif posicao > 0:
+                meio.append(nome)
+        encontrados = inicio + meio
+        return encontrados[:limite] if limite else encontrados
+
+    def zona(self, nome: Optional[str]) -> ZoneInfo:
+        loja = self.obter(nome)
+        return loja.zona if loja else ZoneInfo(FUSO_PADRAO)
@@ -0,0 +1,227 @@
+"""
+Mapa de calor do movimento: dia da semana × hora, por loja.
+
+As colunas DATA e HORA já vêm convertidas na tabela compacta (dia ordinal e minutos), então
+a contagem é um único np.bincount sobre o índice (loja, mês, dia da semana, hora).
+O resultado fica guardado por (loja, mês) em matrizes 7×24, montadas uma vez por dia e
+atualizadas a cada gravação deste processo; uma consulta soma as matrizes dos meses pedidos.
+"""
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+import logging
+import threading
+import time
+
+import numpy as np
+
+from codificacao_compacta import COLUNA_HORA, INDICE_CONTADOR
+from google_planilha import ao_gravar
+from semeadura import FilaSemeadura
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Configuração
+DIAS_SEMANA = ("SEG", "TER", "QUA", "QUI", "SEX", "SÁB", "DOM")  # date.weekday(): segunda = 0
+HORAS = 24
+TODOS = "*"
+FUSO = ZoneInfo("America/Sao_Paulo")
+
+Chave = Tuple[str, str]  # (loja, 'MM/AAAA')
+
+
+def _nome(texto: str) -> str:
+    return str(texto).strip().upper()
+
+
+def _mes(dia: date) -> str:
+    return dia.strftime("%m/%Y")
+
+
+def _hoje() -> str:
+    return datetime.now(FUSO).strftime("%d/%m/%Y")
+
+
+class MapaCalor:
+    """Matrizes 7×24 de atendimentos por (loja, mês); ver docstring do módulo."""
+
+    def __init__(self):
+        self.dia = ""
+        self.semeado = False
+        self.versao = 0
+        self._contagens: Dict[Chave, np.ndarray] = {}
+        self._dias: Dict[Chave, np.ndarray] = {}  # nº de datas com movimento, por dia da semana
+        self._vistos: set = set()                 # (loja, dia ordinal) já contados em _dias
+        self._fila = FilaSemeadura()
+        self._lock = threading.Lock()
+
+    def semear(self, planilha) -> None:
+        """Recalcula a partir da tabela compacta em cache, no máximo uma vez por dia."""
+        hoje = _hoje()
+        with self._lock:
+            if (self.semeado and self.dia == hoje) or self._fila.ativa:
+                return
+            self._fila.iniciar()
+
+        inicio = time.perf_counter()
+        try:
+            tabela = planilha.get_tabela_compacta()
+            contagens, dias, vistos = agregar(tabela)
+        except Exception:
+            with self._lock:
+                self._fila.cancelar()
+            raise
+        with self._lock:
+            self._contagens, self._dias, self._vistos = contagens, dias, vistos
+            # Gravações avisadas durante a carga: só as que a tabela lida ainda não tinha
+            for registro in self._fila.concluir(tabela):
+                self._adicionar(registro)
+            self.dia, self.semeado = hoje, True
+            self.versao += 1
+        logger.info(
+            f"🔥 Mapa de calor montado: {len(contagens)} matrizes loja/mês "
+            f"em {(time.perf_counter() - inicio) * 1000:.0f} ms"
+        )
+
+    def registrar(self, registros: Iterable) -> None:
+        """Ouvinte de gravação: soma cada atendimento novo na célula da sua hora."""
+        with self._lock:
+            if self._fila.guardar(registros):
+                return
+            if not self.semeado:
+                return  # já estão na planilha e fora do cache: a semeadura vai lê-los
+            alterou = False
+            for registro in registros:
+                alterou = self._adicionar(registro) or alterou
+            if alterou:
+                self.versao += 1
+
+    def _adicionar(self, registro) -> bool:
+        try:
+            dia = datetime.strptime(registro.data, "%d/%m/%Y").date()
+            hora = int(registro.hora.split(":")[0])
+            peso = int(registro.atendimento or 0)
+        except (ValueError, AttributeError):
+            return False
+        if not 0 <= hora < HORAS or not peso:
+            return False
+        loja = _nome(registro.loja)
+        chave = (loja, _mes(dia))
+        matriz = self._contagens.setdefault(chave, np.zeros((7, HORAS), dtype=np.int32))
+        matriz[dia.weekday(), hora] += peso
+        if (loja, dia.toordinal()) not in self._vistos:
+            self._vistos.add((loja, dia.toordinal()))
+            self._dias.setdefault(chave, np.zeros(7, dtype=np.int32))[dia.weekday()] += 1
+        return True
+
+    def consultar(self, loja: str = TODOS, meses: Optional[Iterable[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Soma das matrizes de uma loja (ou de todas) nos meses pedidos (None = todos).
+        Retorna (atendimentos 7×24, nº de datas com movimento por dia da semana).
+        """
+        loja = _nome(loja)
+        meses = None if meses is None else set(meses)
+        total = np.zeros((7, HORAS), dtype=np.int64)
+        dias = np.zeros(7, dtype=np.int64)
+        with self._lock:
+            for (l, mes), matriz in self._contagens.items():
+                if (loja == TODOS or l == loja) and (meses is None or mes in meses):
+                    total += matriz
+                    dias += self._dias.get((l, mes), 0)
+        return total, dias
+
+    def media_por_dia(self, loja: str = TODOS, meses: Optional[Iterable[str]] = None) -> np.ndarray:
+        """
+        Atendimentos médios em cada hora de um dia da semana típico (7×24).
+        Com todas as lojas, a média é por loja-dia (cada loja aberta conta como um dia).
+        """
+        total, dias = self.consultar(loja, meses)
+        return np.divide(total, dias[:, None], out=np.zeros(total.shape), where=dias[:, None] > 0)
+
+    def lojas(self) -> List[str]:
+        with self._lock:
+            return sorted({l for l, _ in self._contagens})
+
+    def meses(self) -> List[str]:
+        """Meses com movimento, do mais recente para o mais antigo."""
+        with self._lock:
+            meses = {m for _, m in self._contagens}
+        return sorted(meses, key=lambda m: (m[3:], m[:2]), reverse=True)
+
+
+def _horas(tabela) -> np.ndarray:
+    """
+    Hora (0–23) de cada linha, -1 se vazia ou ilegível. Outras grafias (ex.: '9:05') e as
+    tabelas salvas antes dos segundos ficam nas exceções: essas células são lidas uma a uma.
+    """
+    horas = np.where(tabela.horas >= 0, tabela.horas // 60, -1).astype(np.int64)
+    if COLUNA_HORA not in tabela.cabecalhos:
+        return horas
+    j = tabela.cabecalhos.index(COLUNA_HORA)
+    for (i, coluna), texto in tabela.excecoes.items():
+        if coluna != j:
+            continue
+        try:
+            hora = int(texto.split(":")[0])
+        except ValueError:
+            continue
+        if 0 <= hora < HORAS:
+            horas[i] = hora
+    return horas
+
+
+def agregar(tabela) -> Tuple[Dict[Chave, np.ndarray], Dict[Chave, np.ndarray], set]:
+    """Conta os atendimentos da tabela inteira por (loja, mês, dia da semana, hora) com um bincount."""
+    contagens: Dict[Chave, np.ndarray] = {}
+    dias: Dict[Chave, np.ndarray] = {}
+    vistos: set = set()
+    if tabela.n == 0 or "LOJA" not in tabela.textos:
+        return contagens, dias, vistos
+
+    horas = _horas(tabela)
+    validas = (tabela.datas > 0) & (horas >= 0)
+    if not validas.any():
+        return contagens, dias, vistos
+    peso = tabela.contadores[validas, INDICE_CONTADOR["ATENDIMENTO"]].astype(np.int64)
+    datas = tabela.datas[validas].astype(np.int64)
+    horas = horas[validas]
+    # date.fromordinal(1) é uma segunda-feira, então (ordinal - 1) % 7 == date.weekday()
+    semana = (datas - 1) % 7
+
+    brutos, categorias = tabela.codigos("LOJA")
+    nomes_loja = sorted({_nome(c) for c in categorias})
+    posicao = {nome: i for i, nome in enumerate(nomes_loja)}
+    lojas = np.array([posicao[_nome(c)] for c in categorias], dtype=np.int64)[brutos[validas]]
+
+    # Cada data distinta é convertida para mês uma única vez
+    unicas, inverso = np.unique(datas, return_inverse=True)
+    rotulos = [_mes(date.fromordinal(d)) for d in unicas.tolist()]
+    nomes_mes = sorted(set(rotulos))
+    posicao_mes = {m: i for i, m in enumerate(nomes_mes)}
+    mes_da_data = np.array([posicao_mes[m] for m in rotulos], dtype=np.int64)
+    meses = mes_da_data[inverso.reshape(-1)]
+
+    n_lojas, n_meses = len(nomes_loja), len(nomes_mes)
+    grupo = lojas * n_meses + meses
+    celulas = np.bincount((grupo * 7 + semana) * HORAS + horas, weights=peso,
+                          minlength=n_lojas * n_meses * 7 * HORAS).astype(np.int32)
+    celulas = celulas.reshape(n_lojas * n_meses, 7, HORAS)
+
+    # Datas distintas com movimento por (loja, mês, dia da semana), para a média por dia
+    pares = np.unique(np.stack((lojas, datas), axis=1)[peso > 0], axis=0)
+    dias_distintos = np.zeros((n_lojas * n_meses, 7), dtype=np.int32)
+    if len(pares):
+        grupo_par = pares[:, 0] * n_meses + mes_da_data[np.searchsorted(unicas, pares[:, 1])]
+        np.add.at(dias_distintos, (grupo_par, (pares[:, 1] - 1) % 7), 1)
+        vistos = {(nomes_loja[l], d) for l, d in pares.tolist()}
+
+    for g in np.flatnonzero(celulas.reshape(len(celulas), -1).any(axis=1)).tolist():
+        chave = (nomes_loja[g // n_meses], nomes_mes[g % n_meses])
+        contagens[chave] = celulas[g].copy()
+        dias[chave] = dias_distintos[g].copy()
+    return contagens, dias, vistos
+
+
+# === MAPA DO PROCESSO ===
+MAPA_CALOR = MapaCalor()
+ao_gravar(MAPA_CALOR.registrar)
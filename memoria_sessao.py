@@ -0,0 +1,199 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Limites (env em MB/minutos para ajustar no Render sem mudar código)
+LIMITE_TOTAL = int(float(os.environ.get("MEMORIA_SESSOES_MB", "256")) * 1024 * 1024)
+LIMITE_POR_SESSAO = int(float(os.environ.get("MEMORIA_POR_SESSAO_MB", "32")) * 1024 * 1024)
+TTL_OCIOSA = float(os.environ.get("MEMORIA_TTL_MINUTOS", "15")) * 60  # objetos de sessões paradas
+TTL_SESSAO = 4 * 3600  # sessão sem atividade some do painel
+PROFUNDIDADE_MEDICAO = 4
+
+
+def tamanho_de(valor: Any, profundidade: int = PROFUNDIDADE_MEDICAO) -> int:
+    """Estimativa em bytes: exata para bytes/DataFrame, recursiva (limitada) para o resto."""
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return len(valor)
+    uso = getattr(valor, "memory_usage", None)
+    if callable(uso) and hasattr(valor, "columns"):
+        try:
+            return int(uso(index=True, deep=True).sum())
+        except Exception:
+            pass
+    nbytes = getattr(valor, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+
+    tamanho = sys.getsizeof(valor, 0)
+    if profundidade <= 0:
+        return tamanho
+    if isinstance(valor, dict):
+        tamanho += sum(tamanho_de(k, profundidade - 1) + tamanho_de(v, profundidade - 1) for k, v in valor.items())
+    elif isinstance(valor, (list, tuple, set, frozenset)):
+        tamanho += sum(tamanho_de(v, profundidade - 1) for v in valor)
+    return tamanho
+
+
+class _Sessao:
+    __slots__ = ("usuario", "loja", "ultima_atividade", "bytes_estado", "objetos")
+
+    def __init__(self):
+        self.usuario = ""
+        self.loja = ""
+        self.ultima_atividade = time.time()
+        self.bytes_estado = 0
+        self.objetos: Dict[str, Tuple[Any, int]] = {}
+
+
+class MemoriaSessoes:
+    """
+    Objetos pesados (PDFs, DataFrames) guardados fora do st.session_state, com contabilidade
+    por sessão. Política: sessão ociosa perde os objetos após o TTL; acima do limite total
+    (ou por sessão) sai o objeto usado há mais tempo (LRU).
+    """
+
+    def __init__(self, limite_total: int = LIMITE_TOTAL, limite_por_sessao: int = LIMITE_POR_SESSAO, ttl_ociosa: float = TTL_OCIOSA):
+        self.limite_total = limite_total
+        self.limite_por_sessao = limite_por_sessao
+        self.ttl_ociosa = ttl_ociosa
+        self._sessoes: Dict[str, _Sessao] = {}
+        self._lru: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+        self._total = 0
+        self.descartes = 0
+        self._lock = threading.Lock()
+
+    def _sessao(self, sessao_id: str) -> _Sessao:
+        sessao = self._sessoes.get(sessao_id)
+        if sessao is None:
+            sessao = self._sessoes[sessao_id] = _Sessao()
+        return sessao
+
+    def _remover(self, sessao_id: str, nome: str) -> None:
+        sessao = self._sessoes.get(sessao_id)
+        if sessao is None or nome not in sessao.objetos:
+            return
+        _, tamanho = sessao.objetos.pop(nome)
+        self._lru.pop((sessao_id, nome), None)
+        self._total -= tamanho
+
+    def _aplicar_limites(self, sessao_id: str) -> None:
+        sessao = self._sessoes[sessao_id]
+        while sum(t for _, t in sessao.objetos.values()) > self.limite_por_sessao and sessao.objetos:
+            mais_antigo = next(n for (s, n) in self._lru if s == sessao_id)
+            self._remover(sessao_id, mais_antigo)
+            self.descartes += 1
+        while self._total > self.limite_total and self._lru:
+            self._remover(*next(iter(self._lru)))
+            self.descartes += 1
+
+    # === API POR SESSÃO ===
+
+    def tocar(self, sessao_id: str, usuario: str = "", loja: str = "", estado: Optional[Dict] = None) -> None:
+        """Marca atividade (chamado a cada execução do app) e mede o st.session_state."""
+        bytes_estado = tamanho_de(dict(estado)) if estado is not None else None
+        with self._lock:
+            sessao = self._sessao(sessao_id)
+            sessao.ultima_atividade = time.time()
+            sessao.usuario = usuario or sessao.usuario
+            sessao.loja = loja or sessao.loja
+            if bytes_estado is not None:
+                sessao.bytes_estado = bytes_estado
+            self._limpar_ociosas()
+
+    def guardar(self, sessao_id: str, nome: str, valor: Any) -> None:
+        tamanho = tamanho_de(valor)
+        with self._lock:
+            self._remover(sessao_id, nome)
+            sessao = self._sessao(sessao_id)
+            sessao.objetos[nome] = (valor, tamanho)
+            sessao.ultima_atividade = time.time()
+            self._lru[(sessao_id, nome)] = None
+            self._total += tamanho
+            self._aplicar_limites(sessao_id)
+
+    def obter(self, sessao_id: str, nome: str, padrao: Any = None) -> Any:
+        with self._lock:
+            sessao = self._sessoes.get(sessao_id)
+            if sessao is None or nome not in sessao.objetos:
+                return padrao
+            self._lru.move_to_end((sessao_id, nome))
+            return sessao.objetos[nome][0]
+
+    def descartar(self, sessao_id: str, nome: str) -> None:
+        with self._lock:
+            self._remover(sessao_id, nome)
+
+    # === MANUTENÇÃO E PAINEL ===
+
+    def _limpar_ociosas(self) -> None:
+        agora = time.time()
+        for sessao_id, sessao in list(self._sessoes.items()):
+            parada = agora - sessao.ultima_atividade
+            if parada > self.ttl_ociosa and sessao.objetos:
+                for nome in list(sessao.objetos):
+                    self._remover(sessao_id, nome)
+                    self.descartes += 1
+            if parada > TTL_SESSAO:
+                del self._sessoes[sessao_id]
+
+    def limpar_ociosas(self) -> None:
+        with self._lock:
+            self._limpar_ociosas()
+
+    def resumo(self) -> List[Dict]:
+        """Uma linha por sessão, da que mais ocupa para a que menos ocupa."""
+        agora = time.time()
+        with self._lock:
+            linhas = [
+                {
+                    "sessao": sessao_id[:8],
+                    "usuario": sessao.usuario,
+                    "loja": sessao.loja,
+                    "ociosa_min": round((agora - sessao.ultima_atividade) / 60, 1),
+                    "estado_kb": round(sessao.bytes_estado / 1024, 1),
+                    "objetos": ", ".join(sessao.objetos),
+                    "objetos_kb": round(sum(t for _, t in sessao.objetos.values()) / 1024, 1),
+                }
+                for sessao_id, sessao in self._sessoes.items()
+            ]
+        return sorted(linhas, key=lambda l: l["estado_kb"] + l["objetos_kb"], reverse=True)
+
+    def metricas(self) -> Dict:
+        with self._lock:
+            return {
+                "sessoes": len(self._sessoes),
+                "objetos": len(self._lru),
+                "total_mb": round(self._total / 1024 / 1024, 2),
+                "limite_mb": round(self.limite_total / 1024 / 1024, 2),
+                "descartes": self.descartes,
+            }
+
+
+# === MEMÓRIA DO PROCESSO ===
+MEMORIA = MemoriaSessoes()
+
+
+def sessao_atual() -> str:
+    """ID da sessão do Streamlit que está executando o script ('' fora de uma sessão)."""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else ""
+
+
+def guardar(nome: str, valor: Any) -> None:
+    MEMORIA.guardar(sessao_atual(), nome, valor)
+
+
+def obter(nome: str, padrao: Any = None) -> Any:
+    return MEMORIA.obter(sessao_atual(), nome, padrao)
+
+
+def descartar(nome: str) -> None:
+    MEMORIA.descartar(sessao_atual(), nome)
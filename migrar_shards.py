@@ -0,0 +1,136 @@
+"""
+Divide a aba 'ab_dados' em shards por loja e ano.
+
+Uso:
+    python migrar_shards.py --simular
+    python migrar_shards.py --limpar-origem      # uma aba por loja/ano na planilha principal
+    python migrar_shards.py --limpar-origem --modo planilha --compartilhar gerente@empresa.com
+
+--limpar-origem é obrigatório: com shards ativos a leitura soma os shards e o que restar na
+'ab_dados', então as linhas migradas precisam sair de lá antes da ativação (senão contariam
+duas vezes). O intervalo lido é conferido antes de ser apagado e os shards só são ativados
+depois da remoção. As linhas gravadas durante a migração ficam abaixo desse intervalo, não são
+apagadas e continuam sendo lidas da 'ab_dados'.
+
+A migração usa a mesma reserva da Config que o backup (backup_em_andamento) e não roda
+enquanto um backup estiver em andamento. Os servidores em execução passam a ler e gravar
+nos shards quando relêem a Config (GooglePlanilha.verificar_alteracoes), em até
+VALIDADE_CADASTROS_PLANILHA segundos.
+"""
+import argparse
+from collections import defaultdict
+
+import gspread
+
+from google_planilha import GooglePlanilha, SCOPES_DRIVE, SCOPES_SHEETS, SPREADSHEET_NAME
+from shards import CHAVE_SHARDING_ATIVO, DiretorioShards, ano_do_registro, nome_aba_shard
+
+TAMANHO_LOTE = 500
+
+
+def _destino_aba(gs: GooglePlanilha, loja: str, ano: int):
+    """Shard como aba da planilha principal."""
+    destino = gs.diretorio_shards.destino(loja, ano)
+    if destino:
+        return gs._abrir_destino(destino)
+    return gs._criar_shard(loja, ano)
+
+
+def _destino_planilha(gs: GooglePlanilha, cliente_drive, loja: str, ano: int, compartilhar):
+    """Shard como planilha separada (precisa de escopo de Drive para criar o arquivo)."""
+    destino = gs.diretorio_shards.destino(loja, ano)
+    if destino:
+        return gs._abrir_destino(destino)
+
+    planilha = cliente_drive.create(f"{SPREADSHEET_NAME} - {loja} - {ano}")
+    for email in compartilhar:
+        planilha.share(email, perm_type="user", role="writer", notify=False)
+    aba = planilha.sheet1
+    aba.update_title(nome_aba_shard(loja, ano))
+    aba.update("A1", [gs.esquema.cabecalhos])
+
+    gs.cache.invalidar("config")
+    gs.diretorio_shards = DiretorioShards.de_config(gs._ler_config())
+    gs.diretorio_shards.adicionar(loja, ano, aba.title, planilha.id)
+    gs._gravar_config(gs.diretorio_shards.para_config())
+    return aba
+
+
+def migrar(gs: GooglePlanilha, modo: str = "aba", compartilhar=(), limpar_origem: bool = False, simular: bool = False):
+    if not simular and not limpar_origem:
+        raise SystemExit("❌ Use --limpar-origem: sem remover as linhas da 'ab_dados' elas seriam lidas em dobro.")
+    if simular:
+        _migrar(gs, modo, compartilhar, simular=True)
+        return
+    if not gs.reservar_ab_dados():
+        raise SystemExit("❌ Há um backup da 'ab_dados' em andamento; rode a migração depois que ele terminar.")
+    try:
+        _migrar(gs, modo, compartilhar, simular=False)
+    finally:
+        gs.liberar_ab_dados()
+
+
+def _migrar(gs: GooglePlanilha, modo: str, compartilhar, simular: bool):
+    valores = gs.aba_dados.get_all_values()
+    linhas = valores[1:]
+    if not linhas:
+        print("📭 Nenhuma linha para migrar.")
+        return
+
+    idx_loja = gs.esquema.indice("LOJA")
+    idx_data = gs.esquema.indice("DATA")
+    grupos = defaultdict(list)
+    for linha in linhas:
+        loja = linha[idx_loja].strip().upper() if idx_loja < len(linha) else ""
+        data = linha[idx_data] if idx_data < len(linha) else ""
+        grupos[(loja or "SEM LOJA", ano_do_registro(data))].append(linha)
+
+    cliente_drive = None
+    if modo == "planilha" and not simular:
+        cliente_drive = gspread.service_account_from_dict(gs.credentials_dict, scopes=SCOPES_SHEETS + SCOPES_DRIVE)
+
+    for (loja, ano), linhas_grupo in sorted(grupos.items()):
+        print(f"➡️  {loja} / {ano}: {len(linhas_grupo)} linhas")
+        if simular:
+            continue
+        if modo == "planilha":
+            aba = _destino_planilha(gs, cliente_drive, loja, ano, compartilhar)
+        else:
+            aba = _destino_aba(gs, loja, ano)
+        for i in range(0, len(linhas_grupo), TAMANHO_LOTE):
+            aba.append_rows(linhas_grupo[i:i + TAMANHO_LOTE], value_input_option="USER_ENTERED")
+
+    if simular:
+        print("🔎 Simulação concluída; nada foi gravado.")
+        return
+
+    # Apaga só o intervalo lido, e só se ele não mudou (ex.: limpeza do backup no meio do caminho);
+    # linhas acrescentadas depois ficam preservadas
+    atuais = gs.aba_dados.get_all_values()[1:len(linhas) + 1]
+    if atuais != linhas:
+        print("❌ A 'ab_dados' mudou durante a migração; nada foi apagado e os shards NÃO foram ativados.")
+        print("   Apague as abas de shard criadas e rode a migração de novo.")
+        return
+    gs.aba_dados.delete_rows(2, len(linhas) + 1)
+    print(f"🧹 {len(linhas)} linhas removidas da 'ab_dados'.")
+
+    gs._gravar_config({CHAVE_SHARDING_ATIVO: "1"})
+    print("✅ Shards ativados na aba 'Config'.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Divide a aba 'ab_dados' em shards por loja e ano.")
+    parser.add_argument("--modo", choices=["aba", "planilha"], default="aba",
+                        help="shard como aba da planilha principal ou como planilha separada")
+    parser.add_argument("--compartilhar", nargs="*", default=[],
+                        help="e-mails com acesso de edição às novas planilhas (modo planilha)")
+    parser.add_argument("--limpar-origem", action="store_true",
+                        help="remove da 'ab_dados' as linhas migradas (obrigatório, exceto com --simular)")
+    parser.add_argument("--simular", action="store_true", help="apenas mostra a divisão")
+    args = parser.parse_args()
+
+    migrar(GooglePlanilha(), args.modo, args.compartilhar, args.limpar_origem, args.simular)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Motor dos relatórios por loja e vendedor, sem dependência do Streamlit.
+
+Usado pela tela tl_relatorio_vendedor e pela geração em lote (relatorio_cli.py): recebe os
+registros no formato de get_all_records() — da planilha, do snapshot Arrow ou do histórico
+local — filtra por loja/vendedor/período, escolhe as colunas e soma os totais.
+"""
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import re
+import sys
+
+from exportacao import gerar_arquivo
+
+# 🔹 Colunas dos relatórios
+COLUNAS_TELA = ("DATA", "LOJA", "CLIENTE", "RECEITA", "VENDA", "PERDA", "RESERVA")
+COLUNAS_LOTE = ("DATA", "HORA", "LOJA", "VENDEDOR", "CLIENTE", "ATENDIMENTO", "RECEITA", "VENDA", "PERDA", "RESERVA")
+COLUNAS_NUMERICAS = ("ATENDIMENTO", "RECEITA", "VENDA", "PERDA", "RESERVA")
+
+# Nomes alternativos aceitos para cada coluna (planilhas antigas), procurados por trecho
+SINONIMOS = {
+    "DATA": ("data", "dt"),
+    "HORA": ("hora",),
+    "LOJA": ("loja", "unidade", "filial"),
+    "VENDEDOR": ("vendedor", "consultor"),
+    "CLIENTE": ("cliente", "nome"),
+    "ATENDIMENTO": ("atendimento",),
+    "RECEITA": ("receita", "faturamento"),
+    "VENDA": ("venda", "pedidos"),
+    "PERDA": ("perda", "cancelamentos"),
+    "RESERVA": ("reserva", "agendamento"),
+}
+
+_NAO_NUMERICO = re.compile(r"[^\d.,-]")
+
+
+def numero(valor) -> float:
+    """Converte uma célula de contador ('1', '1,0', 'R$ 2', '' ...) em número; inválidos valem 0."""
+    if isinstance(valor, (int, float)):
+        return valor
+    texto = _NAO_NUMERICO.sub("", str(valor).strip()).replace(",", ".")
+    try:
+        numero = float(texto)
+    except ValueError:
+        return 0
+    return int(numero) if numero.is_integer() else numero
+
+
+def data_do_registro(texto) -> Optional[date]:
+    for formato in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(str(texto).strip(), formato).date()
+        except ValueError:
+            continue
+    return None
+
+
+def mapear_colunas(cabecalhos: Iterable[str], colunas: Sequence[str]) -> Dict[str, str]:
+    """Coluna do relatório → cabeçalho da fonte; o nome exato tem prioridade sobre os sinônimos."""
+    cabecalhos = list(cabecalhos)
+    mapa = {}
+    for coluna in colunas:
+        if coluna in cabecalhos:
+            mapa[coluna] = coluna
+            continue
+        for cab in cabecalhos:
+            if any(p in str(cab).lower() for p in SINONIMOS.get(coluna, (coluna.lower(),))):
+                mapa[coluna] = cab
+                break
+    return mapa
+
+
+class Relatorio:
+    """Linhas e totais de um relatório pronto para exibir ou exportar."""
+
+    __slots__ = ("titulo", "colunas", "linhas", "totais")
+
+    def __init__(self, titulo: str, colunas: Sequence[str], linhas: List[Tuple], totais: Dict[str, float]):
+        self.titulo = titulo
+        self.colunas = list(colunas)
+        self.linhas = linhas
+        self.totais = totais
+
+    @property
+    def nbytes(self) -> int:
+        """Estimativa para a memória de sessões."""
+        return sys.getsizeof(self.linhas) + sum(
+            sys.getsizeof(linha) + sum(sys.getsizeof(v) for v in linha) for linha in self.linhas
+        )
+
+    def como_dicts(self) -> List[Dict]:
+        return [dict(zip(self.colunas, linha)) for linha in self.linhas]
+
+    def linha_total(self) -> Tuple:
+        return tuple(
+            self.totais[c] if c in self.totais else ("TOTAL" if i == 0 else "")
+            for i, c in enumerate(self.colunas)
+        )
+
+    def gerar(self, formato: str) -> bytes:
+        """Arquivo no formato pedido; o PDF leva título e a linha de totais."""
+        if formato == "pdf":
+            return gerar_arquivo(self.colunas, self.linhas + [self.linha_total()], formato, self.titulo)
+        return gerar_arquivo(self.colunas, self.linhas, formato)
+
+
+def montar(
+    registros: Sequence[Dict],
+    loja: Optional[str] = None,
+    vendedor: Optional[str] = None,
+    de: Optional[date] = None,
+    ate: Optional[date] = None,
+    colunas: Sequence[str] = COLUNAS_LOTE,
+    titulo: str = "",
+) -> Relatorio:
+    """Filtra os registros (loja/vendedor sem diferenciar caixa; período inclusivo) e monta o relatório."""
+    if not registros:
+        return Relatorio(titulo, [], [], {})
+
+    mapa = mapear_colunas(registros[0].keys(), colunas)
+    presentes = [c for c in colunas if c in mapa]
+    cab_loja = mapear_colunas(registros[0].keys(), ("LOJA",)).get("LOJA")
+    cab_vendedor = mapear_colunas(registros[0].keys(), ("VENDEDOR",)).get("VENDEDOR")
+    cab_data = mapear_colunas(registros[0].keys(), ("DATA",)).get("DATA")
+    loja = loja.strip().upper() if loja else None
+    vendedor = vendedor.strip().upper() if vendedor else None
+
+    datas: Dict[str, Optional[date]] = {}  # poucas datas distintas: cada uma é convertida uma vez
+    linhas = []
+    for registro in registros:
+        if loja and str(registro.get(cab_loja, "")).strip().upper() != loja:
+            continue
+        if vendedor and str(registro.get(cab_vendedor, "")).strip().upper() != vendedor:
+            continue
+        if de or ate:
+            texto = str(registro.get(cab_data, ""))
+            if texto not in datas:
+                datas[texto] = data_do_registro(texto)
+            dia = datas[texto]
+            if dia is None or (de and dia < de) or (ate and dia > ate):
+                continue
+        linhas.append(tuple(
+            numero(registro.get(mapa[c], "")) if c in COLUNAS_NUMERICAS else registro.get(mapa[c], "")
+            for c in presentes
+        ))
+
+    totais = {
+        c: sum(linha[i] for linha in linhas)
+        for i, c in enumerate(presentes) if c in COLUNAS_NUMERICAS
+    }
+    return Relatorio(titulo, presentes, linhas, totais)
+
+
+def resumir(relatorio: Relatorio, por: str = "VENDEDOR", titulo: Optional[str] = None) -> Relatorio:
+    """Uma linha por valor de `por` (em ordem alfabética) com a soma das colunas numéricas."""
+    if por not in relatorio.colunas:
+        return Relatorio(relatorio.titulo if titulo is None else titulo, [], [], {})
+    indice = relatorio.colunas.index(por)
+    numericas = [(i, c) for i, c in enumerate(relatorio.colunas) if c in COLUNAS_NUMERICAS]
+    somas: Dict[str, List[float]] = {}
+    for linha in relatorio.linhas:
+        soma = somas.setdefault(str(linha[indice]).strip().upper(), [0] * len(numericas))
+        for k, (i, _) in enumerate(numericas):
+            soma[k] += linha[i]
+    linhas = [(chave, *soma) for chave, soma in sorted(somas.items())]
+    return Relatorio(
+        relatorio.titulo if titulo is None else titulo,
+        [por] + [c for _, c in numericas],
+        linhas,
+        dict(relatorio.totais),
+    )
+
+
+def agrupar_por_loja(registros: Iterable[Dict]) -> Dict[str, List[Dict]]:
+    """Separa os registros por loja (nome normalizado), para distribuir entre processos."""
+    grupos: Dict[str, List[Dict]] = {}
+    cab_loja = None
+    for registro in registros:
+        if cab_loja is None:
+            cab_loja = mapear_colunas(registro.keys(), ("LOJA",)).get("LOJA", "LOJA")
+        grupos.setdefault(str(registro.get(cab_loja, "")).strip().upper() or "SEM LOJA", []).append(registro)
+    return grupos
+
+
+def vendedores_de(registros: Iterable[Dict]) -> List[str]:
+    registros = list(registros)
+    if not registros:
+        return []
+    cab = mapear_colunas(registros[0].keys(), ("VENDEDOR",)).get("VENDEDOR")
+    if cab is None:
+        return []
+    return sorted({str(r.get(cab, "")).strip().upper() for r in registros} - {""})
@@ -0,0 +1,135 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+from zoneinfo import ZoneInfo
+import logging
+import threading
+
+from google_planilha import ao_gravar
+from semeadura import FilaSemeadura
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Colunas do painel: (atributo do RegistroAtendimento, cabeçalho na planilha, rótulo)
+COLUNAS_PAINEL = (
+    ("atendimento", "ATENDIMENTO", "ATENDIMENTO"),
+    ("venda", "VENDA", "VENDA"),
+    ("perda", "PERDA", "PERDA"),
+    ("reserva", "RESERVA", "RESERVA"),
+    ("exame", "EXAME DE VISTA", "EXAME"),
+)
+ROTULOS = tuple(rotulo for _, _, rotulo in COLUNAS_PAINEL)
+FUSO = ZoneInfo("America/Sao_Paulo")
+
+
+def _inteiro(valor) -> int:
+    try:
+        return int(str(valor).strip() or 0)
+    except ValueError:
+        return 0
+
+
+def _hoje() -> str:
+    return datetime.now(FUSO).strftime("%d/%m/%Y")
+
+
+def _contagens_do_dia(tabela, hoje: str) -> Dict[Tuple[str, str], List[int]]:
+    dia = datetime.strptime(hoje, "%d/%m/%Y").date()
+    selecao = tabela.mascara(de=dia, ate=dia)
+    contagens: Dict[Tuple[str, str], List[int]] = {}
+    if selecao.any() and "LOJA" in tabela.textos and "VENDEDOR" in tabela.textos:
+        lojas, nomes_loja = tabela.codigos("LOJA")
+        vendedores, nomes_vendedor = tabela.codigos("VENDEDOR")
+        from codificacao_compacta import INDICE_CONTADOR
+
+        indices = [INDICE_CONTADOR[cab] for _, cab, _ in COLUNAS_PAINEL]
+        for i in selecao.nonzero()[0].tolist():
+            chave = (nomes_loja[lojas[i]].strip().upper(), nomes_vendedor[vendedores[i]].strip().upper())
+            linha = contagens.setdefault(chave, [0] * len(COLUNAS_PAINEL))
+            for k, indice in enumerate(indices):
+                linha[k] += int(tabela.contadores[i, indice])
+    return contagens
+
+
+class PainelAoVivo:
+    """
+    Contagens do dia por (loja, vendedor), mantidas em memória.
+    Semeadas uma vez por dia a partir da cópia local e depois atualizadas só pelas gravações
+    deste processo (ouvinte em google_planilha.ao_gravar) — a tela nunca relê a planilha.
+    """
+
+    def __init__(self):
+        self.dia = ""
+        self.semeado = False
+        self.versao = 0  # muda a cada alteração; a tela pode comparar para saber se há novidade
+        self._contagens: Dict[Tuple[str, str], List[int]] = {}
+        self._fila = FilaSemeadura()
+        self._lock = threading.Lock()
+
+    def _somar(self, loja: str, vendedor: str, valores: Iterable[int]) -> None:
+        linha = self._contagens.setdefault((loja.strip().upper(), vendedor.strip().upper()), [0] * len(COLUNAS_PAINEL))
+        for i, valor in enumerate(valores):
+            linha[i] += valor
+
+    def semear(self, planilha) -> None:
+        """Carrega as contagens de hoje (uma vez por dia) a partir da tabela compacta em cache."""
+        hoje = _hoje()
+        with self._lock:
+            if (self.semeado and self.dia == hoje) or self._fila.ativa:
+                return
+            self._fila.iniciar()
+
+        try:
+            tabela = planilha.get_tabela_compacta()
+            contagens = _contagens_do_dia(tabela, hoje)
+        except Exception:
+            with self._lock:
+                self._fila.cancelar()
+            raise
+
+        with self._lock:
+            self.dia, self.semeado = hoje, True
+            self._contagens = contagens
+            # Gravações avisadas durante a carga: só as que a tabela lida ainda não tinha
+            for registro in self._fila.concluir(tabela):
+                self._adicionar(registro)
+            self.versao += 1
+        logger.info(f"📡 Painel ao vivo semeado para {hoje}: {len(contagens)} vendedores")
+
+    def registrar(self, registros) -> None:
+        """Ouvinte de gravação: soma só os registros de hoje, depois que o painel foi semeado."""
+        with self._lock:
+            if self._fila.guardar(registros):
+                return
+            if not self.semeado:
+                return  # já estão na planilha e fora do cache: a semeadura vai lê-los
+            alterou = False
+            for registro in registros:
+                alterou = self._adicionar(registro) or alterou
+            if alterou:
+                self.versao += 1
+
+    def _adicionar(self, registro) -> bool:
+        if registro.data != self.dia:
+            return False
+        self._somar(registro.loja, registro.vendedor,
+                    (_inteiro(getattr(registro, campo)) for campo, _, _ in COLUNAS_PAINEL))
+        return True
+
+    def por_loja(self) -> Dict[str, List[int]]:
+        with self._lock:
+            totais: Dict[str, List[int]] = {}
+            for (loja, _), valores in self._contagens.items():
+                linha = totais.setdefault(loja, [0] * len(COLUNAS_PAINEL))
+                for i, valor in enumerate(valores):
+                    linha[i] += valor
+            return totais
+
+    def por_vendedor(self, loja: str) -> Dict[str, List[int]]:
+        loja = loja.strip().upper()
+        with self._lock:
+            return {vendedor: list(valores) for (l, vendedor), valores in self._contagens.items() if l == loja}
+
+
+# === PAINEL DO PROCESSO ===
+PAINEL = PainelAoVivo()
+ao_gravar(PAINEL.registrar)
@@ -0,0 +1,226 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+import os
+import unicodedata
+
+if TYPE_CHECKING:
+    from fpdf import FPDF
+
+# 🔹 Constantes
+TIPOS_ATENDIMENTO = ("PARTICULAR", "PLANO")
+FUSO_SP = ZoneInfo("America/Sao_Paulo")
+LIMIAR_LOTE_PARALELO = 50  # abaixo disso o pool de processos custa mais do que economiza
+
+# Fontes Unicode procuradas em ordem (regular, negrito)
+_DIR_APP = os.path.dirname(os.path.abspath(__file__))
+CANDIDATOS_FONTE = [
+    (os.environ.get("FONTE_ENCAMINHAMENTO", ""), os.environ.get("FONTE_ENCAMINHAMENTO_NEGRITO", "")),
+    (os.path.join(_DIR_APP, "fonts", "DejaVuSans.ttf"), os.path.join(_DIR_APP, "fonts", "DejaVuSans-Bold.ttf")),
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/TTF/DejaVuSans.ttf", "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf"),
+    ("C:\\Windows\\Fonts\\arial.ttf", "C:\\Windows\\Fonts\\arialbd.ttf"),
+]
+
+# ✅ Layout pré-calculado: (tipo, estilo, tamanho, largura, altura, texto, alinhamento)
+# "campo" são os rótulos seguidos do valor carimbado por paciente.
+_LAYOUT = (
+    ("texto", "B", 16, 0, 10, "ENCAMINHAMENTO", "C"),
+    ("espaco", "", 0, 0, 10, "", ""),
+    ("campo", "B", 12, 40, 8, "Paciente", "paciente"),
+    ("campo", "B", 12, 40, 8, "Telefone", "telefone"),
+    ("campo", "B", 12, 40, 8, "Nascimento", "nascimento"),
+    ("campo", "B", 12, 40, 8, "Atendimento", "tipo"),
+    ("texto", "", 12, 0, 6, "Consultor", "C"),
+    ("valor", "", 12, 0, 6, "vendedor", "C"),
+    ("espaco", "", 0, 0, 15, "", ""),
+    ("mensagem", "", 11, 0, 8, "Hoje ({data}), encaminhamento para exame de vista.", "L"),
+)
+
+
+@lru_cache(maxsize=1)
+def _localizar_fonte_unicode() -> Optional[Tuple[str, str]]:
+    """Procura uma fonte TTF com suporte a Unicode (uma única vez por processo)."""
+    for regular, negrito in CANDIDATOS_FONTE:
+        if regular and os.path.isfile(regular):
+            return regular, negrito if negrito and os.path.isfile(negrito) else regular
+    return None
+
+
+def _texto_core(texto: str) -> str:
+    """Adapta o texto às fontes core (latin-1) quando não há TTF Unicode disponível."""
+    try:
+        texto.encode("latin-1")
+        return texto
+    except UnicodeEncodeError:
+        decomposto = unicodedata.normalize("NFKD", texto)
+        return "".join(c for c in decomposto if ord(c) < 256 and not unicodedata.combining(c))
+
+
+def formatar_telefone(tel):
+    if not tel:
+        return ""
+    tel = ''.join(filter(str.isdigit, tel))
+    if len(tel) == 11:
+        return f"({tel[:2]}) {tel[2:7]}-{tel[7:]}"
+    elif len(tel) == 10:
+        return f"({tel[:2]}) {tel[2:6]}-{tel[6:]}"
+    return tel
+
+
+def formatar_data_nascimento(data):
+    if not data:
+        return ""
+    data = ''.join(filter(str.isdigit, data))
+    if len(data) == 6:
+        dia, mes, ano = data[:2], data[2:4], "20" + data[4:] if data[4:] < "30" else "19" + data[4:]
+    elif len(data) == 8:
+        dia, mes, ano = data[:2], data[2:4], data[4:]
+    else:
+        return data
+    return f"{dia}/{mes}/{ano}"
+
+
+def validar_encaminhamento(dados: Dict) -> None:
+    """Valida os campos obrigatórios. Lança ValueError com mensagem amigável."""
+    if not dados.get("paciente"):
+        raise ValueError("Nome do paciente é obrigatório")
+    if not dados.get("telefone"):
+        raise ValueError("Telefone é obrigatório")
+    if not dados.get("nascimento"):
+        raise ValueError("Data de nascimento é obrigatória")
+    if not dados.get("vendedor"):
+        raise ValueError("Vendedor é obrigatório")
+    if dados.get("tipo") not in TIPOS_ATENDIMENTO:
+        raise ValueError("Tipo de atendimento inválido")
+
+
+class ModeloEncaminhamento:
+    """
+    Modelo de encaminhamento pré-diagramado.
+    O layout e as fontes são resolvidos uma vez; cada página só carimba os dados do paciente.
+    """
+
+    def __init__(self):
+        fonte = _localizar_fonte_unicode()
+        self.unicode = fonte is not None
+        self.familia = "Unicode" if self.unicode else "Helvetica"
+        self._arquivos_fonte = fonte
+        self._texto = str if self.unicode else _texto_core
+
+        # Compila o layout: textos fixos já adaptados à fonte escolhida
+        self._operacoes = [
+            (tipo, estilo, tamanho, largura, altura,
+             self._texto(texto) if tipo in ("texto", "campo", "mensagem") else texto, alinhamento)
+            for tipo, estilo, tamanho, largura, altura, texto, alinhamento in _LAYOUT
+        ]
+
+    def adaptar(self, texto: str) -> str:
+        """Texto pronto para a fonte escolhida (sem mudança quando a fonte é Unicode)."""
+        return self._texto(texto)
+
+    def novo_documento(self) -> "FPDF":
+        """Cria o documento com as fontes já registradas."""
+        from fpdf import FPDF  # só carrega quando um PDF é gerado
+
+        pdf = FPDF(format='A4', unit='mm', orientation='P')
+        pdf.set_auto_page_break(auto=True, margin=15)
+        if self.unicode:
+            regular, negrito = self._arquivos_fonte
+            pdf.add_font(self.familia, "", regular)
+            pdf.add_font(self.familia, "B", negrito)
+        return pdf
+
+    def carimbar(self, pdf: "FPDF", dados: Dict) -> None:
+        """Adiciona uma página ao documento com os dados do paciente."""
+        valores = {
+            "paciente": dados.get("paciente", ""),
+            "telefone": formatar_telefone(dados.get("telefone", "")),
+            "nascimento": formatar_data_nascimento(dados.get("nascimento", "")),
+            "tipo": dados.get("tipo", ""),
+            "vendedor": dados.get("vendedor", ""),
+        }
+        data = dados.get("data") or datetime.now(FUSO_SP).strftime("%d/%m/%Y")
+
+        pdf.add_page()
+        pdf.set_text_color(0, 0, 0)
+        fonte_atual = None
+        for tipo, estilo, tamanho, largura, altura, texto, alinhamento in self._operacoes:
+            if tipo == "espaco":
+                pdf.ln(altura)
+                continue
+
+            if tipo == "mensagem":
+                pdf.set_text_color(50, 50, 50)
+
+            if fonte_atual != (estilo, tamanho):
+                pdf.set_font(self.familia, estilo, tamanho)
+                fonte_atual = (estilo, tamanho)
+
+            if tipo == "texto":
+                pdf.cell(0, altura, texto, new_x="LMARGIN", new_y="NEXT", align=alinhamento)
+            elif tipo == "valor":
+                pdf.cell(0, altura, self._texto(str(valores[texto])), new_x="LMARGIN", new_y="NEXT", align=alinhamento)
+            elif tipo == "mensagem":
+                pdf.cell(0, altura, texto.format(data=data), new_x="LMARGIN", new_y="NEXT", align=alinhamento)
+            elif tipo == "campo":
+                pdf.cell(largura, altura, f"{texto}:")
+                pdf.set_font(self.familia, "", tamanho)
+                fonte_atual = ("", tamanho)
+                pdf.cell(0, altura, f" {self._texto(str(valores[alinhamento]))}", new_x="LMARGIN", new_y="NEXT")
+
+
+@lru_cache(maxsize=1)
+def obter_modelo() -> ModeloEncaminhamento:
+    """Modelo compartilhado pelo processo (fontes e layout resolvidos uma vez)."""
+    return ModeloEncaminhamento()
+
+
+def gerar_pdf(dados: Dict) -> bytes:
+    """Gera o PDF de um encaminhamento e retorna os bytes (sem cópias intermediárias)."""
+    validar_encaminhamento(dados)
+    modelo = obter_modelo()
+    pdf = modelo.novo_documento()
+    modelo.carimbar(pdf, dados)
+    return bytes(pdf.output())
+
+
+def _renderizar_bloco(registros: List[Dict]) -> bytes:
+    """Renderiza um bloco de encaminhamentos num único documento (executado no pool)."""
+    modelo = obter_modelo()
+    pdf = modelo.novo_documento()
+    for dados in registros:
+        modelo.carimbar(pdf, dados)
+    return bytes(pdf.output())
+
+
+def gerar_pdf_lote(registros: List[Dict], processos: Optional[int] = None) -> bytes:
+    """
+    Gera um único PDF com uma página por encaminhamento.
+    Lotes grandes são divididos entre processos e os blocos são unidos com pypdf.
+    """
+    if not registros:
+        raise ValueError("Nenhum encaminhamento para gerar")
+    for dados in registros:
+        validar_encaminhamento(dados)
+
+    processos = processos or os.cpu_count() or 1
+    if processos < 2 or len(registros) < LIMIAR_LOTE_PARALELO:
+        return _renderizar_bloco(registros)
+
+    tamanho_bloco = -(-len(registros) // processos)
+    blocos = [registros[i:i + tamanho_bloco] for i in range(0, len(registros), tamanho_bloco)]
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        partes = list(executor.map(_renderizar_bloco, blocos))
+
+    from pypdf import PdfWriter
+
+    escritor = PdfWriter()
+    for parte in partes:
+        escritor.append(BytesIO(parte))
+    saida = BytesIO()
+    escritor.write(saida)
+    return saida.getvalue()
@@ -0,0 +1,280 @@
+"""
+Ranking de vendedores entre as lojas, por vendas, conversão e exames de vista.
+
+Os contadores ficam em baldes diários (os últimos 30 dias). Cada janela (hoje, 7 dias,
+30 dias) guarda o total corrente de cada vendedor: uma gravação soma no balde do dia e nas
+janelas; quando o dia vira, o balde que saiu da janela é subtraído. A classificação de cada
+janela × métrica é uma lista ordenada em que só o vendedor alterado é reposicionado
+(bisect), sem reordenar as linhas da planilha.
+"""
+from bisect import bisect_left, insort
+from datetime import date, datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+import logging
+import threading
+
+import numpy as np
+
+from codificacao_compacta import INDICE_CONTADOR
+from google_planilha import ao_gravar
+from semeadura import FilaSemeadura
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Janelas móveis: nome → nº de dias (incluindo hoje)
+JANELAS = {"dia": 1, "semana": 7, "mes": 30}
+DIAS_GUARDADOS = max(JANELAS.values())
+FUSO = ZoneInfo("America/Sao_Paulo")
+
+# Contadores de cada vendedor: (campo do RegistroAtendimento, cabeçalho)
+CONTADORES_RANKING = (
+    ("atendimento", "ATENDIMENTO"),
+    ("receita", "RECEITA"),
+    ("venda", "VENDA"),
+    ("exame", "EXAME DE VISTA"),
+)
+ATENDIMENTOS, RECEITAS, VENDAS, EXAMES = range(len(CONTADORES_RANKING))
+
+# Conversão só entra no ranking com um mínimo de receitas na janela
+MINIMO_RECEITAS = 5
+
+Vendedor = Tuple[str, str]  # (loja, vendedor)
+
+
+def _conversao(total: List[int]) -> Optional[float]:
+    return total[VENDAS] / total[RECEITAS] if total[RECEITAS] >= MINIMO_RECEITAS else None
+
+
+# Métricas: nome → (rótulo, pontuação a partir dos contadores; None = fora do ranking)
+METRICAS: Dict[str, Tuple[str, Callable[[List[int]], Optional[float]]]] = {
+    "vendas": ("Vendas", lambda total: total[VENDAS]),
+    "conversao": ("Conversão", _conversao),
+    "exames": ("Exames de vista", lambda total: total[EXAMES]),
+}
+
+
+def _nome(texto: str) -> str:
+    return str(texto).strip().upper()
+
+
+def _hoje() -> int:
+    return datetime.now(FUSO).date().toordinal()
+
+
+def _inteiro(valor) -> int:
+    try:
+        return int(str(valor).strip() or 0)
+    except ValueError:
+        return 0
+
+
+class Classificacao:
+    """Lista ordenada por pontuação (maior primeiro); atualizar um item custa O(log n) na busca."""
+
+    def __init__(self):
+        self._ordem: List[Tuple[float, Vendedor]] = []
+        self._atual: Dict[Vendedor, Tuple[float, Vendedor]] = {}
+
+    def atualizar(self, item: Vendedor, pontos: Optional[float]) -> None:
+        anterior = self._atual.pop(item, None)
+        if anterior is not None:
+            del self._ordem[bisect_left(self._ordem, anterior)]
+        if pontos is not None and pontos > 0:  # sem pontos, fica fora do ranking
+            chave = (-pontos, item)
+            insort(self._ordem, chave)
+            self._atual[item] = chave
+
+    def topo(self, k: int) -> List[Tuple[Vendedor, float]]:
+        return [(item, -pontos) for pontos, item in self._ordem[:k]]
+
+    def posicao(self, item: Vendedor) -> Optional[int]:
+        chave = self._atual.get(item)
+        return None if chave is None else bisect_left(self._ordem, chave) + 1
+
+    def __len__(self):
+        return len(self._ordem)
+
+
+class Janela:
+    """Totais dos vendedores nos últimos `dias` dias e uma classificação por métrica."""
+
+    def __init__(self, dias: int):
+        self.dias = dias
+        self.inicio = 0  # primeiro dia (ordinal) incluído
+        self.totais: Dict[Vendedor, List[int]] = {}
+        self.classificacoes = {nome: Classificacao() for nome in METRICAS}
+
+    def somar(self, item: Vendedor, valores: List[int], sinal: int = 1) -> None:
+        total = self.totais.setdefault(item, [0] * len(CONTADORES_RANKING))
+        for i, valor in enumerate(valores):
+            total[i] += sinal * valor
+        if not any(total):
+            del self.totais[item]
+        for nome, (_, pontuar) in METRICAS.items():
+            self.classificacoes[nome].atualizar(item, pontuar(total) if any(total) else None)
+
+
+class Ranking:
+    """Ranking do processo; ver docstring do módulo."""
+
+    def __init__(self):
+        self.semeado = False
+        self.versao = 0
+        self.hoje = 0
+        self.semeado_em = 0  # dia (ordinal) da última semeadura
+        self._baldes: Dict[int, Dict[Vendedor, List[int]]] = {}
+        self._janelas = {nome: Janela(dias) for nome, dias in JANELAS.items()}
+        self._fila = FilaSemeadura()
+        self._lock = threading.Lock()
+
+    # === CARGA ===
+
+    def semear(self, planilha, forcar: bool = False) -> None:
+        """
+        Monta os baldes dos últimos 30 dias a partir da tabela compacta, no máximo uma vez por dia
+        (ou de novo com `forcar`): o que foi alterado direto na planilha ou gravado por outro
+        processo entra na remontagem seguinte.
+        """
+        hoje = _hoje()
+        with self._lock:
+            if (self.semeado and self.semeado_em == hoje and not forcar) or self._fila.ativa:
+                return
+            self._fila.iniciar()
+
+        try:
+            if forcar:
+                planilha.cache.invalidar("registros")
+            tabela = planilha.get_tabela_compacta()
+            baldes = baldes_da_tabela(tabela, hoje - DIAS_GUARDADOS + 1, hoje)
+        except Exception:
+            with self._lock:
+                self._fila.cancelar()
+            raise
+
+        with self._lock:
+            self._baldes, self.hoje = {}, hoje
+            self._janelas = {nome: Janela(dias) for nome, dias in JANELAS.items()}
+            for janela in self._janelas.values():
+                janela.inicio = hoje - janela.dias + 1
+            for dia, balde in baldes.items():
+                for item, valores in balde.items():
+                    self._somar(dia, item, valores)
+            # Gravações avisadas durante a carga: só as que a tabela lida ainda não tinha
+            for registro in self._fila.concluir(tabela):
+                self._adicionar(registro)
+            self.semeado, self.semeado_em = True, hoje
+            self.versao += 1
+        logger.info(f"🏆 Ranking montado: {len(baldes)} dias, {len(self._janelas['mes'].totais)} vendedores")
+
+    def registrar(self, registros: Iterable) -> None:
+        """Ouvinte de gravação: soma a linha no balde do dia e nas janelas que a incluem."""
+        with self._lock:
+            if self._fila.guardar(registros):
+                return
+            if not self.semeado:
+                return  # já estão na planilha e fora do cache: a semeadura vai lê-los
+            for registro in registros:
+                self._adicionar(registro)
+            self.versao += 1
+
+    def _adicionar(self, registro) -> None:
+        try:
+            dia = datetime.strptime(registro.data, "%d/%m/%Y").date().toordinal()
+        except ValueError:
+            return
+        self._avancar(max(dia, _hoje()))
+        valores = [_inteiro(getattr(registro, campo)) for campo, _ in CONTADORES_RANKING]
+        if any(valores):
+            self._somar(dia, (_nome(registro.loja), _nome(registro.vendedor)), valores)
+
+    def _somar(self, dia: int, item: Vendedor, valores: List[int]) -> None:
+        if dia < self.hoje - DIAS_GUARDADOS + 1 or dia > self.hoje:
+            return
+        balde = self._baldes.setdefault(dia, {})
+        total = balde.setdefault(item, [0] * len(CONTADORES_RANKING))
+        for i, valor in enumerate(valores):
+            total[i] += valor
+        for janela in self._janelas.values():
+            if dia >= janela.inicio:
+                janela.somar(item, valores)
+
+    def _avancar(self, hoje: int) -> None:
+        """Virada do dia: subtrai de cada janela os baldes que ficaram para trás."""
+        if hoje <= self.hoje:
+            return
+        for janela in self._janelas.values():
+            novo_inicio = hoje - janela.dias + 1
+            for dia in sorted(d for d in self._baldes if janela.inicio <= d < novo_inicio):
+                for item, valores in self._baldes[dia].items():
+                    janela.somar(item, valores, sinal=-1)
+            janela.inicio = novo_inicio
+        for dia in [d for d in self._baldes if d < hoje - DIAS_GUARDADOS + 1]:
+            del self._baldes[dia]
+        self.hoje = hoje
+        self.versao += 1
+
+    # === CONSULTAS ===
+
+    def topo(self, janela: str, metrica: str, k: int = 10) -> List[Dict]:
+        """Os k primeiros da janela ('dia', 'semana', 'mes') na métrica escolhida."""
+        with self._lock:
+            self._avancar(_hoje())
+            atual = self._janelas[janela]
+            return [
+                {
+                    "posicao": posicao,
+                    "loja": loja,
+                    "vendedor": vendedor,
+                    "pontos": pontos,
+                    "atendimentos": atual.totais[(loja, vendedor)][ATENDIMENTOS],
+                    "receitas": atual.totais[(loja, vendedor)][RECEITAS],
+                    "vendas": atual.totais[(loja, vendedor)][VENDAS],
+                    "exames": atual.totais[(loja, vendedor)][EXAMES],
+                }
+                for posicao, ((loja, vendedor), pontos) in enumerate(atual.classificacoes[metrica].topo(k), start=1)
+            ]
+
+    def posicao(self, janela: str, metrica: str, loja: str, vendedor: str) -> Tuple[Optional[int], int]:
+        """Posição de um vendedor e o total de classificados."""
+        with self._lock:
+            self._avancar(_hoje())
+            classificacao = self._janelas[janela].classificacoes[metrica]
+            return classificacao.posicao((_nome(loja), _nome(vendedor))), len(classificacao)
+
+    def vendedores(self) -> List[Vendedor]:
+        with self._lock:
+            return sorted(self._janelas["mes"].totais)
+
+
+def baldes_da_tabela(tabela, de: int, ate: int) -> Dict[int, Dict[Vendedor, List[int]]]:
+    """Soma os contadores por (dia, loja, vendedor) no intervalo de dias, com numpy."""
+    baldes: Dict[int, Dict[Vendedor, List[int]]] = {}
+    if tabela.n == 0 or "LOJA" not in tabela.textos or "VENDEDOR" not in tabela.textos:
+        return baldes
+    selecao = tabela.mascara(de=date.fromordinal(de), ate=date.fromordinal(ate))
+    if not selecao.any():
+        return baldes
+
+    colunas = [INDICE_CONTADOR[cab] for _, cab in CONTADORES_RANKING]
+    valores = tabela.contadores[selecao][:, colunas].astype(np.int64)
+    lojas, nomes_loja = tabela.codigos("LOJA")
+    vendedores, nomes_vendedor = tabela.codigos("VENDEDOR")
+    grupos = np.stack((tabela.datas[selecao], lojas[selecao], vendedores[selecao]), axis=1)
+    unicos, indices = np.unique(grupos, axis=0, return_inverse=True)
+    somas = np.zeros((len(unicos), len(colunas)), dtype=np.int64)
+    np.add.at(somas, indices.reshape(-1), valores)
+
+    for (dia, l, v), soma in zip(unicos.tolist(), somas.tolist()):
+        # Grafias diferentes do mesmo nome caem no mesmo vendedor
+        total = baldes.setdefault(dia, {}).setdefault(
+            (_nome(nomes_loja[l]), _nome(nomes_vendedor[v])), [0] * len(colunas)
+        )
+        for i, valor in enumerate(soma):
+            total[i] += valor
+    return baldes
+
+
+# === RANKING DO PROCESSO ===
+RANKING = Ranking()
+ao_gravar(RANKING.registrar)
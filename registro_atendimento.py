@@ -0,0 +1,90 @@
+from operator import attrgetter
+from typing import Dict, Iterable, List, Union
+
+# 🔹 Ordem das colunas da aba 'ab_dados': (campo, cabeçalho)
+COLUNAS_AB_DADOS = (
+    ('loja', 'LOJA'), ('data', 'DATA'), ('hora', 'HORA'),
+    ('vendedor', 'VENDEDOR'), ('cliente', 'CLIENTE'),
+    ('atendimento', 'ATENDIMENTO'), ('receita', 'RECEITA'),
+    ('perda', 'PERDA'), ('venda', 'VENDA'), ('reserva', 'RESERVA'),
+    ('pesquisa', 'PESQUISA'), ('exame', 'EXAME DE VISTA'), ('gar_lente', 'GAR_LENTE'),
+    ('gar_armacao', 'GAR_ARMACAO'), ('ajuste', 'AJUSTE'), ('entrega', 'ENTREGA'),
+)
+CAMPOS = tuple(campo for campo, _ in COLUNAS_AB_DADOS)
+CABECALHOS = tuple(cabecalho for _, cabecalho in COLUNAS_AB_DADOS)
+
+# Campos aceitos que não têm coluna própria na planilha
+CAMPOS_EXTRAS = ('atendente',)
+
+# Nomes antigos usados pelas telas → nome canônico
+APELIDOS = {
+    'consulta': 'exame',
+    'gar_arma': 'gar_armacao',
+}
+
+OBRIGATORIOS = ('loja', 'vendedor', 'cliente')
+
+# ✅ Codificador pré-compilado: uma única chamada C devolve os campos na ordem da planilha
+_codificar = attrgetter(*CAMPOS)
+
+
+def _normalizar(valor) -> str:
+    return '' if valor is None else str(valor).strip()
+
+
+class RegistroAtendimento:
+    """
+    Registro de atendimento (AttendanceRecord) com os campos da aba 'ab_dados'.
+    Chaves desconhecidas são rejeitadas na construção; valores são normalizados uma única vez.
+    """
+
+    __slots__ = CAMPOS + CAMPOS_EXTRAS
+
+    def __init__(self, **campos):
+        for campo in self.__slots__:
+            object.__setattr__(self, campo, '')
+
+        for chave, valor in campos.items():
+            campo = APELIDOS.get(chave, chave)
+            if campo not in self.__slots__:
+                raise ValueError(f"Campo desconhecido no registro de atendimento: '{chave}'")
+            valor = _normalizar(valor)
+            atual = getattr(self, campo)
+            if atual and valor and atual != valor:
+                raise ValueError(f"Valores conflitantes para '{campo}': '{atual}' e '{valor}'")
+            object.__setattr__(self, campo, valor or atual)
+
+    def __setattr__(self, campo, valor):
+        object.__setattr__(self, campo, _normalizar(valor))
+
+    @classmethod
+    def de_dict(cls, dados: Dict) -> "RegistroAtendimento":
+        return cls(**dados)
+
+    def campos_faltantes(self) -> List[str]:
+        return [campo for campo in OBRIGATORIOS if not getattr(self, campo)]
+
+    def como_linha(self) -> List[str]:
+        """Linha pronta para a aba 'ab_dados', na ordem das colunas."""
+        return list(_codificar(self))
+
+    def como_dict(self) -> Dict[str, str]:
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+    def __eq__(self, outro):
+        if not isinstance(outro, RegistroAtendimento):
+            return NotImplemented
+        return self.como_dict() == outro.como_dict()
+
+    def __repr__(self):
+        preenchidos = ", ".join(f"{c}={getattr(self, c)!r}" for c in self.__slots__ if getattr(self, c))
+        return f"RegistroAtendimento({preenchidos})"
+
+
+def como_registro(dados: Union[Dict, RegistroAtendimento]) -> RegistroAtendimento:
+    return dados if isinstance(dados, RegistroAtendimento) else RegistroAtendimento.de_dict(dados)
+
+
+def codificar_lote(registros: Iterable[Union[Dict, RegistroAtendimento]]) -> List[List[str]]:
+    """Codifica vários registros de uma vez para `append_rows`."""
+    return [list(_codificar(como_registro(r))) for r in registros]
@@ -0,0 +1,201 @@
+"""
+Gera relatórios por loja e por vendedor (xlsx e PDF) fora do Streamlit, para qualquer período.
+
+Uso:
+    python relatorio_cli.py --de 01/09/2025 --ate 30/09/2025
+    python relatorio_cli.py --de 01/01/2025 --ate 31/03/2025 --lojas "LOJA IRECE" JACOBINA --formatos pdf
+    python relatorio_cli.py --de 01/09/2025 --ate 30/09/2025 --fonte historico --saida /relatorios
+    python relatorio_cli.py --de 01/09/2025 --ate 30/09/2025 --sem-vendedores --processos 2
+
+Fontes dos registros (lidas uma única vez, antes de distribuir entre os processos):
+- historico: o histórico local importado dos backups (importar_backups.py);
+- snapshot:  o snapshot Arrow compartilhado (SNAPSHOT_ARROW_DIR);
+- planilha:  uma leitura da 'ab_dados' no Google Sheets;
+- auto (padrão): histórico + snapshot; sem snapshot, histórico + uma leitura da planilha.
+  Linhas do histórico que ainda estão na planilha (dia do backup, backup exportado sem limpeza)
+  não entram em dobro: a comparação usa a mesma normalização de importar_backups.py.
+
+Cada loja vira uma tarefa no pool de processos, que grava em <saida>/<LOJA>/ o relatório
+da loja e um por vendedor, em cada formato pedido.
+"""
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+import argparse
+import os
+import re
+import sys
+import time
+
+import motor_relatorio
+
+FORMATOS_LOTE = ("xlsx", "pdf")
+
+
+def _data(texto: str) -> date:
+    dia = motor_relatorio.data_do_registro(texto)
+    if dia is None:
+        raise argparse.ArgumentTypeError(f"data inválida: {texto} (use dd/mm/aaaa)")
+    return dia
+
+
+def _nome_arquivo(texto: str) -> str:
+    return re.sub(r"[^\w-]+", "_", texto.strip()).strip("_") or "SEM_NOME"
+
+
+# === FONTES ===
+
+def _do_historico(lojas: Optional[List[str]], de: date, ate: date) -> List[Dict]:
+    from historico_local import HistoricoLocal
+
+    historico = HistoricoLocal()
+    if not historico.disponivel():
+        print(f"ℹ️ Histórico local não encontrado ({historico.caminho})")
+        return []
+    return historico.registros(lojas, de, ate)
+
+
+def _do_snapshot() -> Optional[List[Dict]]:
+    import snapshot_arrow
+
+    if not snapshot_arrow.habilitado():
+        return None
+    tabela = snapshot_arrow.leitor().tabela()
+    return None if tabela is None else tabela.to_pylist()
+
+
+def _da_planilha(lojas: Optional[List[str]], de: date, ate: date) -> List[Dict]:
+    from google_planilha import GooglePlanilha
+
+    anos = list(range(de.year, ate.year + 1))
+    return GooglePlanilha().get_all_records(lojas, anos)
+
+
+def _chave_normalizada(registro: Dict) -> str:
+    """Chave da linha como o histórico a guardaria (DATA em ISO, HORA em HH:MM, contadores inteiros)."""
+    from historico_local import chave_da_linha
+    from importar_backups import normalizar_linhas
+
+    valores = ['' if v is None else str(v) for v in registro.values()]
+    linhas, _ = normalizar_linhas(list(registro), [valores])
+    return chave_da_linha(next(iter(linhas))) if linhas else ""
+
+
+def sem_repetidos(historico: List[Dict], atuais: List[Dict]) -> List[Dict]:
+    """
+    Tira do histórico as linhas que também estão nos registros atuais. Cada linha atual
+    desconta uma cópia da mesma chave, então linhas idênticas legítimas não somem.
+    """
+    if not historico or not atuais:
+        return historico
+    na_planilha = Counter(_chave_normalizada(r) for r in atuais)
+    restantes = []
+    for registro in historico:
+        chave = _chave_normalizada(registro)
+        if na_planilha[chave]:
+            na_planilha[chave] -= 1
+        else:
+            restantes.append(registro)
+    return restantes
+
+
+def carregar_registros(fonte: str, lojas: Optional[List[str]], de: date, ate: date) -> List[Dict]:
+    registros: List[Dict] = []
+    if fonte in ("auto", "historico"):
+        registros += _do_historico(lojas, de, ate)
+    if fonte in ("auto", "snapshot"):
+        atuais = _do_snapshot()
+        if atuais is None and fonte == "snapshot":
+            raise SystemExit("❌ Snapshot Arrow indisponível (defina SNAPSHOT_ARROW_DIR).")
+        if atuais is None:
+            atuais = _da_planilha(lojas, de, ate)
+        if fonte == "auto":
+            antes = len(registros)
+            registros = sem_repetidos(registros, atuais)
+            if len(registros) < antes:
+                print(f"ℹ️ {antes - len(registros)} linhas do histórico já estão na planilha; contadas uma vez")
+        registros += atuais
+    if fonte == "planilha":
+        registros += _da_planilha(lojas, de, ate)
+    return registros
+
+
+# === GERAÇÃO (executada nos processos) ===
+
+def gerar_loja(tarefa: Tuple) -> Dict:
+    loja, registros, de, ate, formatos, saida, por_vendedor = tarefa
+    inicio = time.perf_counter()
+    periodo = f"{de.strftime('%d/%m/%Y')} a {ate.strftime('%d/%m/%Y')}"
+    sufixo = f"{de.isoformat()}_{ate.isoformat()}"
+    pasta = os.path.join(saida, _nome_arquivo(loja))
+    os.makedirs(pasta, exist_ok=True)
+
+    alvos = [(None, f"Relatório {loja} — {periodo}", f"Relatorio_{_nome_arquivo(loja)}_{sufixo}")]
+    if por_vendedor:
+        alvos += [
+            (vendedor, f"Relatório {vendedor} ({loja}) — {periodo}",
+             f"Relatorio_{_nome_arquivo(loja)}_{_nome_arquivo(vendedor)}_{sufixo}")
+            for vendedor in motor_relatorio.vendedores_de(registros)
+        ]
+
+    arquivos, linhas = [], 0
+    for vendedor, titulo, nome in alvos:
+        relatorio = motor_relatorio.montar(registros, loja=loja, vendedor=vendedor, de=de, ate=ate, titulo=titulo)
+        if not relatorio.linhas:
+            continue
+        if vendedor is None:
+            linhas = len(relatorio.linhas)
+        for formato in formatos:
+            caminho = os.path.join(pasta, f"{nome}.{formato}")
+            with open(caminho, "wb") as f:
+                f.write(relatorio.gerar(formato))
+            arquivos.append(caminho)
+    return {"loja": loja, "linhas": linhas, "arquivos": arquivos, "segundos": time.perf_counter() - inicio}
+
+
+def gerar(de: date, ate: date, lojas: Optional[Sequence[str]] = None, formatos: Sequence[str] = FORMATOS_LOTE,
+          saida: str = "relatorios", fonte: str = "auto", processos: Optional[int] = None,
+          por_vendedor: bool = True) -> List[Dict]:
+    inicio = time.perf_counter()
+    lojas = [l.strip().upper() for l in lojas] if lojas else None
+    registros = carregar_registros(fonte, lojas, de, ate)
+    grupos = motor_relatorio.agrupar_por_loja(registros)
+    if lojas:
+        grupos = {loja: grupos.get(loja, []) for loja in lojas}
+    print(f"📥 {len(registros)} registros lidos ({fonte}) em {time.perf_counter() - inicio:.1f} s; {len(grupos)} lojas")
+
+    tarefas = [(loja, regs, de, ate, tuple(formatos), saida, por_vendedor) for loja, regs in sorted(grupos.items()) if regs]
+    resultados = []
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        for resultado in executor.map(gerar_loja, tarefas):
+            resultados.append(resultado)
+            print(f"   {resultado['loja']}: {resultado['linhas']} linhas, "
+                  f"{len(resultado['arquivos'])} arquivos em {resultado['segundos']:.1f} s")
+
+    total = sum(len(r["arquivos"]) for r in resultados)
+    print(f"✅ {total} arquivos em {os.path.abspath(saida)} ({time.perf_counter() - inicio:.1f} s)")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera relatórios por loja e vendedor (xlsx/PDF) para um período.")
+    parser.add_argument("--de", type=_data, required=True, help="primeiro dia (dd/mm/aaaa)")
+    parser.add_argument("--ate", type=_data, required=True, help="último dia (dd/mm/aaaa)")
+    parser.add_argument("--lojas", nargs="*", default=None, help="lojas (padrão: todas)")
+    parser.add_argument("--formatos", nargs="+", choices=FORMATOS_LOTE, default=list(FORMATOS_LOTE))
+    parser.add_argument("--saida", default="relatorios", help="pasta de destino")
+    parser.add_argument("--fonte", choices=["auto", "historico", "snapshot", "planilha"], default="auto")
+    parser.add_argument("--processos", type=int, default=None, help="processos (padrão: nº de CPUs)")
+    parser.add_argument("--sem-vendedores", action="store_true", help="só o relatório de cada loja")
+    args = parser.parse_args()
+
+    if args.ate < args.de:
+        print("❌ --ate é anterior a --de")
+        sys.exit(1)
+    gerar(args.de, args.ate, args.lojas, args.formatos, args.saida, args.fonte, args.processos,
+          not args.sem_vendedores)
+
+
+if __name__ == "__main__":
+    main()
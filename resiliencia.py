@@ -0,0 +1,248 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturoTimeout
+from typing import Callable, Dict, List, Optional
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+import limitador
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Tempo máximo por tipo de operação (segundos) — a tela desiste depois disso
+TIMEOUTS = {
+    "leitura": 25,
+    "escrita": 15,
+    "config": 10,
+    "drive": 120,
+}
+TIMEOUT_HTTP = (5, 30)  # (conexão, leitura) aplicado ao cliente gspread
+
+# Retentativas com backoff exponencial e jitter
+TENTATIVAS = 4
+ESPERA_BASE = 0.5
+ESPERA_MAXIMA = 8.0
+
+# Disjuntor: abre após N falhas seguidas e tenta de novo depois de X segundos
+LIMITE_FALHAS = 5
+TEMPO_ABERTO = 30.0
+
+# Cota do limitador consumida por tipo de operação (Drive tem cota própria)
+COTA_POR_OPERACAO = {
+    "leitura": "leitura",
+    "config": "leitura",
+    "escrita": "escrita",
+}
+
+STATUS_TRANSITORIOS = {429, 500, 502, 503, 504}
+STATUS_SEM_EFEITO = {429, 503}  # a API recusou antes de aplicar: seguro repetir escrita
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="sheets")
+
+
+class CircuitoAberto(Exception):
+    """O serviço falhou repetidamente; a chamada foi recusada sem tentar."""
+
+
+def _status_http(erro: Exception) -> Optional[int]:
+    resposta = getattr(erro, "response", None)
+    return getattr(resposta, "status_code", None)
+
+
+def eh_transitorio(erro: Exception) -> bool:
+    """Erros que valem nova tentativa: 429/5xx, timeout e falhas de rede."""
+    if isinstance(erro, (TimeoutError, FuturoTimeout, ConnectionError)):
+        return True
+    status = _status_http(erro)
+    if status in STATUS_TRANSITORIOS:
+        return True
+    nome = type(erro).__name__
+    return nome in ("ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout", "ChunkedEncodingError")
+
+
+def sem_efeito(erro: Exception) -> bool:
+    """
+    A escrita com certeza não foi aplicada: recusada pela API (429/503), pelo disjuntor ou
+    pelo limitador. Só nesses casos é seguro guardar e reenviar um append. Em timeout ou
+    outro 5xx a chamada pode ter sido aplicada (e o futuro pode ainda estar rodando).
+    """
+    if isinstance(erro, (CircuitoAberto, limitador.LimiteExcedido)):
+        return True
+    return _status_http(erro) in STATUS_SEM_EFEITO
+
+
+def espera_backoff(tentativa: int) -> float:
+    """Full jitter: aleatório entre 0 e base·2ⁿ, limitado ao máximo."""
+    return random.uniform(0, min(ESPERA_MAXIMA, ESPERA_BASE * (2 ** tentativa)))
+
+
+class Disjuntor:
+    """Circuit breaker compartilhado por todas as sessões do processo."""
+
+    def __init__(self, nome: str, limite_falhas: int = LIMITE_FALHAS, tempo_aberto: float = TEMPO_ABERTO):
+        self.nome = nome
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+        self._falhas = 0
+        self._aberto_desde: Optional[float] = None
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            if self._aberto_desde is None:
+                return "fechado"
+            if time.monotonic() - self._aberto_desde >= self.tempo_aberto:
+                return "meio-aberto"
+            return "aberto"
+
+    def permitir(self) -> None:
+        """Lança CircuitoAberto se a chamada não deve ser feita agora."""
+        with self._lock:
+            if self._aberto_desde is None:
+                return
+            if time.monotonic() - self._aberto_desde < self.tempo_aberto or self._teste_em_andamento:
+                raise CircuitoAberto(f"Serviço '{self.nome}' indisponível; tentando de novo em instantes.")
+            # Meio-aberto: deixa passar uma única chamada de teste
+            self._teste_em_andamento = True
+
+    def sucesso(self) -> None:
+        with self._lock:
+            if self._aberto_desde is not None:
+                logger.info(f"✅ Disjuntor '{self.nome}' fechado novamente.")
+            self._falhas = 0
+            self._aberto_desde = None
+            self._teste_em_andamento = False
+
+    def falha(self) -> None:
+        with self._lock:
+            self._falhas += 1
+            self._teste_em_andamento = False
+            if self._aberto_desde is not None or self._falhas >= self.limite_falhas:
+                if self._aberto_desde is None:
+                    logger.warning(f"⚠️ Disjuntor '{self.nome}' aberto após {self._falhas} falhas.")
+                self._aberto_desde = time.monotonic()
+
+
+_disjuntores: Dict[str, Disjuntor] = {}
+_lock_disjuntores = threading.Lock()
+
+
+def disjuntor(servico: str) -> Disjuntor:
+    with _lock_disjuntores:
+        if servico not in _disjuntores:
+            _disjuntores[servico] = Disjuntor(servico)
+        return _disjuntores[servico]
+
+
+def configurar_timeout_http(cliente) -> None:
+    """Aplica o timeout HTTP ao cliente gspread (a API mudou de lugar entre versões)."""
+    for alvo in (cliente, getattr(cliente, "http_client", None)):
+        definir = getattr(alvo, "set_timeout", None)
+        if definir:
+            definir(TIMEOUT_HTTP)
+            return
+
+
+def executar(
+    operacao: str,
+    func: Callable,
+    *args,
+    servico: str = "sheets",
+    idempotente: bool = True,
+    cota: Optional[str] = None,
+    prioridade: int = limitador.PRIORIDADE_PADRAO,
+    **kwargs
+):
+    """
+    Executa uma chamada à API com limite de cota, timeout, retentativas e disjuntor.
+    Escritas não idempotentes só são repetidas quando a API recusou a chamada (429/503).
+    """
+    circuito = disjuntor(servico)
+    limite = TIMEOUTS.get(operacao, TIMEOUTS["leitura"])
+    cota = cota or COTA_POR_OPERACAO.get(operacao)
+    ultimo_erro = None
+
+    for tentativa in range(TENTATIVAS):
+        # Cada tentativa consome cota; a espera na fila conta no timeout da operação.
+        # A cota vem antes do disjuntor: se o limitador recusar, a chamada de teste do
+        # estado meio-aberto não fica marcada como em andamento para sempre.
+        prazo = time.monotonic() + limite
+        limitador.adquirir(cota, prioridade, timeout=limite)
+        restante = prazo - time.monotonic()
+        if restante <= 0:
+            raise limitador.LimiteExcedido(f"'{operacao}' esperou {limite}s pela cota")
+        circuito.permitir()
+        futuro = _executor.submit(func, *args, **kwargs)
+        try:
+            resultado = futuro.result(timeout=restante)
+        except FuturoTimeout:
+            ultimo_erro = TimeoutError(f"'{operacao}' excedeu {limite}s")
+        except Exception as e:
+            ultimo_erro = e
+        else:
+            circuito.sucesso()
+            return resultado
+
+        if not eh_transitorio(ultimo_erro):
+            # Erro do pedido (ex.: 400/403): não indica serviço fora do ar
+            circuito.sucesso()
+            raise ultimo_erro
+
+        circuito.falha()
+        pode_repetir = idempotente or _status_http(ultimo_erro) in STATUS_SEM_EFEITO
+        if not pode_repetir or tentativa == TENTATIVAS - 1:
+            break
+        espera = espera_backoff(tentativa)
+        logger.warning(f"🔁 '{operacao}' falhou ({ultimo_erro}); nova tentativa em {espera:.1f}s")
+        time.sleep(espera)
+
+    raise ultimo_erro
+
+
+# === BUFFER LOCAL DE REGISTROS ===
+
+class BufferLocal:
+    """
+    Registros que não puderam ser enviados, gravados em JSON Lines no disco
+    para sobreviver a reinícios. São reenviados quando o Google volta a responder.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+
+    def adicionar(self, registro: Dict[str, str]) -> None:
+        with self._lock:
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+    def __len__(self) -> int:
+        with self._lock:
+            if not os.path.exists(self.caminho):
+                return 0
+            with open(self.caminho, encoding="utf-8") as f:
+                return sum(1 for linha in f if linha.strip())
+
+    def ler(self) -> List[Dict[str, str]]:
+        """Conteúdo atual, sem retirar (o próximo envio é quem esvazia)."""
+        with self._lock:
+            if not os.path.exists(self.caminho):
+                return []
+            with open(self.caminho, encoding="utf-8") as f:
+                return [json.loads(linha) for linha in f if linha.strip()]
+
+    def retirar_todos(self) -> List[Dict[str, str]]:
+        """Move o arquivo de lado e devolve o conteúdo; quem chama deve devolver o que falhar."""
+        with self._lock:
+            if not os.path.exists(self.caminho) or os.path.getsize(self.caminho) == 0:
+                return []
+            temporario = f"{self.caminho}.{os.getpid()}.{threading.get_ident()}"
+            os.replace(self.caminho, temporario)
+        with open(temporario, encoding="utf-8") as f:
+            registros = [json.loads(linha) for linha in f if linha.strip()]
+        os.remove(temporario)
+        return registros
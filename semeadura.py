@@ -0,0 +1,90 @@
+"""
+Fila de semeadura dos agregadores do processo (funil, painel ao vivo, mapa de calor, ranking).
+
+Cada agregador é montado a partir da tabela compacta e depois atualizado pelas gravações
+deste processo (ouvinte em google_planilha.ao_gravar). Uma gravação avisada durante a carga
+pode ou não estar na tabela lida, então ela fica na fila e, na troca dos acumuladores, só os
+registros que não aparecem na tabela (mesma DATA, HORA, LOJA, VENDEDOR e CLIENTE) são somados.
+
+Uma gravação avisada antes do início da carga já está na tabela: GooglePlanilha descarta os
+registros em cache antes de avisar os ouvintes, e o cache não guarda uma carga que começou
+antes de uma invalidação.
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from registro_atendimento import COLUNAS_AB_DADOS
+
+# 🔹 Colunas que identificam uma linha gravada pelas telas (HORA como gravada, em geral HH:MM)
+COLUNAS_CHAVE = ("DATA", "HORA", "LOJA", "VENDEDOR", "CLIENTE")
+_CAMPO = {cab: campo for campo, cab in COLUNAS_AB_DADOS}
+
+
+def _normalizar(valor) -> str:
+    return str(valor).strip().upper()
+
+
+def _ordinal(data: str) -> int:
+    try:
+        return datetime.strptime(data.strip(), "%d/%m/%Y").date().toordinal()
+    except ValueError:
+        return 0  # mesmo valor da tabela compacta para datas vazias ou fora do formato
+
+
+def chave_do_registro(registro) -> Tuple[str, ...]:
+    return tuple(_normalizar(getattr(registro, _CAMPO[cab])) for cab in COLUNAS_CHAVE)
+
+
+def fora_da_tabela(registros: Iterable, tabela) -> List:
+    """Registros que não estão na tabela; só as linhas dos dias desses registros são comparadas."""
+    registros = list(registros)
+    if not registros or tabela.n == 0 or any(cab not in tabela.cabecalhos for cab in COLUNAS_CHAVE):
+        return registros
+
+    posicoes = [tabela.cabecalhos.index(cab) for cab in COLUNAS_CHAVE]
+    dias = {_ordinal(registro.data) for registro in registros}
+    na_tabela = Counter()
+    for i in np.isin(tabela.datas, list(dias)).nonzero()[0].tolist():
+        linha = tabela.linha(i)
+        na_tabela[tuple(_normalizar(linha[j]) if j < len(linha) else '' for j in posicoes)] += 1
+
+    faltantes = []
+    for registro in registros:
+        chave = chave_do_registro(registro)
+        if na_tabela[chave]:
+            na_tabela[chave] -= 1
+        else:
+            faltantes.append(registro)
+    return faltantes
+
+
+class FilaSemeadura:
+    """Gravações avisadas durante a carga de um agregador; usada sob o lock dele."""
+
+    def __init__(self):
+        self.ativa = False
+        self._registros: List = []
+
+    def iniciar(self) -> None:
+        self.ativa = True
+        self._registros = []
+
+    def guardar(self, registros: Iterable) -> bool:
+        """Guarda os registros se há uma carga em andamento. Retorna False se não há."""
+        if not self.ativa:
+            return False
+        self._registros.extend(registros)
+        return True
+
+    def cancelar(self) -> None:
+        self.ativa = False
+        self._registros = []
+
+    def concluir(self, tabela) -> List:
+        """Encerra a carga e devolve as gravações da fila que a tabela lida não tem."""
+        faltantes = fora_da_tabela(self._registros, tabela)
+        self.cancelar()
+        return faltantes
@@ -0,0 +1,77 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import re
+import unicodedata
+
+# 🔹 Chaves na aba 'Config'
+CHAVE_DIRETORIO = "shards"
+CHAVE_SHARDING_ATIVO = "sharding_ativo"
+
+PREFIXO_ABA_SHARD = "ab_dados"
+
+
+def _slug(texto: str) -> str:
+    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+    return re.sub(r"[^A-Z0-9]+", "_", texto.upper()).strip("_")
+
+
+def chave_shard(loja: str, ano: int) -> str:
+    return f"{loja.strip().upper()}|{ano}"
+
+
+def nome_aba_shard(loja: str, ano: int) -> str:
+    """Ex.: ('LOJA IRECE', 2025) → 'ab_dados_LOJA_IRECE_2025'."""
+    return f"{PREFIXO_ABA_SHARD}_{_slug(loja)}_{ano}"
+
+
+def ano_do_registro(data: str) -> int:
+    """Ano da coluna DATA (dd/mm/aaaa); usa o ano corrente se a data for inválida."""
+    for formato in ("%d/%m/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(str(data).strip(), formato).year
+        except ValueError:
+            continue
+    return datetime.now().year
+
+
+class DiretorioShards:
+    """
+    Diretório (loja, ano) → destino, gravado como JSON na aba 'Config'.
+    Cada destino é {"planilha": <id ou "" para a planilha principal>, "aba": <nome da aba>}.
+    """
+
+    def __init__(self, entradas: Optional[Dict[str, Dict[str, str]]] = None):
+        self.entradas = dict(entradas or {})
+
+    @classmethod
+    def de_config(cls, config: Dict[str, str]) -> "DiretorioShards":
+        try:
+            return cls(json.loads(config.get(CHAVE_DIRETORIO) or "{}"))
+        except ValueError:
+            return cls()
+
+    def para_config(self) -> Dict[str, str]:
+        return {CHAVE_DIRETORIO: json.dumps(self.entradas, ensure_ascii=False, sort_keys=True)}
+
+    def destino(self, loja: str, ano: int) -> Optional[Dict[str, str]]:
+        return self.entradas.get(chave_shard(loja, ano))
+
+    def adicionar(self, loja: str, ano: int, aba: str, planilha: str = "") -> Dict[str, str]:
+        destino = {"planilha": planilha, "aba": aba}
+        self.entradas[chave_shard(loja, ano)] = destino
+        return destino
+
+    def filtrar(self, lojas: Optional[Iterable[str]] = None, anos: Optional[Iterable[int]] = None) -> List[Tuple[str, int, Dict[str, str]]]:
+        """Lista (loja, ano, destino) que atendem aos filtros."""
+        lojas = {l.strip().upper() for l in lojas} if lojas else None
+        anos = set(anos) if anos else None
+        resultado = []
+        for chave, destino in self.entradas.items():
+            loja, _, ano = chave.rpartition("|")
+            if lojas is not None and loja not in lojas:
+                continue
+            if anos is not None and int(ano) not in anos:
+                continue
+            resultado.append((loja, int(ano), destino))
+        return resultado
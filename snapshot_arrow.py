@@ -0,0 +1,198 @@
+"""
+Snapshot dos registros em Arrow IPC (Feather v2) compartilhado entre processos.
+
+Com vários processos do Streamlit atrás de um proxy, um deles (o que conseguir o lock do
+arquivo) grava periodicamente os registros carregados pelo GooglePlanilha; todos leem o mesmo
+arquivo com memory map, sem cópia — o sistema operacional mantém uma única cópia física.
+A troca é atômica (arquivo temporário + os.replace): leitores que ainda usam a versão antiga
+continuam com o mapeamento dela até abrirem a nova.
+
+Ativado pela variável SNAPSHOT_ARROW_DIR (pasta compartilhada entre os processos).
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+import os
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem eleição, cada processo grava (a troca continua atômica)
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 🔹 Configuração
+DIRETORIO = os.environ.get("SNAPSHOT_ARROW_DIR", "")
+NOME_ARQUIVO = "registros.arrow"
+INTERVALO = float(os.environ.get("SNAPSHOT_ARROW_INTERVALO", "60"))  # segundos entre verificações
+
+CHAVE_VERSAO = b"versao"
+CHAVE_GERADO_EM = b"gerado_em"
+
+
+def habilitado() -> bool:
+    return bool(DIRETORIO)
+
+
+def caminho_padrao() -> str:
+    return os.path.join(DIRETORIO, NOME_ARQUIVO)
+
+
+def escrever_snapshot(caminho: str, cabecalhos: Sequence[str], registros: Sequence[Dict], versao: str = "") -> int:
+    """Grava os registros (todas as colunas como texto) e troca o arquivo atomicamente. Retorna o nº de linhas."""
+    colunas = {
+        cab: pa.array(['' if r.get(cab) is None else str(r.get(cab)) for r in registros], type=pa.string())
+        for cab in cabecalhos
+    }
+    metadados = {CHAVE_VERSAO: (versao or "").encode(), CHAVE_GERADO_EM: datetime.now().isoformat().encode()}
+    tabela = pa.table(colunas).replace_schema_metadata(metadados)
+
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    # Sem compressão: é o que permite ler direto do mapeamento, sem descompactar para a memória
+    with pa.OSFile(temporario, "wb") as destino:
+        with pa.ipc.new_file(destino, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    with open(temporario, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+    return tabela.num_rows
+
+
+class LeitorSnapshot:
+    """Abre o snapshot com memory map e reabre só quando o arquivo foi trocado."""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._assinatura: Optional[Tuple[int, int]] = None
+        self._tabela: Optional[pa.Table] = None
+        self._lock = threading.Lock()
+
+    def tabela(self) -> Optional[pa.Table]:
+        try:
+            info = os.stat(self.caminho)
+        except FileNotFoundError:
+            return None
+        assinatura = (info.st_ino, info.st_mtime_ns)
+        with self._lock:
+            if assinatura != self._assinatura:
+                fonte = pa.memory_map(self.caminho, "r")
+                self._tabela = pa.ipc.open_file(fonte).read_all()
+                self._assinatura = assinatura
+            return self._tabela
+
+    def versao(self) -> Optional[str]:
+        tabela = self.tabela()
+        if tabela is None or not tabela.schema.metadata:
+            return None
+        return tabela.schema.metadata.get(CHAVE_VERSAO, b"").decode() or None
+
+
+def filtrar(tabela: pa.Table, **iguais: Optional[str]) -> List[Dict]:
+    """
+    Filtra por igualdade de texto sem diferenciar caixa nem espaços nas pontas
+    (ex.: LOJA='Loja Irece'). Só as linhas selecionadas são copiadas para fora do mapeamento.
+    """
+    mascara = None
+    for coluna, valor in iguais.items():
+        if valor is None:
+            continue
+        if coluna not in tabela.column_names:
+            return []
+        normalizada = pc.utf8_lower(pc.utf8_trim_whitespace(tabela[coluna]))
+        condicao = pc.equal(normalizada, valor.strip().lower())
+        mascara = condicao if mascara is None else pc.and_(mascara, condicao)
+    selecionadas = tabela if mascara is None else tabela.filter(mascara)
+    return selecionadas.to_pylist()
+
+
+class EscritorSnapshot:
+    """
+    Thread que regrava o snapshot quando a planilha muda. Só o processo que segura o lock
+    do arquivo grava; os demais apenas leem.
+    """
+
+    def __init__(self, planilha, caminho: str, intervalo: float = INTERVALO):
+        self.planilha = planilha
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.ultima_versao: Optional[str] = None
+        self.gravacoes = 0
+        self._arquivo_lock = None
+        self._parar = threading.Event()
+
+    def _eleger(self) -> bool:
+        if fcntl is None:
+            return True
+        if self._arquivo_lock is not None:
+            return True
+        os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+        arquivo = open(f"{self.caminho}.lock", "a")
+        try:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            arquivo.close()
+            return False
+        self._arquivo_lock = arquivo  # mantido aberto: o lock vale enquanto o processo viver
+        logger.info(f"📸 Processo {os.getpid()} grava o snapshot Arrow em {self.caminho}")
+        return True
+
+    def atualizar(self) -> bool:
+        """Regrava se a versão da planilha mudou. Retorna True se gravou."""
+        if not self._eleger():
+            return False
+        self.planilha.verificar_alteracoes()
+        versao = self.planilha.versao_dados
+        if versao is not None and versao == self.ultima_versao and os.path.exists(self.caminho):
+            return False
+        inicio = time.perf_counter()
+        registros = self.planilha.get_all_records()
+        linhas = escrever_snapshot(self.caminho, self.planilha.esquema.cabecalhos, registros, versao or "")
+        self.ultima_versao = versao
+        self.gravacoes += 1
+        logger.info(f"📸 Snapshot Arrow: {linhas} linhas em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        return True
+
+    def _executar(self):
+        while not self._parar.is_set():
+            try:
+                self.atualizar()
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao gravar snapshot Arrow: {e}")
+            self._parar.wait(self.intervalo)
+
+    def iniciar(self) -> None:
+        threading.Thread(target=self._executar, name="snapshot-arrow", daemon=True).start()
+
+    def parar(self) -> None:
+        self._parar.set()
+
+
+# === INSTÂNCIAS DO PROCESSO ===
+_leitor: Optional[LeitorSnapshot] = None
+_escritor: Optional[EscritorSnapshot] = None
+_lock_instancias = threading.Lock()
+
+
+def leitor() -> LeitorSnapshot:
+    global _leitor
+    with _lock_instancias:
+        if _leitor is None:
+            _leitor = LeitorSnapshot(caminho_padrao())
+        return _leitor
+
+
+def iniciar_escritor(planilha) -> bool:
+    """Inicia a thread de gravação uma vez por processo. Retorna True se iniciou agora."""
+    global _escritor
+    with _lock_instancias:
+        if _escritor is not None:
+            return False
+        _escritor = EscritorSnapshot(planilha, caminho_padrao())
+        _escritor.iniciar()
+        return True
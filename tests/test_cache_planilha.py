@@ -0,0 +1,50 @@
+import time
+
+from cache_planilha import CachePlanilha
+
+
+def _cache(validade=300.0):
+    cache = CachePlanilha(intervalo=0, validade_cadastros=validade)
+    cache.verificar(lambda: "v1")
+    return cache
+
+
+def test_nova_versao_descarta_so_os_registros():
+    cache = _cache()
+    cache.guardar("config", {"a": "1"})
+    cache.guardar("vendedores", ["ANA"])
+    cache.obter(("registros", ("LOJA 1",), (2025,)), lambda: [1, 2])
+
+    assert cache.verificar(lambda: "v2")
+    assert cache.consultar("config") == {"a": "1"}
+    assert cache.consultar("vendedores") == ["ANA"]
+    assert cache.consultar(("registros", ("LOJA 1",), (2025,))) is None
+
+
+def test_cadastros_vencem():
+    cache = _cache(validade=0.05)
+    cache.guardar("config", {"a": "1"})
+    time.sleep(0.06)
+    assert not cache.verificar(lambda: "v1")
+    assert cache.consultar("config") is None
+
+
+def test_carga_iniciada_antes_da_invalidacao_nao_e_guardada():
+    cache = _cache()
+
+    def carregar():
+        cache.invalidar("registros")
+        return "velho"
+
+    assert cache.obter("registros", carregar) == "velho"
+    assert cache.consultar("registros") is None
+
+
+def test_gravacao_local_avanca_versao_local():
+    cache = _cache()
+    cache.guardar("registros", [1])
+    cache.marcar_gravacao_local()
+    assert cache.versao_local == "v1+1"
+    assert cache.consultar("registros") is None
+    cache.verificar(lambda: "v2")
+    assert cache.versao_local == "v2"
@@ -0,0 +1,49 @@
+from codificacao_compacta import CODIGO_EVENTO, TabelaCompacta
+
+CABECALHOS = ["LOJA", "DATA", "HORA", "VENDEDOR", "CLIENTE", "ATENDIMENTO", "RECEITA", "VENDA", "RESERVA"]
+
+LINHAS = [
+    ["LOJA 1", "01/02/2025", "09:05", "ANA", "JOAO", "1", "1", "1", ""],
+    ["LOJA 1", "01/02/2025", "09:05:07", "ANA", "MARIA", "1", "", "1", "-1"],
+    ["LOJA 2", "1/2/2025", "9:5", "BIA", "", "0", "x", "", ""],   # fora do formato: exceções
+    ["LOJA 2", "", "", "BIA", "PEDRO"],                              # linha mais curta que o cabeçalho
+    ["LOJA 2", "02/02/2025", "10:00", "BIA", "ANA", "1", "", "", "", "extra", "x"],  # além do cabeçalho
+]
+
+
+def test_para_linhas_reconstroi_as_linhas_originais():
+    tabela = TabelaCompacta.de_linhas(CABECALHOS, LINHAS)
+    assert tabela.para_linhas() == LINHAS
+
+
+def test_linha_igual_a_para_linhas():
+    tabela = TabelaCompacta.de_linhas(CABECALHOS, LINHAS)
+    assert [tabela.linha(i) for i in range(tabela.n)] == tabela.para_linhas()
+
+
+def test_hora_com_segundos_nao_vai_para_excecoes():
+    tabela = TabelaCompacta.de_linhas(CABECALHOS, LINHAS)
+    coluna_hora = CABECALHOS.index("HORA")
+    assert (1, coluna_hora) not in tabela.excecoes
+    assert tabela.horas[1] == 9 * 60 + 5 and tabela.segundos[1] == 7
+    assert tabela.segundos[0] == -1
+    assert tabela.excecoes[(2, coluna_hora)] == "9:5"
+
+
+def test_eventos_classificados():
+    tabela = TabelaCompacta.de_linhas(CABECALHOS, LINHAS)
+    assert tabela.evento[0] == CODIGO_EVENTO["VENDA_RECEITA"]
+    assert tabela.evento[1] == CODIGO_EVENTO["CONVERSAO_RESERVA"]
+
+
+def test_bytes_ida_e_volta():
+    tabela = TabelaCompacta.de_linhas(CABECALHOS, LINHAS)
+    copia = TabelaCompacta.de_bytes(tabela.para_bytes())
+    assert copia.para_linhas() == LINHAS
+    assert copia.cabecalhos == CABECALHOS
+
+
+def test_de_registros():
+    registros = [dict(zip(CABECALHOS, linha)) for linha in LINHAS[:2]]
+    tabela = TabelaCompacta.de_registros(registros)
+    assert tabela.para_registros() == registros
@@ -0,0 +1,49 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("gspread")
+pytest.importorskip("streamlit")
+
+from encaminhamentos import CadastroEncaminhamentos, Encaminhamento  # noqa: E402
+
+
+def _cadastro(*itens):
+    cadastro = CadastroEncaminhamentos()
+    cadastro._reconstruir(list(itens))
+    cadastro.semeado = True
+    return cadastro
+
+
+def _venda(cliente, data, venda="1", loja="loja 1"):
+    return SimpleNamespace(cliente=cliente, data=data, venda=venda, loja=loja)
+
+
+def test_venda_converte_encaminhamento_do_mesmo_paciente():
+    item = Encaminhamento(data="01/02/2025", paciente="João  da Silva", loja="LOJA 1")
+    cadastro = _cadastro(item)
+    cadastro.registrar_vendas([_venda("JOAO DA SILVA", "10/02/2025")])
+    assert cadastro.venda_de(item) == ("10/02/2025", "LOJA 1")
+
+
+def test_ajuste_negativo_e_vazio_nao_convertem():
+    item = Encaminhamento(data="01/02/2025", paciente="Maria")
+    cadastro = _cadastro(item)
+    cadastro.registrar_vendas([_venda("MARIA", "10/02/2025", venda="-1"), _venda("MARIA", "10/02/2025", venda="")])
+    assert cadastro.venda_de(item) is None
+
+
+def test_venda_fora_da_janela_nao_converte():
+    item = Encaminhamento(data="01/02/2025", paciente="Maria")
+    cadastro = _cadastro(item)
+    cadastro.registrar_vendas([_venda("MARIA", "31/01/2025"), _venda("MARIA", "01/12/2025")])
+    assert cadastro.venda_de(item) is None
+
+
+def test_encaminhamentos_do_mesmo_nome_em_datas_diferentes():
+    antigo = Encaminhamento(data="01/01/2024", paciente="Maria")
+    recente = Encaminhamento(data="01/02/2025", paciente="Maria")
+    cadastro = _cadastro(antigo, recente)
+    cadastro.registrar_vendas([_venda("MARIA", "10/02/2025")])
+    assert cadastro.venda_de(antigo) is None
+    assert cadastro.venda_de(recente) == ("10/02/2025", "LOJA 1")
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("gspread")
+pytest.importorskip("streamlit")
+
+from google_planilha import GooglePlanilha  # noqa: E402
+
+
+class PlanilhaFalsa:
+    """Só o que _deve_fazer_backup usa: a data do último backup e a gravação na Config."""
+
+    def __init__(self, ultimo=None, erro=None):
+        self.ultimo = ultimo
+        self.erro = erro
+        self.gravado = []
+
+    def _obter_data_ultimo_backup(self):
+        return self.ultimo
+
+    def _gravar_config(self, valores):
+        if self.erro:
+            raise self.erro
+        self.gravado.append(valores)
+
+
+def test_sem_data_nao_faz_backup_e_comeca_a_contar():
+    planilha = PlanilhaFalsa()
+    assert GooglePlanilha._deve_fazer_backup(planilha) is False
+    assert planilha.gravado == [{"backup_3_anos": datetime.now().strftime("%Y-%m-%d")}]
+
+
+def test_sem_data_e_falha_ao_gravar_nao_faz_backup():
+    assert GooglePlanilha._deve_fazer_backup(PlanilhaFalsa(erro=RuntimeError("fora do ar"))) is False
+
+
+def test_backup_vencido():
+    assert GooglePlanilha._deve_fazer_backup(PlanilhaFalsa(datetime.now() - timedelta(days=3 * 366)))
+    assert not GooglePlanilha._deve_fazer_backup(PlanilhaFalsa(datetime.now() - timedelta(days=30)))
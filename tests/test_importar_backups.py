@@ -0,0 +1,30 @@
+from historico_local import COLUNAS
+from importar_backups import normalizar_linhas
+
+CAMPOS = [campo for campo, _ in COLUNAS]
+
+
+def _campo(linha, campo):
+    return linha[CAMPOS.index(campo)]
+
+
+def test_normaliza_data_hora_nomes_e_contadores():
+    cabecalho = [" loja ", "DATA", "HORA", "Vendedor", "CLIENTE", "VENDA", "ATENDIMENTO"]
+    linhas = [["Loja 1 ", "01/02/2025", "9:05:30", " ana", " João ", "1,0", ""]]
+    quantidades, sem_data = normalizar_linhas(cabecalho, linhas)
+    (linha, quantidade), = quantidades.items()
+    assert quantidade == 1 and sem_data == 0
+    assert _campo(linha, "loja") == "LOJA 1"
+    assert _campo(linha, "data") == "2025-02-01"
+    assert _campo(linha, "hora") == "09:05"
+    assert _campo(linha, "vendedor") == "ANA"
+    assert _campo(linha, "cliente") == "João"
+    assert _campo(linha, "venda") == 1 and _campo(linha, "atendimento") == 0
+
+
+def test_conta_repetidas_ignora_vazias_e_conta_sem_data():
+    cabecalho = ["LOJA", "DATA", "CLIENTE"]
+    linhas = [["A", "2025-02-01", "X"], ["A", "01/02/2025", "X"], ["", "", ""], ["A", "ontem", "Y"]]
+    quantidades, sem_data = normalizar_linhas(cabecalho, linhas)
+    assert sorted(quantidades.values()) == [1, 2]
+    assert sem_data == 1
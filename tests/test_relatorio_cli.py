@@ -0,0 +1,21 @@
+from relatorio_cli import sem_repetidos
+
+
+def _registro(cliente, hora="09:05", venda="1"):
+    return {"LOJA": "LOJA 1", "DATA": "01/02/2025", "HORA": hora, "VENDEDOR": "ANA", "CLIENTE": cliente, "VENDA": venda}
+
+
+def test_remove_do_historico_o_que_esta_na_planilha():
+    historico = [_registro("JOAO"), _registro("MARIA")]
+    atuais = [_registro("JOAO", hora="9:05:00", venda="1")]  # mesma linha, outra grafia
+    assert sem_repetidos(historico, atuais) == [_registro("MARIA")]
+
+
+def test_cada_linha_atual_desconta_uma_copia():
+    historico = [_registro("JOAO"), _registro("JOAO"), _registro("JOAO")]
+    assert sem_repetidos(historico, [_registro("JOAO")]) == [_registro("JOAO")] * 2
+
+
+def test_sem_atuais_mantem_tudo():
+    historico = [_registro("JOAO")]
+    assert sem_repetidos(historico, []) == historico
@@ -0,0 +1,91 @@
+import itertools
+
+import pytest
+
+import limitador
+import resiliencia
+from resiliencia import CircuitoAberto, Disjuntor, executar, sem_efeito
+
+_servicos = itertools.count()
+
+
+class ErroHttp(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.response = type("Resposta", (), {"status_code": status})()
+
+
+@pytest.fixture(autouse=True)
+def sem_espera(monkeypatch):
+    monkeypatch.setattr(resiliencia, "espera_backoff", lambda tentativa: 0)
+
+
+@pytest.fixture
+def servico():
+    """Um disjuntor novo por teste (os disjuntores são compartilhados pelo processo)."""
+    return f"teste-{next(_servicos)}"
+
+
+def _falha_depois_sucesso(falhas, erro):
+    chamadas = []
+
+    def func():
+        chamadas.append(1)
+        if len(chamadas) <= falhas:
+            raise erro
+        return "ok"
+    return func, chamadas
+
+
+def test_repete_erro_transitorio(servico):
+    func, chamadas = _falha_depois_sucesso(2, ErroHttp(500))
+    assert executar("leitura", func, servico=servico) == "ok"
+    assert len(chamadas) == 3
+
+
+def test_nao_repete_erro_do_pedido(servico):
+    func, chamadas = _falha_depois_sucesso(1, ErroHttp(400))
+    with pytest.raises(ErroHttp):
+        executar("leitura", func, servico=servico)
+    assert len(chamadas) == 1
+
+
+def test_escrita_nao_idempotente_so_repete_recusa(servico):
+    func, chamadas = _falha_depois_sucesso(1, ErroHttp(500))
+    with pytest.raises(ErroHttp):
+        executar("escrita", func, servico=servico, idempotente=False)
+    assert len(chamadas) == 1
+
+    func, chamadas = _falha_depois_sucesso(1, ErroHttp(429))
+    assert executar("escrita", func, servico=servico, idempotente=False) == "ok"
+    assert len(chamadas) == 2
+
+
+def test_disjuntor_abre_e_recusa(servico):
+    circuito = resiliencia.disjuntor(servico)
+    func, chamadas = _falha_depois_sucesso(resiliencia.TENTATIVAS * 10, ErroHttp(503))
+    for _ in range(2):
+        with pytest.raises((ErroHttp, CircuitoAberto)):
+            executar("leitura", func, servico=servico)
+    assert circuito.estado == "aberto"
+    feitas = len(chamadas)
+    with pytest.raises(CircuitoAberto):
+        executar("leitura", func, servico=servico)
+    assert len(chamadas) == feitas
+
+
+def test_disjuntor_meio_aberto_deixa_passar_um_teste():
+    circuito = Disjuntor("meio-aberto", limite_falhas=1, tempo_aberto=0)
+    circuito.falha()
+    assert circuito.estado == "meio-aberto"
+    circuito.permitir()
+    with pytest.raises(CircuitoAberto):
+        circuito.permitir()
+    circuito.sucesso()
+    assert circuito.estado == "fechado"
+
+
+def test_sem_efeito():
+    assert sem_efeito(ErroHttp(429)) and sem_efeito(ErroHttp(503))
+    assert sem_efeito(CircuitoAberto()) and sem_efeito(limitador.LimiteExcedido())
+    assert not sem_efeito(ErroHttp(500)) and not sem_efeito(TimeoutError())
@@ -0,0 +1,38 @@
+from types import SimpleNamespace
+
+from codificacao_compacta import TabelaCompacta
+from registro_atendimento import COLUNAS_AB_DADOS
+from semeadura import FilaSemeadura, fora_da_tabela
+
+CABECALHOS = [cab for _, cab in COLUNAS_AB_DADOS]
+
+
+def _registro(cliente, hora="09:05"):
+    campos = {campo: "" for campo, _ in COLUNAS_AB_DADOS}
+    campos.update(loja="LOJA 1", data="01/02/2025", hora=hora, vendedor="ANA", cliente=cliente, atendimento="1")
+    return SimpleNamespace(**campos)
+
+
+def _tabela(*registros):
+    return TabelaCompacta.de_linhas(CABECALHOS, [[getattr(r, campo) for campo, _ in COLUNAS_AB_DADOS] for r in registros])
+
+
+def test_so_os_registros_ausentes_da_tabela():
+    tabela = _tabela(_registro("JOAO"), _registro("MARIA", hora="09:05:07"))
+    novos = [_registro("JOAO"), _registro("MARIA", hora="09:05:07"), _registro("PEDRO")]
+    assert [r.cliente for r in fora_da_tabela(novos, tabela)] == ["PEDRO"]
+
+
+def test_copias_iguais_contam_uma_a_uma():
+    tabela = _tabela(_registro("JOAO"))
+    assert len(fora_da_tabela([_registro("JOAO"), _registro("JOAO")], tabela)) == 1
+
+
+def test_fila_so_guarda_durante_a_carga():
+    fila = FilaSemeadura()
+    assert not fila.guardar([_registro("JOAO")])
+    fila.iniciar()
+    assert fila.guardar([_registro("JOAO"), _registro("PEDRO")])
+    faltantes = fila.concluir(_tabela(_registro("JOAO")))
+    assert [r.cliente for r in faltantes] == ["PEDRO"]
+    assert not fila.ativa
@@ -1,7 +1,7 @@
 import streamlit as st
-from datetime import datetime
-from zoneinfo import ZoneInfo
-from google_planilha import GooglePlanilha
+from google_planilha import obter_planilha_compartilhada
+from registro_atendimento import RegistroAtendimento
+from desempenho import fragmento
 
 def tl_ajuste():
     st.subheader("🔧 AJUSTE")
@@ -11,7 +11,7 @@ def tl_ajuste():
 
     if 'gsheets' not in st.session_state:
         try:
-            st.session_state.gsheets = GooglePlanilha()
+            st.session_state.gsheets = obter_planilha_compartilhada()
         except Exception as e:
             st.error("❌ Falha ao conectar com Google Sheets")
             st.exception(e)
@@ -19,7 +19,7 @@ def tl_ajuste():
     gsheets = st.session_state.gsheets
 
     # Carregar vendedores (mesmo que ajuste não exija, mantemos padrão do sistema)
-    vendedores_data = gsheets.get_vendedores_por_loja()
+    vendedores_data = gsheets.get_vendedores_por_loja(st.session_state.loja)
     vendedores = [v['VENDEDOR'] for v in vendedores_data]
 
     if not vendedores:
@@ -29,6 +29,12 @@ def tl_ajuste():
             st.rerun()
         return
 
+    # Formulário isolado: cliques e digitação reexecutam só o fragmento
+    _formulario_ajuste(gsheets, vendedores)
+
+
+@fragmento
+def _formulario_ajuste(gsheets, vendedores):
     # Seleção de vendedor (opcional, mas mantido para padronização)
     vendedor = st.selectbox(
         "Vendedor (opcional)",
@@ -51,7 +57,7 @@ def tl_ajuste():
             st.session_state.tipo_registro = "AJUSTE"
             st.session_state.cliente_ajuste = cliente
             st.session_state.vendedor_ajuste = vendedor if vendedor else ""
-            st.rerun()
+            st.rerun(scope="fragment")
 
     # Mostra a confirmação se já foi feita
     if 'tipo_registro' in st.session_state and st.session_state.tipo_registro == "AJUSTE":
@@ -63,35 +69,35 @@ def tl_ajuste():
         # Confirmação final e registro
         if st.button("💾 REGISTRAR AJUSTE", type="primary", use_container_width=True, key="btn_salvar_ajuste"):
             # ✅ Usa horário de São Paulo
-            horario_sp = datetime.now(ZoneInfo("America/Sao_Paulo"))
+            horario_sp = gsheets.agora_na_loja(st.session_state.loja)
 
-            dados = {
-                'loja': st.session_state.loja,
-                'atendente': st.session_state.nome_atendente,
-                'vendedor': vendedor_conf,
-                'cliente': cliente_conf,
-                'data': horario_sp.strftime("%d/%m/%Y"),
-                'hora': horario_sp.strftime("%H:%M"),
-                'atendimento': '1',
-                'receita': '',
-                'venda': '',
-                'perda': '',
-                'reserva': '',
-                'pesquisa': '',
-                'gar_lente': '',
-                'gar_armacao': '',
-                'ajuste': '1',
-                'entrega': '',
-                'consulta': '',
-            }
+            dados = RegistroAtendimento(
+                loja=st.session_state.loja,
+                atendente=st.session_state.nome_atendente,
+                vendedor=vendedor_conf,
+                cliente=cliente_conf,
+                data=horario_sp.strftime("%d/%m/%Y"),
+                hora=horario_sp.strftime("%H:%M"),
+                atendimento='1',
+                receita='',
+                venda='',
+                perda='',
+                reserva='',
+                pesquisa='',
+                gar_lente='',
+                gar_armacao='',
+                ajuste='1',
+                entrega='',
+                exame='',
+            )
 
             if gsheets.registrar_atendimento(dados):
                 st.balloons()
-                st.success("✅ Pesquisa registrada com sucesso!")
+                st.success("✅ Ajuste registrado com sucesso!")
                 # Limpa o estado
                 del st.session_state.tipo_registro
-                del st.session_state.cliente_pesquisa
-                del st.session_state.vendedor_pesquisa
+                del st.session_state.cliente_ajuste
+                del st.session_state.vendedor_ajuste
                 st.session_state.etapa = 'loja'  
                 st.rerun()
             else:
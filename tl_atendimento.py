@@ -1,4 +1,13 @@
 import streamlit as st
+import os
+
+# 🔹 Logins com acesso às telas de administração (separados por vírgula)
+USUARIOS_ADMIN = {u.strip().upper() for u in os.environ.get("USUARIOS_ADMIN", "").split(",") if u.strip()}
+
+
+def eh_admin(login: str) -> bool:
+    return (login or "").strip().upper() in USUARIOS_ADMIN
+
 
 def tl_atendimento_principal():
     st.title("💼 TELA DE ATENDIMENTO")
@@ -17,7 +26,14 @@ def tl_atendimento_principal():
         ("🛠️ Garantia", "garantia"),
         ("📅 Exame de Vista", "exame"),
         ("📊 Relatório por Vendedor", "relatorio_vendedor"),
+        ("📡 Painel ao Vivo", "painel"),
+        ("🔻 Funil de Conversão", "funil"),
+        ("🔥 Horários de Pico", "mapa_calor"),
+        ("🏆 Ranking de Vendedores", "ranking"),
+        ("🧾 Fechamento do Dia", "fechamento"),
     ]
+    if eh_admin(st.session_state.get('nome_atendente', '')):
+        botoes.append(("🧠 Memória das Sessões", "memoria"))
 
     # Exibe os botões em pares (2 por linha)
     for i in range(0, len(botoes), 2):
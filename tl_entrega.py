@@ -1,7 +1,7 @@
 import streamlit as st
-from datetime import datetime
-from zoneinfo import ZoneInfo
-from google_planilha import GooglePlanilha
+from google_planilha import obter_planilha_compartilhada
+from registro_atendimento import RegistroAtendimento
+from desempenho import fragmento
 
 def tl_entrega():
     st.subheader("📦 ENTREGA DE ÓCULOS")
@@ -11,7 +11,7 @@ def tl_entrega():
 
     if 'gsheets' not in st.session_state:
         try:
-            st.session_state.gsheets = GooglePlanilha()
+            st.session_state.gsheets = obter_planilha_compartilhada()
         except Exception as e:
             st.error("❌ Falha ao conectar com Google Sheets")
             st.exception(e)
@@ -19,7 +19,7 @@ def tl_entrega():
     gsheets = st.session_state.gsheets
 
     # Carregar vendedores
-    vendedores_data = gsheets.get_vendedores_por_loja()
+    vendedores_data = gsheets.get_vendedores_por_loja(st.session_state.loja)
     vendedores = [v['VENDEDOR'] for v in vendedores_data]
 
     if not vendedores:
@@ -29,6 +29,12 @@ def tl_entrega():
             st.rerun()
         return
 
+    # Formulário isolado: cliques e digitação reexecutam só o fragmento
+    _formulario_entrega(gsheets, vendedores)
+
+
+@fragmento
+def _formulario_entrega(gsheets, vendedores):
     # Seleção de vendedor (opcional)
     vendedor = st.selectbox(
         "Vendedor (opcional)",
@@ -51,7 +57,7 @@ def tl_entrega():
             st.session_state.tipo_registro = "ENTREGA"
             st.session_state.cliente_entrega = cliente
             st.session_state.vendedor_entrega = vendedor if vendedor else ""
-            st.rerun()
+            st.rerun(scope="fragment")
 
     # Mostra a confirmação se já foi feita
     if 'tipo_registro' in st.session_state and st.session_state.tipo_registro == "ENTREGA":
@@ -63,35 +69,35 @@ def tl_entrega():
         # Confirmação final e registro
         if st.button("💾 REGISTRAR ENTREGA", type="primary", use_container_width=True, key="btn_salvar_entrega"):
             # ✅ Usa horário de São Paulo
-            horario_sp = datetime.now(ZoneInfo("America/Sao_Paulo"))
+            horario_sp = gsheets.agora_na_loja(st.session_state.loja)
 
-            dados = {
-                'loja': st.session_state.loja,
-                'atendente': st.session_state.nome_atendente,
-                'vendedor': vendedor_conf,
-                'cliente': cliente_conf,
-                'data': horario_sp.strftime("%d/%m/%Y"),
-                'hora': horario_sp.strftime("%H:%M"),
-                'atendimento': '1',
-                'receita': '',
-                'venda': '',
-                'perda': '',
-                'reserva': '',
-                'pesquisa': '',
-                'gar_lente': '',
-                'gar_armacao': '',
-                'ajuste': '',
-                'entrega': '1',
-                'consulta': '',
-            }
+            dados = RegistroAtendimento(
+                loja=st.session_state.loja,
+                atendente=st.session_state.nome_atendente,
+                vendedor=vendedor_conf,
+                cliente=cliente_conf,
+                data=horario_sp.strftime("%d/%m/%Y"),
+                hora=horario_sp.strftime("%H:%M"),
+                atendimento='1',
+                receita='',
+                venda='',
+                perda='',
+                reserva='',
+                pesquisa='',
+                gar_lente='',
+                gar_armacao='',
+                ajuste='',
+                entrega='1',
+                exame='',
+            )
 
             if gsheets.registrar_atendimento(dados):
                 st.balloons()
-                st.success("✅ Pesquisa registrada com sucesso!")
+                st.success("✅ Entrega registrada com sucesso!")
                 # Limpa o estado
                 del st.session_state.tipo_registro
-                del st.session_state.cliente_pesquisa
-                del st.session_state.vendedor_pesquisa
+                del st.session_state.cliente_entrega
+                del st.session_state.vendedor_entrega
                 st.session_state.etapa = 'loja'  
                 st.rerun()
             else:
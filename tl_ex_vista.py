@@ -1,11 +1,11 @@
 import streamlit as st
-from fpdf import FPDF
-import base64
-import io
 from datetime import datetime
 from zoneinfo import ZoneInfo
-import streamlit.components.v1 as components
-from google_planilha import GooglePlanilha  
+from google_planilha import obter_planilha_compartilhada
+from desempenho import fragmento
+from encaminhamentos import ENCAMINHAMENTOS, Encaminhamento
+import memoria_sessao
+from pdf_encaminhamento import gerar_pdf, gerar_pdf_lote
 
 
 def tl_ex_vista():
@@ -15,6 +15,23 @@ def tl_ex_vista():
     # Inicializa campos no session_state
     _inicializar_session_state()
 
+    # Cadastro de encaminhamentos (índice por telefone/nome); sem ele, o PDF continua funcionando
+    _preparar_cadastro()
+    if ENCAMINHAMENTOS.semeado:
+        hoje = datetime.now(ZoneInfo("America/Sao_Paulo")).date().toordinal()
+        resumo = ENCAMINHAMENTOS.conversao(st.session_state.loja, de=hoje - 29)
+        if resumo["encaminhados"]:
+            st.caption(
+                f"📈 Últimos 30 dias nesta loja: {resumo['encaminhados']} encaminhamentos, "
+                f"{resumo['convertidos']} viraram venda ({resumo['taxa']:.0%})."
+            )
+
+    # Formulário isolado: cliques e digitação reexecutam só o fragmento
+    _formulario_encaminhamento()
+
+
+@fragmento
+def _formulario_encaminhamento():
     # Campo: Nome do Paciente
     cliente_input = st.text_input(
         "Nome do Paciente",
@@ -32,6 +49,9 @@ def tl_ex_vista():
     )
     st.session_state.enc_telefone = telefone_input
 
+    # Paciente que volta: busca no índice do processo, sem consultar a planilha
+    _paciente_retornando(telefone_input or cliente_input)
+
     # Campo: Data de Nascimento
     nascimento_input = st.text_input(
         "Data de Nascimento",
@@ -76,10 +96,12 @@ def tl_ex_vista():
     with col1:
         if st.button("🖨️ GERAR PDF", use_container_width=True):
             with st.spinner("Gerando PDF..."):
-                pdf_buffer = gerar_pdf_em_memoria()
-                if pdf_buffer:
+                pdf_bytes = gerar_pdf_em_memoria()
+                if pdf_bytes:
+                    _registrar_encaminhamento()
                     st.success("✅ PDF gerado com sucesso!")
-                    exibir_pdf_no_navegador(pdf_buffer)
+                    # Fora do session_state: descartado se a sessão ficar ociosa
+                    memoria_sessao.guardar("pdf_encaminhamento", pdf_bytes)
                     st.session_state.pdf_gerado = True
                 else:
                     st.error("❌ Falha ao gerar PDF.")
@@ -92,12 +114,32 @@ def tl_ex_vista():
 
     # Botão: Concluído – Voltar à loja
     if st.session_state.get('pdf_gerado', False):
+        pdf_bytes = memoria_sessao.obter("pdf_encaminhamento")
+        if pdf_bytes:
+            exibir_pdf_no_navegador(pdf_bytes)
         st.markdown("---")
         if st.button("✅ Concluído – Voltar à loja", use_container_width=True):
             _limpar_dados_encaminhamento()
             st.session_state.etapa = 'loja'
             st.rerun()
 
+    # Lote do dia: todos os encaminhamentos gerados hoje num único PDF
+    lote = _lote_do_dia()
+    if lote:
+        st.markdown("---")
+        if st.button(f"🗂️ Gerar lote do dia ({len(lote)})", use_container_width=True, key="btn_lote_enc"):
+            with st.spinner("Gerando lote..."):
+                try:
+                    st.download_button(
+                        label="📥 Baixar lote do dia",
+                        data=gerar_pdf_lote(lote),
+                        file_name=f"ENCAMINHAMENTOS_{datetime.now(ZoneInfo('America/Sao_Paulo')).strftime('%Y-%m-%d')}.pdf",
+                        mime="application/pdf",
+                        key="download_lote_enc"
+                    )
+                except Exception as e:
+                    st.error(f"❌ Erro ao gerar lote: {str(e)}")
+
 
 # === FUNÇÕES AUXILIARES ===
 def _inicializar_session_state():
@@ -115,251 +157,71 @@ def _inicializar_session_state():
             st.session_state[key] = value
 
 
-def _carregar_vendedores():
-    """Carrega lista de vendedores da loja atual."""
+def _preparar_cadastro():
+    """Carrega o índice de encaminhamentos (uma vez por processo) e inicia o envio em lote."""
+    if ENCAMINHAMENTOS.semeado:
+        return
     try:
         if 'gsheets' not in st.session_state:
-            st.session_state.gsheets = GooglePlanilha()
-        gsheets = st.session_state.gsheets
-        vendedores_data = gsheets.get_vendedores_por_loja()
-        return [v['VENDEDOR'] for v in vendedores_data] if vendedores_data else []
-    except Exception as e:
-        st.error(f"❌ Erro ao carregar vendedores: {str(e)}")
-        return []
-
-
-def _limpar_dados_encaminhamento():
-    """Limpa os dados de encaminhamento do session_state."""
-    chaves = [
-        'enc_cliente', 'enc_telefone', 'enc_nascimento',
-        'enc_vendedor', 'enc_tipo', 'pdf_gerado'
-    ]
-    for key in chaves:
-        if key in st.session_state:
-            del st.session_state[key]
-
-
-# === GERAÇÃO DE PDF EM MEMÓRIA ===
-def gerar_pdf_em_memoria():
-    """Gera o PDF com validação e suporte a acentos"""
-    try:
-        # ✅ Validação dos dados
-        if not st.session_state.enc_cliente:
-            raise ValueError("Nome do paciente é obrigatório")
-        if not st.session_state.enc_telefone:
-            raise ValueError("Telefone é obrigatório")
-        if not st.session_state.enc_nascimento:
-            raise ValueError("Data de nascimento é obrigatória")
-        if not st.session_state.enc_vendedor:
-            raise ValueError("Vendedor é obrigatório")
-        if st.session_state.enc_tipo not in ["PARTICULAR", "PLANO"]:
-            raise ValueError("Tipo de atendimento inválido")
-
-        # ✅ Cria buffer em memória
-        pdf_buffer = io.BytesIO()
-
-        # ✅ Configura o FPDF
-        pdf = FPDF(format='A4', unit='mm', orientation='P')
-        pdf.add_page()
-        pdf.set_auto_page_break(auto=True, margin=15)
-        pdf.set_font("Arial", 'B', 16)
-
-        # ✅ Título centralizado
-        pdf.cell(0, 10, "ENCAMINHAMENTO", ln=True, align='C')
-        pdf.ln(10)
-
-        # ✅ Função para adicionar campo
-        def add_item(label, value):
-            pdf.set_font("Arial", 'B', 12)
-            pdf.cell(40, 8, f"{label}:", 0, 0)
-            pdf.set_font("Arial", '', 12)
-            text = str(value) if value else ""
-            try:
-                text = text.encode('latin1', 'replace').decode('latin1')
-            except:
-                pass
-            pdf.cell(0, 8, f" {text}", ln=True)
-            pdf.set_x(10)
-
-        # ✅ Dados do paciente
-        add_item("Paciente", st.session_state.enc_cliente)
-        add_item("Telefone", formatar_telefone(st.session_state.enc_telefone))
-        add_item("Nascimento", formatar_data_nascimento(st.session_state.enc_nascimento))
-        add_item("Atendimento", st.session_state.enc_tipo)
-
-        # ✅ Assinatura
-        pdf.set_font("Arial", '', 12)
-        pdf.cell(0, 6, "Consultor", ln=True, align='C')
-        pdf.cell(0, 6, st.session_state.enc_vendedor, ln=True, align='C')
-
-        # --- MENSAGEM FINAL ---
-        pdf.ln(15)
-        pdf.set_font("Arial", '', 11)
-        pdf.set_text_color(50, 50, 50)
-        nome_cliente = st.session_state.enc_cliente.strip() or "Cliente"
-        data_hoje = datetime.now(ZoneInfo("America/Sao_Paulo")).strftime("%d/%m/%Y")
-        mensagem_final = f"Hoje ({data_hoje}), encaminhamento para exame oftalmológico."
-        pdf.cell(0, 8, mensagem_final, ln=True, align='L')
-
-        # ✅ Gera o PDF
-        pdf_output = pdf.output(dest='S')
-        pdf_buffer.write(pdf_output)
-        pdf_buffer.seek(0)
-        return pdf_buffer
-
+            st.session_state.gsheets = obter_planilha_compartilhada()
+        with st.spinner("Carregando encaminhamentos..."):
+            ENCAMINHAMENTOS.semear(st.session_state.gsheets)
+        ENCAMINHAMENTOS.iniciar(obter_planilha_compartilhada)
     except Exception as e:
-        st.error(f"❌ Erro ao gerar PDF: {str(e)}")
-        return None
-
-
-def formatar_telefone(tel):
-    if not tel:
-        return ""
-    tel = ''.join(filter(str.isdigit, tel))
-    if len(tel) == 11:
-        return f"({tel[:2]}) {tel[2:7]}-{tel[7:]}"
-    elif len(tel) == 10:
-        return f"({tel[:2]}) {tel[2:6]}-{tel[6:]}"
-    return tel
-
-
-def formatar_data_nascimento(data):
-    if not data:
-        return ""
-    data = ''.join(filter(str.isdigit, data))
-    if len(data) == 6:
-        dia, mes, ano = data[:2], data[2:4], "20" + data[4:] if data[4:] < "30" else "19" + data[4:]
-    elif len(data) == 8:
-        dia, mes, ano = data[:2], data[2:4], data[4:]
-    else:
-        return data
-    return f"{dia}/{mes}/{ano}"
-
-
-import streamlit as st
-from fpdf import FPDF
-import base64
-import io
-from datetime import datetime
-from zoneinfo import ZoneInfo
-import streamlit.components.v1 as components
-from google_planilha import GooglePlanilha  
-
-
-def tl_ex_vista():
-    """Tela de encaminhamento para exame oftalmológico."""
-    st.subheader("🩺 ENCAMINHAMENTO")
-
-    # Inicializa campos no session_state
-    _inicializar_session_state()
-
-    # Campo: Nome do Paciente
-    cliente_input = st.text_input(
-        "Nome do Paciente",
-        value=st.session_state.enc_cliente,
-        key="enc_cliente_input"
-    ).strip().upper()
-    st.session_state.enc_cliente = cliente_input
-
-    # Campo: Telefone
-    telefone_input = st.text_input(
-        "Telefone",
-        value=st.session_state.enc_telefone,
-        placeholder="(00) 00000-0000",
-        key="enc_telefone_input"
-    )
-    st.session_state.enc_telefone = telefone_input
-
-    # Campo: Data de Nascimento
-    nascimento_input = st.text_input(
-        "Data de Nascimento",
-        value=st.session_state.enc_nascimento,
-        placeholder="DD/MM/AAAA",
-        key="enc_nascimento_input"
-    )
-    st.session_state.enc_nascimento = nascimento_input
+        st.warning(f"⚠️ Histórico de encaminhamentos indisponível: {e}")
 
-    # Campo: Tipo de Atendimento (PARTICULAR / PLANO)
-    tipo_selecionado = st.radio(
-        "Tipo de Atendimento",
-        options=["PARTICULAR", "PLANO"],
-        index=0 if st.session_state.enc_tipo == "PARTICULAR" else 1,
-        horizontal=True
-    )
-    st.session_state.enc_tipo = tipo_selecionado
 
-    # Carrega vendedores
-    vendedores = _carregar_vendedores()
-    if not vendedores:
+def _paciente_retornando(busca):
+    """Mostra o último encaminhamento do paciente e permite reaproveitar os dados."""
+    anteriores = ENCAMINHAMENTOS.buscar(busca, limite=1) if busca else []
+    if not anteriores:
         return
-
-    # Seleciona vendedor
-    if st.session_state.enc_vendedor in vendedores:
-        index_vendedor = vendedores.index(st.session_state.enc_vendedor)
-    else:
-        index_vendedor = 0
-
-    st.session_state.enc_vendedor = st.selectbox(
-        "Vendedor que encaminhou",
-        options=vendedores,
-        index=index_vendedor,
-        key="sel_vendedor_enc"
+    anterior = anteriores[0]
+    venda = ENCAMINHAMENTOS.venda_de(anterior)
+    texto = (
+        f"🔁 **{anterior.paciente}** já foi encaminhado em {anterior.data} "
+        f"({anterior.loja}, {anterior.vendedor}, {anterior.tipo})"
     )
+    if venda:
+        texto += f" — comprou em {venda[0]} ({venda[1]})"
+    st.info(texto)
+    # Callback: os campos só podem ser alterados antes de serem desenhados de novo
+    st.button("📋 Usar dados do encaminhamento anterior", key="btn_usar_enc_anterior",
+              on_click=_usar_encaminhamento_anterior, args=(anterior,))
 
-    st.markdown("---")
-
-    # Botões: Gerar PDF e Voltar
-    col1, col2 = st.columns([1, 1])
-
-    with col1:
-        if st.button("🖨️ GERAR PDF", use_container_width=True):
-            with st.spinner("Gerando PDF..."):
-                pdf_buffer = gerar_pdf_em_memoria()
-                if pdf_buffer:
-                    st.success("✅ PDF gerado com sucesso!")
-                    exibir_pdf_no_navegador(pdf_buffer)
-                    st.session_state.pdf_gerado = True
-                else:
-                    st.error("❌ Falha ao gerar PDF.")
-
-    with col2:
-        if st.button("↩️ Voltar", use_container_width=True):
-            st.session_state.etapa = 'atendimento'
-            st.session_state.subtela = ''
-            st.rerun()
 
-    # Botão: Concluído – Voltar à loja
-    if st.session_state.get('pdf_gerado', False):
-        st.markdown("---")
-        if st.button("✅ Concluído – Voltar à loja", use_container_width=True):
-            _limpar_dados_encaminhamento()
-            st.session_state.etapa = 'loja'
-            st.rerun()
+def _usar_encaminhamento_anterior(anterior):
+    st.session_state.enc_cliente = st.session_state.enc_cliente_input = anterior.paciente
+    st.session_state.enc_telefone = st.session_state.enc_telefone_input = anterior.telefone
+    st.session_state.enc_nascimento = st.session_state.enc_nascimento_input = anterior.nascimento
+    st.session_state.enc_tipo = anterior.tipo if anterior.tipo in ("PARTICULAR", "PLANO") else "PARTICULAR"
 
 
-# === FUNÇÕES AUXILIARES ===
-def _inicializar_session_state():
-    """Inicializa variáveis no session_state."""
-    defaults = {
-        'enc_cliente': "",
-        'enc_telefone': "",
-        'enc_nascimento': "",
-        'enc_vendedor': "",
-        'enc_tipo': "PARTICULAR",
-        'pdf_gerado': False
-    }
-    for key, value in defaults.items():
-        if key not in st.session_state:
-            st.session_state[key] = value
+def _registrar_encaminhamento():
+    """Põe o encaminhamento na fila de gravação em lote (aba 'ab_encaminhamentos')."""
+    try:
+        agora = st.session_state.gsheets.agora_na_loja(st.session_state.loja)
+        ENCAMINHAMENTOS.adicionar(Encaminhamento(
+            data=agora.strftime("%d/%m/%Y"),
+            hora=agora.strftime("%H:%M"),
+            loja=st.session_state.loja,
+            vendedor=st.session_state.enc_vendedor,
+            paciente=st.session_state.enc_cliente,
+            telefone=st.session_state.enc_telefone,
+            nascimento=st.session_state.enc_nascimento,
+            tipo=st.session_state.enc_tipo,
+        ))
+    except Exception as e:
+        st.warning(f"⚠️ Encaminhamento não registrado no histórico: {e}")
 
 
 def _carregar_vendedores():
     """Carrega lista de vendedores da loja atual."""
     try:
         if 'gsheets' not in st.session_state:
-            st.session_state.gsheets = GooglePlanilha()
+            st.session_state.gsheets = obter_planilha_compartilhada()
         gsheets = st.session_state.gsheets
-        vendedores_data = gsheets.get_vendedores_por_loja()
+        vendedores_data = gsheets.get_vendedores_por_loja(st.session_state.loja)
         return [v['VENDEDOR'] for v in vendedores_data] if vendedores_data else []
     except Exception as e:
         st.error(f"❌ Erro ao carregar vendedores: {str(e)}")
@@ -375,114 +237,46 @@ def _limpar_dados_encaminhamento():
     for key in chaves:
         if key in st.session_state:
             del st.session_state[key]
+    memoria_sessao.descartar("pdf_encaminhamento")
+
+
+def _lote_do_dia():
+    """Encaminhamentos de hoje nesta loja, do cadastro do processo (todas as sessões e vendedores)."""
+    loja = st.session_state.loja
+    gsheets = st.session_state.get('gsheets')
+    agora = gsheets.agora_na_loja(loja) if gsheets is not None else datetime.now(ZoneInfo("America/Sao_Paulo"))
+    campos = ('paciente', 'telefone', 'nascimento', 'tipo', 'vendedor', 'data')
+    return [
+        {campo: getattr(item, campo) for campo in campos}
+        for item in ENCAMINHAMENTOS.do_dia(loja, agora.strftime("%d/%m/%Y"))
+    ]
 
 
 # === GERAÇÃO DE PDF EM MEMÓRIA ===
 def gerar_pdf_em_memoria():
-    """Gera o PDF com validação e suporte a acentos"""
+    """Gera o PDF a partir do modelo pré-diagramado e retorna os bytes."""
     try:
-        # ✅ Validação dos dados
-        if not st.session_state.enc_cliente:
-            raise ValueError("Nome do paciente é obrigatório")
-        if not st.session_state.enc_telefone:
-            raise ValueError("Telefone é obrigatório")
-        if not st.session_state.enc_nascimento:
-            raise ValueError("Data de nascimento é obrigatória")
-        if not st.session_state.enc_vendedor:
-            raise ValueError("Vendedor é obrigatório")
-        if st.session_state.enc_tipo not in ["PARTICULAR", "PLANO"]:
-            raise ValueError("Tipo de atendimento inválido")
-
-        # ✅ Cria buffer em memória
-        pdf_buffer = io.BytesIO()
-
-        # ✅ Configura o FPDF
-        pdf = FPDF(format='A4', unit='mm', orientation='P')
-        pdf.add_page()
-        pdf.set_auto_page_break(auto=True, margin=15)
-        pdf.set_font("Arial", 'B', 16)
-
-        # ✅ Título centralizado
-        pdf.cell(0, 10, "ENCAMINHAMENTO", ln=True, align='C')
-        pdf.ln(10)
-
-        # ✅ Função para adicionar campo
-        def add_item(label, value):
-            pdf.set_font("Arial", 'B', 12)
-            pdf.cell(40, 8, f"{label}:", 0, 0)
-            pdf.set_font("Arial", '', 12)
-            text = str(value) if value else ""
-            try:
-                text = text.encode('latin1', 'replace').decode('latin1')
-            except:
-                pass
-            pdf.cell(0, 8, f" {text}", ln=True)
-            pdf.set_x(10)
-
-        # ✅ Dados do paciente
-        add_item("Paciente", st.session_state.enc_cliente)
-        add_item("Telefone", formatar_telefone(st.session_state.enc_telefone))
-        add_item("Nascimento", formatar_data_nascimento(st.session_state.enc_nascimento))
-        add_item("Atendimento", st.session_state.enc_tipo)
-
-        # ✅ Assinatura
-        pdf.set_font("Arial", '', 12)
-        pdf.cell(0, 6, "Consultor", ln=True, align='C')
-        pdf.cell(0, 6, st.session_state.enc_vendedor, ln=True, align='C')
-
-        # --- MENSAGEM FINAL ---
-        pdf.ln(15)
-        pdf.set_font("Arial", '', 11)
-        pdf.set_text_color(50, 50, 50)
-        nome_cliente = st.session_state.enc_cliente.strip() or "Cliente"
-        data_hoje = datetime.now(ZoneInfo("America/Sao_Paulo")).strftime("%d/%m/%Y")
-        mensagem_final = f"Hoje ({data_hoje}), encaminhamento para exame de vista."
-        pdf.cell(0, 8, mensagem_final, ln=True, align='L')
-
-        # ✅ Gera o PDF
-        pdf_output = pdf.output(dest='S')
-        pdf_buffer.write(pdf_output)
-        pdf_buffer.seek(0)
-        return pdf_buffer
+        dados = {
+            'paciente': st.session_state.enc_cliente,
+            'telefone': st.session_state.enc_telefone,
+            'nascimento': st.session_state.enc_nascimento,
+            'tipo': st.session_state.enc_tipo,
+            'vendedor': st.session_state.enc_vendedor,
+            'data': datetime.now(ZoneInfo("America/Sao_Paulo")).strftime("%d/%m/%Y"),
+        }
+        return gerar_pdf(dados)
 
     except Exception as e:
         st.error(f"❌ Erro ao gerar PDF: {str(e)}")
         return None
 
 
-def formatar_telefone(tel):
-    if not tel:
-        return ""
-    tel = ''.join(filter(str.isdigit, tel))
-    if len(tel) == 11:
-        return f"({tel[:2]}) {tel[2:7]}-{tel[7:]}"
-    elif len(tel) == 10:
-        return f"({tel[:2]}) {tel[2:6]}-{tel[6:]}"
-    return tel
-
-
-def formatar_data_nascimento(data):
-    if not data:
-        return ""
-    data = ''.join(filter(str.isdigit, data))
-    if len(data) == 6:
-        dia, mes, ano = data[:2], data[2:4], "20" + data[4:] if data[4:] < "30" else "19" + data[4:]
-    elif len(data) == 8:
-        dia, mes, ano = data[:2], data[2:4], data[4:]
-    else:
-        return data
-    return f"{dia}/{mes}/{ano}"
-
-
-def exibir_pdf_no_navegador(pdf_buffer):
+def exibir_pdf_no_navegador(pdf_data):
     """Exibe PDF com download e instruções para imprimir."""
     try:
         nome_cliente = st.session_state.enc_cliente.strip() or "Encaminhamento"
         nome_arquivo = "".join(c for c in nome_cliente.upper() if c.isalnum() or c in " _-").strip() + ".pdf"
 
-        pdf_buffer.seek(0)
-        pdf_data = pdf_buffer.read()
-
         # Botão de download
         st.download_button(
             label="📥 Baixar PDF",
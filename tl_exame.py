@@ -1,7 +1,7 @@
 import streamlit as st
-from datetime import datetime
-from zoneinfo import ZoneInfo
-from google_planilha import GooglePlanilha  
+from google_planilha import obter_planilha_compartilhada
+from registro_atendimento import RegistroAtendimento
+from desempenho import fragmento
 
 def tl_exame():
     st.subheader("📅 CONFIRMAR EXAME OFTALMOLÓGICO")
@@ -12,7 +12,7 @@ def tl_exame():
     # Conecta com Google Sheets
     if 'gsheets' not in st.session_state:
         try:
-            st.session_state.gsheets = GooglePlanilha()
+            st.session_state.gsheets = obter_planilha_compartilhada()
         except Exception as e:
             st.error("❌ Falha ao conectar com Google Sheets")
             st.exception(e)
@@ -21,7 +21,7 @@ def tl_exame():
 
     # Carrega vendedores
     try:
-        vendedores_data = gsheets.get_vendedores_por_loja()
+        vendedores_data = gsheets.get_vendedores_por_loja(st.session_state.loja)
         vendedores = [v['VENDEDOR'] for v in vendedores_data] if vendedores_data else []
     except Exception as e:
         st.error(f"❌ Erro ao carregar vendedores: {e}")
@@ -34,6 +34,12 @@ def tl_exame():
             st.rerun()
         return
 
+    # Formulário isolado: cliques e digitação reexecutam só o fragmento
+    _formulario_exame(gsheets, vendedores)
+
+
+@fragmento
+def _formulario_exame(gsheets, vendedores):
     # Campos do formulário
     cliente = st.text_input("Nome do Paciente", key="cliente_consulta_input").strip().upper()
     vendedor = st.selectbox(
@@ -52,22 +58,22 @@ def tl_exame():
                 st.error("⚠️ Preencha todos os campos!")
             else:
                 # ✅ Usa horário de São Paulo
-                horario_sp = datetime.now(ZoneInfo("America/Sao_Paulo"))
+                horario_sp = gsheets.agora_na_loja(st.session_state.loja)
 
-                dados = {
-                    'loja': st.session_state.loja,
-                    'vendedor': vendedor,
-                    'cliente': cliente,
-                    'data': horario_sp.strftime("%d/%m/%Y"),
-                    'hora': horario_sp.strftime("%H:%M"),
-                    'atendimento': '1',
-                    'receita': '',
-                    'perda': '',
-                    'venda': '',
-                    'reserva': '',
-                    'pesquisa': '',
-                    'consulta': '1',
-                }
+                dados = RegistroAtendimento(
+                    loja=st.session_state.loja,
+                    vendedor=vendedor,
+                    cliente=cliente,
+                    data=horario_sp.strftime("%d/%m/%Y"),
+                    hora=horario_sp.strftime("%H:%M"),
+                    atendimento='1',
+                    receita='',
+                    perda='',
+                    venda='',
+                    reserva='',
+                    pesquisa='',
+                    exame='1',
+                )
 
                 if gsheets.registrar_atendimento(dados):
                     st.balloons()
@@ -0,0 +1,104 @@
+import streamlit as st
+from datetime import date
+from google_planilha import obter_planilha_compartilhada
+from exportacao import FORMATOS
+from desempenho import fragmento
+from fechamento import FECHAMENTO, FORMATOS_FECHAMENTO, nome_arquivo
+from tl_atendimento import eh_admin
+
+
+def _rotulo_dia(dia: str) -> str:
+    return date.fromisoformat(dia).strftime("%d/%m/%Y")
+
+
+def tl_fechamento():
+    st.subheader("🧾 FECHAMENTO DO DIA")
+    st.info(f"**Usuário:** {st.session_state.nome_atendente}")
+    st.markdown("---")
+
+    estado = FECHAMENTO.estado()
+    st.caption(
+        f"Gerado automaticamente todos os dias às {estado['horario']}. Registros do dia feitos depois "
+        f"disso entram numa nova geração, {estado['carencia'] // 60} min após o último."
+    )
+    if estado["situacao"] == "falhou":
+        st.warning(f"⚠️ A última geração falhou: {estado['erro']}")
+
+    if eh_admin(st.session_state.get('nome_atendente', '')):
+        _gerar_agora()
+
+    _downloads_fechamento()
+
+    if st.button("↩️ VOLTAR", use_container_width=True, key="btn_voltar_fechamento"):
+        st.session_state.etapa = 'atendimento'
+        st.rerun()
+
+
+def _gerar_agora():
+    """Administradores podem refazer o fechamento de hoje fora do horário."""
+    if not st.button("⚙️ Gerar fechamento de hoje agora", use_container_width=True, key="btn_gerar_fechamento"):
+        return
+    if 'gsheets' not in st.session_state:
+        try:
+            st.session_state.gsheets = obter_planilha_compartilhada()
+        except Exception as e:
+            st.error("❌ Falha ao conectar com Google Sheets")
+            st.exception(e)
+            return
+    try:
+        with st.spinner("Gerando os arquivos de fechamento..."):
+            gerou = FECHAMENTO.gerar(st.session_state.gsheets, forcar=True)
+    except Exception as e:
+        st.error(f"❌ Erro ao gerar o fechamento: {e}")
+        return
+    if gerou:
+        st.success("✅ Fechamento de hoje gerado.")
+    else:
+        st.info("⏳ O fechamento já está sendo gerado; tente novamente em instantes.")
+
+
+@fragmento
+def _downloads_fechamento():
+    """Só entrega arquivos prontos: nada é calculado nem gerado aqui."""
+    dias = FECHAMENTO.dias()
+    if not dias:
+        st.info("📭 Nenhum fechamento gerado ainda.")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        dia = st.selectbox("Dia", dias, format_func=_rotulo_dia, key="dia_fechamento")
+    indice = FECHAMENTO.indice(dia)
+    lojas = list(indice.get("lojas", {}))
+    if not lojas:
+        st.info(f"📭 Nenhuma loja teve registros em {_rotulo_dia(dia)}.")
+        return
+    loja_sessao = st.session_state.get('loja', '').strip().upper()
+    with col2:
+        loja = st.selectbox(
+            "Loja", lojas,
+            index=lojas.index(loja_sessao) if loja_sessao in lojas else 0,
+            key="loja_fechamento"
+        )
+
+    totais = indice.get("totais", {}).get(loja, {})
+    colunas = st.columns(len(totais) or 1)
+    for coluna, (nome, valor) in zip(colunas, totais.items()):
+        coluna.metric(nome.title(), str(int(valor)))
+    st.caption(f"Gerado em {indice.get('gerado_em', '')[:16].replace('T', ' ')}")
+
+    botoes = st.columns(len(FORMATOS_FECHAMENTO))
+    for coluna, formato in zip(botoes, FORMATOS_FECHAMENTO):
+        conteudo = FECHAMENTO.arquivo(dia, loja, formato, indice.get("versao", ""))
+        if conteudo is None:
+            continue
+        extensao, mime, _ = FORMATOS[formato]
+        with coluna:
+            st.download_button(
+                label=f"📥 Baixar ({extensao.upper()})",
+                data=conteudo,
+                file_name=f"Fechamento_{nome_arquivo(loja)}_{dia}.{extensao}",
+                mime=mime,
+                use_container_width=True,
+                key=f"btn_download_fechamento_{formato}"
+            )
@@ -0,0 +1,139 @@
+import streamlit as st
+from google_planilha import obter_planilha_compartilhada
+from desempenho import fragmento
+from funil import FUNIL, TODOS, TODO_PERIODO
+
+# 🔹 Etapas exibidas: (chave em funil.etapas, rótulo)
+ETAPAS_FUNIL = (
+    ("atendimentos", "Atendimentos"),
+    ("com_receita", "Com receita"),
+    ("vendas_receita", "Venda na hora"),
+    ("perdas_receita", "Perda na hora"),
+    ("reservas_receita", "Reservas abertas"),
+    ("conversoes_reserva", "Reservas convertidas"),
+    ("desistencias_reserva", "Desistências de reserva"),
+    ("retornos", "Retornos sem reserva"),
+    ("vendas", "Vendas (líquido)"),
+    ("perdas", "Perdas (líquido)"),
+    ("reservas_em_aberto", "Reservas em aberto"),
+)
+TAXAS_FUNIL = (
+    ("taxa_receita", "Receita / atendimento"),
+    ("conversao_imediata", "Conversão na hora"),
+    ("conversao_reservas", "Conversão de reservas"),
+    ("conversao_final", "Conversão final"),
+    ("taxa_perda", "Perda final"),
+)
+TODAS_LOJAS = "TODAS AS LOJAS"
+
+
+def _percentual(taxa) -> str:
+    return "—" if taxa is None else f"{taxa * 100:.1f}%"
+
+
+def _rotulo_periodo(periodo: str) -> str:
+    return "Todo o período" if periodo == TODO_PERIODO else periodo
+
+
+def tl_funil():
+    st.subheader("🔻 FUNIL DE CONVERSÃO")
+    st.info(f"**Usuário:** {st.session_state.nome_atendente}")
+    st.markdown("---")
+
+    if 'gsheets' not in st.session_state:
+        try:
+            st.session_state.gsheets = obter_planilha_compartilhada()
+        except Exception as e:
+            st.error("❌ Falha ao conectar com Google Sheets")
+            st.exception(e)
+            return
+
+    try:
+        with st.spinner("Montando o funil..."):
+            FUNIL.semear(st.session_state.gsheets)
+    except Exception as e:
+        st.error(f"❌ Erro ao carregar os registros: {e}")
+        return
+
+    _relatorio_funil()
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔄 Recarregar da planilha", use_container_width=True, key="btn_recarregar_funil"):
+            try:
+                with st.spinner("Relendo a planilha..."):
+                    FUNIL.semear(st.session_state.gsheets, forcar=True)
+            except Exception as e:
+                st.error(f"❌ Erro ao recarregar: {e}")
+            else:
+                st.rerun()
+    with col2:
+        if st.button("↩️ VOLTAR", use_container_width=True, key="btn_voltar_funil"):
+            st.session_state.etapa = 'atendimento'
+            st.rerun()
+
+
+@fragmento
+def _relatorio_funil():
+    """Troca de filtro reexecuta só este trecho; cada consulta é uma busca nos acumuladores."""
+    lojas = FUNIL.lojas()
+    if not lojas:
+        st.info("📭 Nenhum atendimento registrado.")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        periodo = st.selectbox(
+            "Período",
+            FUNIL.periodos(),
+            format_func=_rotulo_periodo,
+            key="periodo_funil"
+        )
+    with col2:
+        loja_sessao = st.session_state.get('loja', '').strip().upper()
+        opcoes = [TODAS_LOJAS] + lojas
+        loja = st.selectbox(
+            "Loja",
+            opcoes,
+            index=opcoes.index(loja_sessao) if loja_sessao in opcoes else 0,
+            key="loja_funil"
+        )
+
+    chave_loja = TODOS if loja == TODAS_LOJAS else loja
+    resumo = FUNIL.consultar(chave_loja, TODOS, periodo)
+
+    for coluna, (chave, rotulo) in zip(st.columns(len(TAXAS_FUNIL)), TAXAS_FUNIL):
+        coluna.metric(rotulo, _percentual(resumo[chave]))
+
+    st.markdown("### Etapas")
+    st.dataframe(
+        [{"ETAPA": rotulo, "QUANTIDADE": resumo[chave]} for chave, rotulo in ETAPAS_FUNIL],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    # Todas as lojas: uma linha por loja; uma loja: uma linha por vendedor
+    if chave_loja == TODOS:
+        st.markdown("### Por loja")
+        linhas = [("LOJA", nome, FUNIL.consultar(nome, TODOS, periodo)) for nome in lojas]
+    else:
+        st.markdown("### Por vendedor")
+        linhas = [("VENDEDOR", nome, FUNIL.consultar(chave_loja, nome, periodo)) for nome in FUNIL.vendedores(chave_loja)]
+
+    tabela = [
+        {
+            coluna: nome,
+            "ATENDIMENTOS": funil["atendimentos"],
+            "COM RECEITA": funil["com_receita"],
+            "VENDAS": funil["vendas"],
+            **{rotulo.upper(): _percentual(funil[chave]) for chave, rotulo in TAXAS_FUNIL},
+        }
+        for coluna, nome, funil in linhas
+        if funil["atendimentos"]
+    ]
+    if tabela:
+        st.dataframe(tabela, use_container_width=True, hide_index=True)
+    else:
+        st.info("📭 Sem movimento neste período.")
+
+    st.caption(f"{FUNIL.linhas} registros no funil; novas gravações deste servidor entram na hora; as de outros, quando a planilha muda de versão.")
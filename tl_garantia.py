@@ -1,7 +1,7 @@
 import streamlit as st
-from datetime import datetime
-from zoneinfo import ZoneInfo
-from google_planilha import GooglePlanilha
+from google_planilha import obter_planilha_compartilhada
+from registro_atendimento import RegistroAtendimento
+from desempenho import fragmento
 
 def tl_garantia():
     st.subheader("🛠️ GARANTIA")
@@ -11,7 +11,7 @@ def tl_garantia():
 
     if 'gsheets' not in st.session_state:
         try:
-            st.session_state.gsheets = GooglePlanilha()
+            st.session_state.gsheets = obter_planilha_compartilhada()
         except Exception as e:
             st.error("❌ Falha ao conectar com Google Sheets")
             st.exception(e)
@@ -19,7 +19,7 @@ def tl_garantia():
     gsheets = st.session_state.gsheets
 
     # Carregar vendedores
-    vendedores_data = gsheets.get_vendedores_por_loja()
+    vendedores_data = gsheets.get_vendedores_por_loja(st.session_state.loja)
     vendedores = [v['VENDEDOR'] for v in vendedores_data]
 
     if not vendedores:
@@ -29,6 +29,12 @@ def tl_garantia():
             st.rerun()
         return
 
+    # Formulário isolado: cliques e digitação reexecutam só o fragmento
+    _formulario_garantia(gsheets, vendedores)
+
+
+@fragmento
+def _formulario_garantia(gsheets, vendedores):
     # Seleção de vendedor (opcional)
     vendedor = st.selectbox(
         "Vendedor (opcional)",
@@ -55,7 +61,7 @@ def tl_garantia():
             st.session_state.cliente_garantia = cliente
             st.session_state.vendedor_garantia = vendedor if vendedor else ""
             st.session_state.tipo_garantia_selecionada = tipo
-            st.rerun()
+            st.rerun(scope="fragment")
 
     # Mostra a confirmação se já foi feita
     if 'tipo_registro' in st.session_state and st.session_state.tipo_registro == "GARANTIA":
@@ -68,39 +74,39 @@ def tl_garantia():
         # Confirmação final e registro
         if st.button("💾 REGISTRAR GARANTIA", type="primary", use_container_width=True, key="btn_salvar_garantia"):
             # ✅ Usa horário de São Paulo
-            horario_sp = datetime.now(ZoneInfo("America/Sao_Paulo"))
+            horario_sp = gsheets.agora_na_loja(st.session_state.loja)
 
             # Define campos específicos de garantia
             gar_lente = '1' if tipo_conf == "LENTE" else ''
             gar_armacao = '1' if tipo_conf == "ARMAÇÃO" else ''
 
-            dados = {
-                'loja': st.session_state.loja,
-                'atendente': st.session_state.nome_atendente,
-                'vendedor': vendedor_conf,
-                'cliente': cliente_conf,
-                'data': horario_sp.strftime("%d/%m/%Y"),
-                'hora': horario_sp.strftime("%H:%M"),
-                'atendimento': '1',
-                'receita': '',
-                'venda': '',
-                'perda': '',
-                'reserva': '',
-                'pesquisa': '',
-                'gar_lente': gar_lente,
-                'gar_armacao': gar_armacao,
-                'ajuste': '',
-                'entrega': '',
-                'consulta': '',
-            }
+            dados = RegistroAtendimento(
+                loja=st.session_state.loja,
+                atendente=st.session_state.nome_atendente,
+                vendedor=vendedor_conf,
+                cliente=cliente_conf,
+                data=horario_sp.strftime("%d/%m/%Y"),
+                hora=horario_sp.strftime("%H:%M"),
+                atendimento='1',
+                receita='',
+                venda='',
+                perda='',
+                reserva='',
+                pesquisa='',
+                gar_lente=gar_lente,
+                gar_armacao=gar_armacao,
+                ajuste='',
+                entrega='',
+                exame='',
+            )
 
             if gsheets.registrar_atendimento(dados):
                 st.balloons()
-                st.success("✅ Pesquisa registrada com sucesso!")
+                st.success("✅ Garantia registrada com sucesso!")
                 # Limpa o estado
                 del st.session_state.tipo_registro
-                del st.session_state.cliente_pesquisa
-                del st.session_state.vendedor_pesquisa
+                del st.session_state.cliente_garantia
+                del st.session_state.vendedor_garantia
                 st.session_state.etapa = 'loja'  
                 st.rerun()
             else:
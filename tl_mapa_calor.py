@@ -0,0 +1,97 @@
+import streamlit as st
+from google_planilha import obter_planilha_compartilhada
+from desempenho import fragmento
+from mapa_calor import MAPA_CALOR, DIAS_SEMANA, HORAS, TODOS
+
+# 🔹 Janelas de tempo oferecidas: (rótulo, nº de meses; None = tudo)
+JANELAS = (
+    ("Últimos 3 meses", 3),
+    ("Últimos 6 meses", 6),
+    ("Últimos 12 meses", 12),
+    ("Todo o período", None),
+)
+TODAS_LOJAS = "TODAS AS LOJAS"
+
+
+def tl_mapa_calor():
+    st.subheader("🔥 HORÁRIOS DE PICO")
+    st.info(f"**Usuário:** {st.session_state.nome_atendente}")
+    st.markdown("---")
+
+    if 'gsheets' not in st.session_state:
+        try:
+            st.session_state.gsheets = obter_planilha_compartilhada()
+        except Exception as e:
+            st.error("❌ Falha ao conectar com Google Sheets")
+            st.exception(e)
+            return
+
+    try:
+        with st.spinner("Contando os atendimentos por horário..."):
+            MAPA_CALOR.semear(st.session_state.gsheets)
+    except Exception as e:
+        st.error(f"❌ Erro ao carregar os registros: {e}")
+        return
+
+    _mapa()
+
+    if st.button("↩️ VOLTAR", use_container_width=True, key="btn_voltar_mapa_calor"):
+        st.session_state.etapa = 'atendimento'
+        st.rerun()
+
+
+@fragmento
+def _mapa():
+    """Troca de loja/janela reexecuta só este trecho: soma de matrizes 7×24 já prontas."""
+    import altair as alt
+
+    lojas = MAPA_CALOR.lojas()
+    if not lojas:
+        st.info("📭 Nenhum atendimento com data e hora registrado.")
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        loja_sessao = st.session_state.get('loja', '').strip().upper()
+        opcoes = [TODAS_LOJAS] + lojas
+        loja = st.selectbox(
+            "Loja",
+            opcoes,
+            index=opcoes.index(loja_sessao) if loja_sessao in opcoes else 0,
+            key="loja_mapa_calor"
+        )
+    with col2:
+        rotulo_janela = st.selectbox("Janela", [r for r, _ in JANELAS], key="janela_mapa_calor")
+
+    n_meses = dict(JANELAS)[rotulo_janela]
+    meses = None if n_meses is None else MAPA_CALOR.meses()[:n_meses]
+    chave_loja = TODOS if loja == TODAS_LOJAS else loja
+    media = MAPA_CALOR.media_por_dia(chave_loja, meses)
+
+    # Só as horas em que houve movimento, para o gráfico não ficar com a madrugada vazia
+    horas = [h for h in range(HORAS) if media[:, h].any()]
+    if not horas:
+        st.info("📭 Sem movimento nesta janela.")
+        return
+
+    celulas = [
+        {"Dia": DIAS_SEMANA[d], "Hora": f"{h:02d}h", "Média": round(float(media[d, h]), 2)}
+        for d in range(len(DIAS_SEMANA)) for h in horas
+    ]
+    grafico = alt.Chart(alt.Data(values=celulas)).mark_rect().encode(
+        x=alt.X("Hora:O", title="Hora"),
+        y=alt.Y("Dia:O", sort=list(DIAS_SEMANA), title=None),
+        color=alt.Color("Média:Q", scale=alt.Scale(scheme="orangered"), title="Atend./dia"),
+        tooltip=["Dia:O", "Hora:O", "Média:Q"],
+    )
+    texto = grafico.mark_text(fontSize=10).encode(
+        text=alt.Text("Média:Q", format=".1f"),
+        color=alt.value("black"),
+    )
+    st.altair_chart(grafico + texto, use_container_width=True)
+
+    dia, hora = divmod(int(media.argmax()), HORAS)
+    st.caption(
+        f"Pico: **{DIAS_SEMANA[dia]} às {hora:02d}h** ({media[dia, hora]:.1f} atendimentos em média). "
+        + ("Com todas as lojas, a média é por loja aberta no dia." if chave_loja == TODOS else "")
+    )
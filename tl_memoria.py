@@ -0,0 +1,95 @@
+import streamlit as st
+import os
+import memoria_sessao
+from tl_atendimento import eh_admin
+
+
+def tl_memoria():
+    st.subheader("🧠 MEMÓRIA DAS SESSÕES")
+    st.info(f"**Usuário:** {st.session_state.nome_atendente}")
+    st.markdown("---")
+
+    if not eh_admin(st.session_state.nome_atendente):
+        st.error("❌ Acesso restrito aos administradores.")
+        if st.button("↩️ VOLTAR", key="btn_voltar_memoria_negado"):
+            st.session_state.etapa = 'atendimento'
+            st.rerun()
+        return
+
+    memoria_sessao.MEMORIA.limpar_ociosas()
+    metricas = memoria_sessao.MEMORIA.metricas()
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Sessões", metricas["sessoes"])
+    col2.metric("Objetos pesados", metricas["objetos"])
+    col3.metric("Em uso (MB)", f"{metricas['total_mb']} / {metricas['limite_mb']}")
+    col4.metric("Descartes", metricas["descartes"])
+
+    rss = _memoria_processo_mb()
+    if rss is not None:
+        st.caption(f"Processo (RSS): **{rss:.0f} MB**, inclui caches compartilhados e bibliotecas")
+
+    st.markdown("### Por sessão")
+    linhas = memoria_sessao.MEMORIA.resumo()
+    if linhas:
+        st.dataframe(
+            linhas,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "sessao": "Sessão",
+                "usuario": "Usuário",
+                "loja": "Loja",
+                "ociosa_min": "Ociosa (min)",
+                "estado_kb": "session_state (KB)",
+                "objetos": "Objetos",
+                "objetos_kb": "Objetos (KB)",
+            },
+        )
+    else:
+        st.info("📭 Nenhuma sessão registrada.")
+
+    st.caption(
+        f"Objetos de sessões ociosas por mais de {memoria_sessao.TTL_OCIOSA / 60:.0f} min são descartados; "
+        f"limite por sessão: {memoria_sessao.LIMITE_POR_SESSAO / 1024 / 1024:.0f} MB."
+    )
+
+    _secao_backup()
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔄 Atualizar", use_container_width=True, key="btn_atualizar_memoria"):
+            st.rerun()
+    with col2:
+        if st.button("↩️ VOLTAR", use_container_width=True, key="btn_voltar_memoria"):
+            st.session_state.etapa = 'atendimento'
+            st.rerun()
+
+
+def _memoria_processo_mb():
+    """RSS atual do processo (Linux/Render); None onde /proc não existe."""
+    try:
+        with open(f"/proc/{os.getpid()}/status", encoding="utf-8") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def _secao_backup():
+    """Situação do backup da 'ab_dados' neste processo (rodar_backup_automatico)."""
+    from google_planilha import estado_backup
+
+    st.markdown("### Backup da 'ab_dados'")
+    estado = estado_backup()
+    situacao = estado.get("situacao", "ocioso")
+    if situacao == "falhou" or estado.get("erro"):
+        st.warning(f"⚠️ Backup: {situacao} — {estado.get('erro', '')}")
+    elif situacao == "exportado sem limpeza":
+        st.warning(f"⚠️ `{estado.get('arquivo', '')}` exportado, mas as linhas não foram removidas; será refeito.")
+    elif situacao == "concluído":
+        st.success(f"✅ `{estado.get('arquivo', '')}`: {estado.get('total', 0)} linhas exportadas e removidas em {estado.get('data', '')}.")
+    else:
+        st.caption(f"Situação neste processo: {situacao}")
@@ -0,0 +1,77 @@
+import streamlit as st
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from google_planilha import obter_planilha_compartilhada
+from desempenho import fragmento
+from painel_ao_vivo import PAINEL, ROTULOS
+
+# 🔹 Intervalo de atualização do painel (segundos)
+INTERVALO_PAINEL = 10
+
+
+def tl_painel():
+    st.subheader("📡 PAINEL AO VIVO — HOJE")
+    st.info(f"**Usuário:** {st.session_state.nome_atendente}")
+    st.markdown("---")
+
+    if 'gsheets' not in st.session_state:
+        try:
+            st.session_state.gsheets = obter_planilha_compartilhada()
+        except Exception as e:
+            st.error("❌ Falha ao conectar com Google Sheets")
+            st.exception(e)
+            return
+
+    try:
+        PAINEL.semear(st.session_state.gsheets)
+    except Exception as e:
+        st.error(f"❌ Erro ao carregar as contagens de hoje: {e}")
+        return
+
+    _quadro_ao_vivo()
+
+    if st.button("↩️ VOLTAR", use_container_width=True, key="btn_voltar_painel"):
+        st.session_state.etapa = 'atendimento'
+        st.rerun()
+
+
+@fragmento(run_every=INTERVALO_PAINEL)
+def _quadro_ao_vivo():
+    """Reexecutado a cada intervalo; lê só os contadores em memória."""
+    # Virada do dia: a semeadura detecta a data nova e recomeça as contagens
+    PAINEL.semear(st.session_state.gsheets)
+
+    por_loja = PAINEL.por_loja()
+    agora = datetime.now(ZoneInfo("America/Sao_Paulo")).strftime("%H:%M:%S")
+    st.caption(f"🔄 Atualizado às {agora} (a cada {INTERVALO_PAINEL}s)")
+
+    if not por_loja:
+        st.info("📭 Nenhum atendimento registrado hoje.")
+        return
+
+    totais = [sum(valores[i] for valores in por_loja.values()) for i in range(len(ROTULOS))]
+    for coluna, rotulo, total in zip(st.columns(len(ROTULOS)), ROTULOS, totais):
+        coluna.metric(rotulo, total)
+
+    st.markdown("### Por loja")
+    st.dataframe(
+        [{"LOJA": loja, **dict(zip(ROTULOS, valores))} for loja, valores in sorted(por_loja.items())],
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    lojas = sorted(por_loja)
+    loja_sessao = st.session_state.get('loja', '').strip().upper()
+    loja = st.selectbox(
+        "Vendedores da loja",
+        lojas,
+        index=lojas.index(loja_sessao) if loja_sessao in lojas else 0,
+        key="loja_painel"
+    )
+    por_vendedor = PAINEL.por_vendedor(loja)
+    st.dataframe(
+        [{"VENDEDOR": vendedor, **dict(zip(ROTULOS, valores))}
+         for vendedor, valores in sorted(por_vendedor.items(), key=lambda item: -item[1][1])],
+        use_container_width=True,
+        hide_index=True,
+    )
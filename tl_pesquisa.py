@@ -1,7 +1,7 @@
 import streamlit as st
-from datetime import datetime
-from zoneinfo import ZoneInfo
-from google_planilha import GooglePlanilha  
+from google_planilha import obter_planilha_compartilhada
+from registro_atendimento import RegistroAtendimento
+from desempenho import fragmento
 
 def tl_pesquisa():
     st.subheader("🔍 PESQUISA SEM RECEITA")
@@ -11,7 +11,7 @@ def tl_pesquisa():
 
     if 'gsheets' not in st.session_state:
         try:
-            st.session_state.gsheets = GooglePlanilha()
+            st.session_state.gsheets = obter_planilha_compartilhada()
         except Exception as e:
             st.error("❌ Falha ao conectar com Google Sheets")
             st.exception(e)
@@ -19,7 +19,7 @@ def tl_pesquisa():
     gsheets = st.session_state.gsheets
 
     # Carregar vendedores
-    vendedores_data = gsheets.get_vendedores_por_loja()
+    vendedores_data = gsheets.get_vendedores_por_loja(st.session_state.loja)
     vendedores = [v['VENDEDOR'] for v in vendedores_data]
 
     if not vendedores:
@@ -29,6 +29,12 @@ def tl_pesquisa():
             st.rerun()
         return
 
+    # Formulário isolado: cliques e digitação reexecutam só o fragmento
+    _formulario_pesquisa(gsheets, vendedores)
+
+
+@fragmento
+def _formulario_pesquisa(gsheets, vendedores):
     # Seleção de vendedor
     vendedor = st.selectbox(
         "Vendedor",
@@ -51,7 +57,7 @@ def tl_pesquisa():
             st.session_state.tipo_registro = "PESQUISA"
             st.session_state.cliente_pesquisa = cliente
             st.session_state.vendedor_pesquisa = vendedor
-            st.rerun()
+            st.rerun(scope="fragment")
 
     # Mostra a confirmação se já foi feita
     if 'tipo_registro' in st.session_state and st.session_state.tipo_registro == "PESQUISA":
@@ -63,22 +69,22 @@ def tl_pesquisa():
         # Confirmação final e registro
         if st.button("💾 REGISTRAR PESQUISA", type="primary", use_container_width=True, key="btn_salvar_pesquisa"):
             # ✅ Usa horário de São Paulo
-            horario_sp = datetime.now(ZoneInfo("America/Sao_Paulo"))
+            horario_sp = gsheets.agora_na_loja(st.session_state.loja)
 
-            dados = {
-                'loja': st.session_state.loja,
-                'vendedor': vendedor_conf,  # ✅ Usa do session_state
-                'cliente': cliente_conf,
-                'data': horario_sp.strftime("%d/%m/%Y"),
-                'hora': horario_sp.strftime("%H:%M"),
-                'atendimento': '1',
-                'receita': '',
-                'perda': '', 
-                'venda': '',
-                'reserva': '',
-                'pesquisa': '1',
-                'exame': '',
-            }
+            dados = RegistroAtendimento(
+                loja=st.session_state.loja,
+                vendedor=vendedor_conf,  # ✅ Usa do session_state
+                cliente=cliente_conf,
+                data=horario_sp.strftime("%d/%m/%Y"),
+                hora=horario_sp.strftime("%H:%M"),
+                atendimento='1',
+                receita='',
+                perda='',
+                venda='',
+                reserva='',
+                pesquisa='1',
+                exame='',
+            )
 
             if gsheets.registrar_atendimento(dados):
                 st.balloons()
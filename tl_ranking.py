@@ -0,0 +1,97 @@
+import streamlit as st
+from google_planilha import obter_planilha_compartilhada
+from desempenho import fragmento
+from ranking import RANKING, METRICAS, MINIMO_RECEITAS
+
+# 🔹 Janelas oferecidas: (rótulo, chave em ranking.JANELAS)
+JANELAS_RANKING = (
+    ("Hoje", "dia"),
+    ("Últimos 7 dias", "semana"),
+    ("Últimos 30 dias", "mes"),
+)
+TAMANHOS_TOPO = (5, 10, 20)
+MEDALHAS = {1: "🥇", 2: "🥈", 3: "🥉"}
+
+
+def tl_ranking():
+    st.subheader("🏆 RANKING DE VENDEDORES")
+    st.info(f"**Usuário:** {st.session_state.nome_atendente}")
+    st.markdown("---")
+
+    if 'gsheets' not in st.session_state:
+        try:
+            st.session_state.gsheets = obter_planilha_compartilhada()
+        except Exception as e:
+            st.error("❌ Falha ao conectar com Google Sheets")
+            st.exception(e)
+            return
+
+    try:
+        with st.spinner("Montando o ranking..."):
+            RANKING.semear(st.session_state.gsheets)
+    except Exception as e:
+        st.error(f"❌ Erro ao carregar os registros: {e}")
+        return
+
+    _quadro_ranking()
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔄 Recarregar da planilha", use_container_width=True, key="btn_recarregar_ranking"):
+            try:
+                with st.spinner("Relendo a planilha..."):
+                    RANKING.semear(st.session_state.gsheets, forcar=True)
+            except Exception as e:
+                st.error(f"❌ Erro ao recarregar: {e}")
+            else:
+                st.rerun()
+    with col2:
+        if st.button("↩️ VOLTAR", use_container_width=True, key="btn_voltar_ranking"):
+            st.session_state.etapa = 'atendimento'
+            st.rerun()
+
+
+@fragmento
+def _quadro_ranking():
+    """Troca de filtro reexecuta só este trecho; o topo já está ordenado."""
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        rotulo_janela = st.selectbox("Período", [r for r, _ in JANELAS_RANKING], index=1, key="janela_ranking")
+    with col2:
+        metrica = st.selectbox(
+            "Classificar por",
+            list(METRICAS),
+            format_func=lambda nome: METRICAS[nome][0],
+            key="metrica_ranking"
+        )
+    with col3:
+        k = st.selectbox("Mostrar", TAMANHOS_TOPO, index=1, key="k_ranking")
+
+    janela = dict(JANELAS_RANKING)[rotulo_janela]
+    topo = RANKING.topo(janela, metrica, k)
+    if not topo:
+        st.info("📭 Ninguém pontuou neste período.")
+        return
+
+    rotulo_metrica = METRICAS[metrica][0]
+    st.dataframe(
+        [
+            {
+                "#": f"{MEDALHAS.get(linha['posicao'], '')} {linha['posicao']}º".strip(),
+                "VENDEDOR": linha["vendedor"],
+                "LOJA": linha["loja"],
+                rotulo_metrica.upper(): (
+                    f"{linha['pontos'] * 100:.1f}%" if metrica == "conversao" else int(linha["pontos"])
+                ),
+                "ATENDIMENTOS": linha["atendimentos"],
+                "RECEITAS": linha["receitas"],
+                "VENDAS": linha["vendas"],
+                "EXAMES": linha["exames"],
+            }
+            for linha in topo
+        ],
+        use_container_width=True,
+        hide_index=True,
+    )
+    if metrica == "conversao":
+        st.caption(f"Conversão = vendas ÷ receitas; só entra quem tem ao menos {MINIMO_RECEITAS} receitas no período.")
@@ -1,7 +1,7 @@
 import streamlit as st
-from datetime import datetime
-from zoneinfo import ZoneInfo
-from google_planilha import GooglePlanilha 
+from google_planilha import obter_planilha_compartilhada
+from registro_atendimento import RegistroAtendimento
+from desempenho import fragmento
 
 def tl_receita():
     st.subheader("💊 VENDA COM RECEITA")
@@ -10,11 +10,11 @@ def tl_receita():
     st.markdown("---")
 
     if 'gsheets' not in st.session_state:
-        st.session_state.gsheets = GooglePlanilha()
+        st.session_state.gsheets = obter_planilha_compartilhada()
     gsheets = st.session_state.gsheets
 
     # Carrega vendedores
-    vendedores_data = gsheets.get_vendedores_por_loja()
+    vendedores_data = gsheets.get_vendedores_por_loja(st.session_state.loja)
     vendedores = [v['VENDEDOR'] for v in vendedores_data]
     if not vendedores:
         st.warning("⚠️ Nenhum vendedor encontrado para esta loja.")
@@ -23,6 +23,12 @@ def tl_receita():
             st.rerun()
         return
 
+    # Formulário isolado: cliques e digitação reexecutam só o fragmento
+    _formulario_venda(gsheets, vendedores)
+
+
+@fragmento
+def _formulario_venda(gsheets, vendedores):
     # Seleciona vendedor
     vendedor = st.selectbox(
         "Vendedor",
@@ -45,21 +51,21 @@ def tl_receita():
             st.session_state.tipo_registro = "VENDA"
             st.session_state.cliente_venda = cliente
             st.session_state.vendedor_venda = vendedor
-            st.rerun()
+            st.rerun(scope="fragment")
 
     with cols[1]:
         if st.button("❌ PERDA", use_container_width=True, type="secondary", key="btn_tipo_perda"):
             st.session_state.tipo_registro = "PERDA"
             st.session_state.cliente_venda = cliente
             st.session_state.vendedor_venda = vendedor
-            st.rerun()
+            st.rerun(scope="fragment")
 
     with cols[2]:
         if st.button("🗓️ RESERVA", use_container_width=True, type="secondary", key="btn_tipo_reserva"):
             st.session_state.tipo_registro = "RESERVA"
             st.session_state.cliente_venda = cliente
             st.session_state.vendedor_venda = vendedor
-            st.rerun()
+            st.rerun(scope="fragment")
 
     # Verifica se o tipo foi escolhido
     if 'tipo_registro' not in st.session_state:
@@ -97,22 +103,22 @@ def tl_receita():
                 st.error("⚠️ Preencha todos os campos!")
             else:
                 # ✅ Horário em São Paulo
-                horario_sp = datetime.now(ZoneInfo("America/Sao_Paulo"))
-
-                dados = {
-                    'loja': st.session_state.loja,
-                    'vendedor': vendedor_final,
-                    'cliente': cliente_final,
-                    'data': horario_sp.strftime("%d/%m/%Y"),
-                    'hora': horario_sp.strftime("%H:%M"),
-                    'atendimento': '1',
-                    'receita': '1',
-                    'perda': '1' if st.session_state.tipo_registro == "PERDA" else '',
-                    'venda': '1' if st.session_state.tipo_registro == "VENDA" else '',                    
-                    'reserva': '1' if st.session_state.tipo_registro == "RESERVA" else '',
-                    'pesquisa': '',
-                    'exame': '',
-                }
+                horario_sp = gsheets.agora_na_loja(st.session_state.loja)
+
+                dados = RegistroAtendimento(
+                    loja=st.session_state.loja,
+                    vendedor=vendedor_final,
+                    cliente=cliente_final,
+                    data=horario_sp.strftime("%d/%m/%Y"),
+                    hora=horario_sp.strftime("%H:%M"),
+                    atendimento='1',
+                    receita='1',
+                    perda='1' if st.session_state.tipo_registro == "PERDA" else '',
+                    venda='1' if st.session_state.tipo_registro == "VENDA" else '',
+                    reserva='1' if st.session_state.tipo_registro == "RESERVA" else '',
+                    pesquisa='',
+                    exame='',
+                )
 
                 if gsheets.registrar_atendimento(dados):
                     st.balloons()
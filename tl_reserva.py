@@ -1,7 +1,7 @@
 import streamlit as st
-from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
-from google_planilha import GooglePlanilha 
+from google_planilha import obter_planilha_compartilhada
+from registro_atendimento import RegistroAtendimento
+from desempenho import fragmento
 
 
 def tl_reserva():
@@ -13,7 +13,7 @@ def tl_reserva():
     # Conecta com Google Sheets
     if 'gsheets' not in st.session_state:
         try:
-            st.session_state.gsheets = GooglePlanilha()
+            st.session_state.gsheets = obter_planilha_compartilhada()
         except Exception as e:
             st.error("❌ Falha ao conectar com Google Sheets")
             st.exception(e)
@@ -22,7 +22,7 @@ def tl_reserva():
 
     # Carrega vendedores
     try:
-        vendedores_data = gsheets.get_vendedores_por_loja()
+        vendedores_data = gsheets.get_vendedores_por_loja(st.session_state.loja)
         vendedores = [v['VENDEDOR'] for v in vendedores_data]
     except Exception as e:
         st.error(f"❌ Erro ao carregar vendedores: {e}")
@@ -35,6 +35,12 @@ def tl_reserva():
             st.rerun()
         return
 
+    # Formulário isolado: cliques e digitação reexecutam só o fragmento
+    _formulario_reserva(gsheets, vendedores)
+
+
+@fragmento
+def _formulario_reserva(gsheets, vendedores):
     # Seleciona vendedor
     vendedor = st.selectbox(
         "Vendedor",
@@ -61,7 +67,7 @@ def tl_reserva():
             st.session_state.tipo_reserva = "CONVERSÃO"
             st.session_state.cliente_reserva = cliente
             st.session_state.vendedor_reserva = vendedor
-            st.rerun()
+            st.rerun(scope="fragment")
 
     with cols[1]:
         if st.button("❌ DESISTÊNCIA", use_container_width=True, type="secondary", key="btn_tipo_perda"):
@@ -71,7 +77,7 @@ def tl_reserva():
             st.session_state.tipo_reserva = "DESISTÊNCIA"
             st.session_state.cliente_reserva = cliente
             st.session_state.vendedor_reserva = vendedor
-            st.rerun()
+            st.rerun(scope="fragment")
 
     # Verifica se o tipo foi escolhido
     if 'tipo_reserva' not in st.session_state:
@@ -93,22 +99,22 @@ def tl_reserva():
             return
 
         # ✅ Tudo certo: pode registrar
-        horario_sp = datetime.now(ZoneInfo("America/Sao_Paulo"))
-
-        dados_registro = {
-            'loja': st.session_state.loja,
-            'vendedor': vend,
-            'cliente': cli,
-            'data': horario_sp.strftime("%d/%m/%Y"),
-            'hora': horario_sp.strftime("%H:%M"),
-            'atendimento': '1',
-            'receita': '',  
-            'perda': '1' if tipo == "DESISTÊNCIA" else '',
-            'venda': '1' if tipo == "CONVERSÃO" else '',
-            'reserva': '-1',  
-            'pesquisa': '',
-            'exame': '',
-        }
+        horario_sp = gsheets.agora_na_loja(st.session_state.loja)
+
+        dados_registro = RegistroAtendimento(
+            loja=st.session_state.loja,
+            vendedor=vend,
+            cliente=cli,
+            data=horario_sp.strftime("%d/%m/%Y"),
+            hora=horario_sp.strftime("%H:%M"),
+            atendimento='1',
+            receita='',
+            perda='1' if tipo == "DESISTÊNCIA" else '',
+            venda='1' if tipo == "CONVERSÃO" else '',
+            reserva='-1',
+            pesquisa='',
+            exame='',
+        )
 
         # 📥 Salva no Google Sheets
         try:
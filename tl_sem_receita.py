@@ -1,7 +1,7 @@
 import streamlit as st
-from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
-from google_planilha import GooglePlanilha  
+from google_planilha import obter_planilha_compartilhada
+from registro_atendimento import RegistroAtendimento
+from desempenho import fragmento
 
 def tl_sem_receita():
     st.subheader("🔄 RETORNO SEM RESERVA")
@@ -11,7 +11,7 @@ def tl_sem_receita():
 
     if 'gsheets' not in st.session_state:
         try:
-            st.session_state.gsheets = GooglePlanilha()
+            st.session_state.gsheets = obter_planilha_compartilhada()
         except Exception as e:
             st.error("❌ Falha ao conectar com Google Sheets")
             st.exception(e)
@@ -20,7 +20,7 @@ def tl_sem_receita():
 
     # Carregar vendedores
     try:
-        vendedores_data = gsheets.get_vendedores_por_loja()
+        vendedores_data = gsheets.get_vendedores_por_loja(st.session_state.loja)
         vendedores = [v['VENDEDOR'] for v in vendedores_data] if vendedores_data else []
     except Exception as e:
         st.error(f"❌ Erro ao carregar vendedores: {e}")
@@ -33,6 +33,12 @@ def tl_sem_receita():
             st.rerun()
         return
 
+    # Formulário isolado: cliques e digitação reexecutam só o fragmento
+    _formulario_retorno(gsheets, vendedores)
+
+
+@fragmento
+def _formulario_retorno(gsheets, vendedores):
     # Seleção de vendedor
     vendedor = st.selectbox(
         "Vendedor",
@@ -55,7 +61,7 @@ def tl_sem_receita():
                 st.error("⚠️ Preencha todos os campos!")
             else:
                 # ✅ Usa horário de São Paulo
-                horario_sp = datetime.now(ZoneInfo("America/Sao_Paulo"))
+                horario_sp = gsheets.agora_na_loja(st.session_state.loja)
                 st.session_state.retorno_confirmado = {
                     'vendedor': vendedor,
                     'cliente': cliente,
@@ -84,23 +90,23 @@ def tl_sem_receita():
 
             try:
                 # ✅ Horário de São Paulo
-                horario_sp = datetime.now(ZoneInfo("America/Sao_Paulo"))
+                horario_sp = gsheets.agora_na_loja(st.session_state.loja)
 
                 # ✅ Tudo certo: registrar
-                dados = {
-                    'loja': st.session_state.loja,
-                    'vendedor': conf['vendedor'],
-                    'cliente': conf['cliente'],
-                    'data': horario_sp.strftime("%d/%m/%Y"),
-                    'hora': horario_sp.strftime("%H:%M"),
-                    'atendimento': '1',
-                    'receita': '',
-                    'venda': '1',
-                    'perda': '-1', 
-                    'reserva': '',
-                    'pesquisa': '',
-                    'exame': '',  
-                }
+                dados = RegistroAtendimento(
+                    loja=st.session_state.loja,
+                    vendedor=conf['vendedor'],
+                    cliente=conf['cliente'],
+                    data=horario_sp.strftime("%d/%m/%Y"),
+                    hora=horario_sp.strftime("%H:%M"),
+                    atendimento='1',
+                    receita='',
+                    venda='1',
+                    perda='-1',
+                    reserva='',
+                    pesquisa='',
+                    exame='',
+                )
 
                 if gsheets.registrar_atendimento(dados):
                     st.balloons()